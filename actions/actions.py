@@ -25,148 +25,66 @@
 #         dispatcher.utter_message(text="Hello World!")
 #
 #         return []
-from typing import Any, Text, Dict, List
+from typing import Any, Text, Dict, List, Optional
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet, AllSlotsReset, FollowupAction
-import csv
 import os
 import re
 from datetime import datetime
 import json
 
+from . import catalogo, pesquisa, ranking
+from .assincrono import AcaoAssincrona
+from .historico import avaliacao_limpa, obter_historico
+
 
 def carregar_receitas():
-    """Carrega as receitas do ficheiro CSV tratando o formato específico que enviaste"""
-    receitas = []
-    
-    # Tenta encontrar o ficheiro na raiz ou na pasta data_source
-    caminho_csv = "recipes.csv"
-    if not os.path.exists(caminho_csv):
-        caminho_csv = os.path.join("db", "recipes.csv")
+    """Devolve as receitas do catálogo em memória (o CSV só é relido quando muda no disco)"""
+    return catalogo.obter_receitas()
 
-    if not os.path.exists(caminho_csv):
-        print(f"❌ ERRO CRÍTICO: Não encontrei 'recipes.csv'.")
-        return []
-    
-    try:
-        with open(caminho_csv, 'r', encoding='utf-8-sig') as file:
-            reader = csv.DictReader(file, delimiter=';')
-            
-            reader.fieldnames = [name.strip() for name in reader.fieldnames]
-            
-            for row in reader:
-                # --- 1. TRATAMENTO DE LISTAS (separadas por | no teu CSV) ---
-                criterios = [c.strip().lower() for c in row.get('criterios', '').split('|')] if row.get('criterios') else []
-                ingredientes = [i.strip() for i in row.get('ingredientes', '').split('|')] if row.get('ingredientes') else []
-                passos = [p.strip() for p in row.get('passos', '').split('|')] if row.get('passos') else []
-                
-                # --- 2. TRATAMENTO DE TEMPO (40 min, 1 h 20 m, etc) ---
-                tempo_total = row.get('tempo_total', '').strip()
-                tempo_minutos = 0
-                if tempo_total:
-                    numeros = re.findall(r'\d+', tempo_total)
-                    if numeros:
-                        if 'h' in tempo_total.lower():
-                            horas = int(numeros[0])
-                            minutos = int(numeros[1]) if len(numeros) > 1 else 0
-                            tempo_minutos = (horas * 60) + minutos
-                        else:
-                            tempo_minutos = int(numeros[0])
-                
-                # --- 3. TRATAMENTO DE NÚMEROS ---
-                # Calorias (remove "Kcal")
-                calorias_str = row.get('calorias', '0').lower().replace('kcal', '').strip()
-                try:
-                    calorias = int(calorias_str)
-                except:
-                    calorias = 0
 
-                # Rating
-                rating_str = row.get('rating', '0').replace(',', '.').strip()
-                try:
-                    rating = float(rating_str)
-                except:
-                    rating = 0.0
-                
-                # --- 4. PORÇÕES (NOVO CAMPO) ---
-                porcoes_str = row.get('porcoes', '0').strip()
-                try:
-                    porcoes = int(float(porcoes_str)) if porcoes_str else 0
-                except:
-                    porcoes = 0
-                
-                # Cria o objeto limpo
-                receita = {
-                    'id': row.get('id', '').strip(),
-                    'titulo': row.get('titulo', '').strip(),
-                    'categoria': row.get('categoria', '').strip().lower(),
-                    'dificuldade': row.get('dificuldade', '').strip().lower(),
-                    'tempo_total': tempo_total,
-                    'tempo_minutos': tempo_minutos,
-                    'calorias': calorias,
-                    'rating': rating,
-                    'porcoes': porcoes,  
-                    'ingredientes': ingredientes, 
-                    'passos': passos,            
-                    'criterios': criterios,
-                    'imagem': row.get('imagem', '').strip()
-                }
-                receitas.append(receita)
-        
-        print(f"✅ Sucesso: {len(receitas)} receitas carregadas do teu dataset.")
-                
-    except Exception as e:
-        print(f"❌ Erro ao ler CSV: {str(e)}")
-        import traceback
-        traceback.print_exc()
-    
-    return receitas
+# Com este modo ligado, receitas_encontradas e receita_selecionada guardam só
+# os ids das receitas e as ações vão buscar o resto ao catálogo em memória.
+# Assim cada evento do tracker (enviado no webhook e gravado no tracker store)
+# fica com poucos bytes em vez da receita inteira. CHEFBOT_SLOTS_SO_IDS=0
+# volta a guardar as receitas completas.
+SLOTS_SO_IDS = os.environ.get("CHEFBOT_SLOTS_SO_IDS", "1") != "0"
 
-def _esta_nos_favoritos(receita_id: str, caminho: str = "favoritos.csv") -> bool:
-    if not receita_id or not os.path.exists(caminho):
-        return False
-    try:
-        with open(caminho, "r", encoding="utf-8-sig", newline="") as f:
-            reader = csv.DictReader(f, delimiter=";")
-            for row in reader:
-                if (row.get("id", "") or "").strip() == receita_id.strip():
-                    return True
-    except:
-        return False
-    return False
-
-def _remover_dos_favoritos(receita_id: str, caminho: str = "favoritos.csv") -> bool:
-    if not receita_id or not os.path.exists(caminho):
-        return False
-    try:
-        with open(caminho, "r", encoding="utf-8-sig", newline="") as f:
-            rows = list(csv.DictReader(f, delimiter=";"))
 
-        if not rows:
-            return False
+def _receita_para_slot(receita):
+    """Valor a guardar no slot para uma receita: o id, ou um dict simples (os slots têm de ser JSON)"""
+    if SLOTS_SO_IDS:
+        return receita.get("id", "")
+    return dict(receita)
 
-        rid = receita_id.strip()
-        novas = [r for r in rows if (r.get("id", "") or "").strip() != rid]
 
-        if len(novas) == len(rows):
-            return False
+def _receitas_para_slot(receitas) -> List[Any]:
+    return [_receita_para_slot(r) for r in receitas]
+
 
-        with open(caminho, "w", encoding="utf-8-sig", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()), delimiter=";")
-            writer.writeheader()
-            writer.writerows(novas)
+def _resolver_receita(valor):
+    """Receita guardada num slot, seja um id ou um dict completo (conversas antigas)"""
+    if not valor:
+        return None
+    if isinstance(valor, dict):
+        return valor
+    return catalogo.obter_catalogo().receita_por_id(str(valor))
 
-        return True
-    except:
-        return False
 
-def _garantir_csv_com_header(caminho: str, header: List[str]):
-    existe = os.path.exists(caminho)
-    if not existe:
-        with open(caminho, "w", encoding="utf-8-sig", newline="") as f:
-            writer = csv.writer(f, delimiter=";")
-            writer.writerow(header)
+def _resolver_receitas(valores) -> List[Any]:
+    """Lista de receitas de um slot; ids que já não existem no catálogo são ignorados"""
+    receitas = []
+    for valor in valores or []:
+        receita = _resolver_receita(valor)
+        if receita is not None:
+            receitas.append(receita)
+    return receitas
+
+
+# Carrega o catálogo logo no arranque do servidor de ações,
+# para que o primeiro pedido não pague a leitura do CSV
+carregar_receitas()
 
 def _receita_para_linha_csv(receita: Dict[str, Any], avaliacao_utilizador: Any):
     return {
@@ -185,11 +103,11 @@ def _receita_para_linha_csv(receita: Dict[str, Any], avaliacao_utilizador: Any):
         "imagem": receita.get("imagem", ""),
         "avaliacao_utilizador": "" if avaliacao_utilizador is None else str(avaliacao_utilizador),
     }
-class ActionBuscarReceitas(Action):
+class ActionBuscarReceitas(AcaoAssincrona):
     def name(self) -> Text:
         return "action_buscar_receitas"
     
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         # Obter Slots do Rasa
         categoria = tracker.get_slot("categoria")
@@ -201,84 +119,26 @@ class ActionBuscarReceitas(Action):
         
         print(f"🔍 A pesquisar: Cat={categoria}, Tempo={tempo}, Dif={dificuldade}")
 
-        todas_receitas = carregar_receitas()
+        cat = catalogo.obter_catalogo()
         
-        if not todas_receitas:
-            # Se a lista vier vazia, avisa mas não crasha
+        if len(cat) == 0:
+            # Se o catálogo vier vazio, avisa mas não crasha
             return [SlotSet("receitas_encontradas", [])]
 
-        receitas_filtradas = todas_receitas.copy()
-
-        # 1. Categoria
-        if categoria:
-            # Normaliza para minúsculas para comparar
-            cat_busca = categoria.lower()
-            if cat_busca == "prato_principal":
-                receitas_filtradas = [r for r in receitas_filtradas if "prato principal" in r["categoria"]]
-            else:
-                receitas_filtradas = [r for r in receitas_filtradas if cat_busca in r["categoria"]]            
-      
-        # 2. Tempo
-        if tempo and tempo != "tanto_faz":
-            if tempo == "ate_30min":
-                receitas_filtradas = [r for r in receitas_filtradas if r["tempo_minutos"] <= 30]
-            elif tempo == "30_60min":
-                receitas_filtradas = [r for r in receitas_filtradas if 30 < r["tempo_minutos"] <= 60]
-            elif tempo == "mais_1h":
-                receitas_filtradas = [r for r in receitas_filtradas if r["tempo_minutos"] > 60]
-        
-        # 3. Dificuldade
-        if dificuldade and dificuldade != "qualquer":
-            dif_map = {
-                "facil": ["muito fácil", "fácil"], 
-                "medio": ["médio"],
-                "dificil": ["difícil"]
-            }
-            if dificuldade in dif_map:
-                termos_aceites = dif_map[dificuldade]
-                receitas_filtradas = [r for r in receitas_filtradas if r["dificuldade"] in termos_aceites]
-        
-        # 4. Restrições (O teu CSV tem "Sem glúten", "Vegan", etc)
-        if restricao and restricao not in ["nenhuma"]:
-            restricao_map = {
-                "vegetariano": "vegetariano",
-                "vegano": "vegan",
-                "sem_gluten": "sem glúten",
-                "sem_lactose": "sem lactose",
-                "sem_acucar": "sem açúcar",  
-                "sem_ovo": "sem ovo",         
-            }
-            if restricao in restricao_map:
-                termo_busca = restricao_map[restricao]
-                # Verifica se o termo está na lista de critérios da receita
-                receitas_filtradas = [r for r in receitas_filtradas if any(termo_busca in c for c in r["criterios"])]
-        
-        # 5. Ingrediente a Evitar
-        if ingrediente_evitar:
-            evitar = ingrediente_evitar.lower()
-            receitas_filtradas = [r for r in receitas_filtradas if not any(evitar in i.lower() for i in r["ingredientes"])]
-        
-        # 6. Calorias
-        if preferencia_calorica == "leve":
-            receitas_filtradas = [r for r in receitas_filtradas if r["calorias"] <= 300]
-        elif preferencia_calorica == "moderado":
-            receitas_filtradas = [r for r in receitas_filtradas if 300 < r["calorias"] <= 600]
-        elif preferencia_calorica == "reforçado":          # <-- NOVO
-            receitas_filtradas = [r for r in receitas_filtradas if 600 < r["calorias"] <= 900]
-        elif preferencia_calorica == "hipercalorico":      # <-- NOVO
-            receitas_filtradas = [r for r in receitas_filtradas if r["calorias"] > 900]
-            
-        # Ordenar por rating (melhores primeiro) e pegar top 5
-        receitas_filtradas.sort(key=lambda x: x['rating'], reverse=True)
-        receitas_filtradas = receitas_filtradas[:5]
+        # Categoria, tempo, dificuldade, restrição, calorias e ingrediente a evitar
+        # (ver pesquisa.py; o motor é escolhido com CHEFBOT_MOTOR_PESQUISA)
+        filtros = pesquisa.filtros_dos_slots(
+            categoria, tempo, dificuldade, restricao, ingrediente_evitar, preferencia_calorica
+        )
+        receitas_filtradas = [cat.receita(i) for i in pesquisa.pesquisar(cat, filtros, 5)]
         
-        return [SlotSet("receitas_encontradas", receitas_filtradas)]
+        return [SlotSet("receitas_encontradas", _receitas_para_slot(receitas_filtradas))]
 
-class ActionBuscarPorIngredientes(Action):
+class ActionBuscarPorIngredientes(AcaoAssincrona):
     def name(self) -> Text:
         return "action_buscar_por_ingredientes"
     
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         # 1. Obter a lista de ingredientes que o utilizador disse que tem
         ingredientes_utilizador = tracker.get_slot("lista_ingredientes_possuido")
@@ -289,34 +149,25 @@ class ActionBuscarPorIngredientes(Action):
 
         print(f"🔍 Ingredientes do utilizador: {ingredientes_utilizador}")
 
-        todas_receitas = carregar_receitas() # Usa a tua função existente
-        receitas_pontuadas = []
+        cat = catalogo.obter_catalogo()
 
         # 2. Lógica de Matching
         # Vamos contar quantos ingredientes da receita o utilizador TEM.
-        for receita in todas_receitas:
-            matches = 0
-            ingredientes_receita_str = " ".join(receita['ingredientes']).lower()
-            
-            # Verifica cada ingrediente do user contra a lista da receita
-            for ing_user in ingredientes_utilizador:
-                # Remove o 's' final para tentar lidar com plurais simples (ex: ovos -> ovo)
-                termo = ing_user.lower().rstrip('s') 
-                if termo in ingredientes_receita_str:
-                    matches += 1
-            
-            if matches > 0:
-                # Calculamos uma pontuação. 
-                # (Número de matches) + (Bônus se tiver rating alto)
-                score = matches + (receita['rating'] * 0.1)
-                receitas_pontuadas.append((score, receita))
+        # O índice invertido já trata acentos e plurais (ex: ovos -> ovo, limões -> limão)
+        # e só devolve receitas com pelo menos um match.
+        contagens = cat.indice_ingredientes.contar_matches(ingredientes_utilizador)
+
+        # Calculamos uma pontuação. 
+        # (Número de matches) + (Bônus se tiver rating alto)
+        receitas_pontuadas = (
+            (matches + (cat.rating[i] * 0.1), i)
+            for i, matches in contagens.items()
+        )
 
         # 3. Ordenar e Filtrar
-        # Ordena pela pontuação (score) decrescente
-        receitas_pontuadas.sort(key=lambda x: x[0], reverse=True)
-        
-        # Pega nas top 5 receitas (apenas o objeto receita, ignorando o score agora)
-        top_receitas = [r[1] for r in receitas_pontuadas[:5]]
+        # Heap com as 5 maiores pontuações (em empate fica a ordem do CSV, como no sort)
+        melhores = ranking.top_k(receitas_pontuadas, 5, chave=lambda x: x[0], desempate=lambda x: x[1])
+        top_receitas = [cat.receita(i) for _, i in melhores]
 
         if not top_receitas:
             dispatcher.utter_message(text=f"Não encontrei receitas específicas com {', '.join(ingredientes_utilizador)}. Tenta outros ingredientes!")
@@ -325,16 +176,16 @@ class ActionBuscarPorIngredientes(Action):
         # 4. Guardar no Slot para usar a ActionMostrarReceitas existente
         # Como a estrutura é igual, podemos reaproveitar a action_mostrar_receitas!
         return [
-            SlotSet("receitas_encontradas", top_receitas), 
+            SlotSet("receitas_encontradas", _receitas_para_slot(top_receitas)), 
             FollowupAction("action_mostrar_receitas") # Chama automaticamente a exibição
         ]
 
-class ActionMostrarReceitas(Action):
+class ActionMostrarReceitas(AcaoAssincrona):
     def name(self) -> Text:
         return "action_mostrar_receitas"
     
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
-        receitas = tracker.get_slot("receitas_encontradas")
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        receitas = _resolver_receitas(tracker.get_slot("receitas_encontradas"))
         
         if not receitas:
             dispatcher.utter_message(response="utter_nenhuma_receita_encontrada")
@@ -361,12 +212,12 @@ class ActionMostrarReceitas(Action):
         dispatcher.utter_message(text=mensagem, buttons=buttons)
         return []
 
-class ActionMostrarReceitaCompleta(Action):
+class ActionMostrarReceitaCompleta(AcaoAssincrona):
     def name(self) -> Text:
         return "action_mostrar_receita_completa"
     
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
-        receitas = tracker.get_slot("receitas_encontradas")
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        receitas = _resolver_receitas(tracker.get_slot("receitas_encontradas"))
         numero_receita = tracker.get_slot("numero_receita")
         
         if not receitas or not numero_receita:
@@ -424,26 +275,26 @@ class ActionMostrarReceitaCompleta(Action):
             ]
             dispatcher.utter_message(text=msg, buttons=bts)
 
-            return [SlotSet("receita_selecionada", r)]
+            return [SlotSet("receita_selecionada", _receita_para_slot(r))]
             
         except Exception as e:
             dispatcher.utter_message(text=f"Erro ao mostrar receita: {str(e)}")
             print(f"Erro detalhado: {e}")
             return []
         
-class ActionResetSlots(Action):
+class ActionResetSlots(AcaoAssincrona):
     def name(self) -> Text:
         return "action_reset_slots"
     
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         return [AllSlotsReset()]
     
-class ActionIniciarModoPasso(Action):
+class ActionIniciarModoPasso(AcaoAssincrona):
     def name(self) -> Text:
         return "action_iniciar_modo_passo"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        receita = tracker.get_slot("receita_selecionada")
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        receita = _resolver_receita(tracker.get_slot("receita_selecionada"))
         if not receita:
             dispatcher.utter_message(response="utter_sem_receita_selecionada")
             return []
@@ -460,12 +311,12 @@ class ActionIniciarModoPasso(Action):
             SlotSet("passo_atual", 1),  # já prepara o passo 1
         ]
 
-class ActionMostrarIngredientesDaReceita(Action):
+class ActionMostrarIngredientesDaReceita(AcaoAssincrona):
     def name(self) -> Text:
         return "action_mostrar_ingredientes_da_receita"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        receita = tracker.get_slot("receita_selecionada")
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        receita = _resolver_receita(tracker.get_slot("receita_selecionada"))
         if not receita:
             dispatcher.utter_message(response="utter_sem_receita_selecionada")
             return []
@@ -487,12 +338,12 @@ class ActionMostrarIngredientesDaReceita(Action):
         dispatcher.utter_message(text=msg, buttons=bts)
         return []
 
-class ActionMostrarPassoAtual(Action):
+class ActionMostrarPassoAtual(AcaoAssincrona):
     def name(self) -> Text:
         return "action_mostrar_passo_atual"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        receita = tracker.get_slot("receita_selecionada")
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        receita = _resolver_receita(tracker.get_slot("receita_selecionada"))
         if not receita:
             dispatcher.utter_message(response="utter_sem_receita_selecionada")
             return []
@@ -532,12 +383,12 @@ class ActionMostrarPassoAtual(Action):
         return [SlotSet("passo_atual", passo_atual)]
 
 
-class ActionProximoPasso(Action):
+class ActionProximoPasso(AcaoAssincrona):
     def name(self) -> Text:
         return "action_proximo_passo"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        receita = tracker.get_slot("receita_selecionada")
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        receita = _resolver_receita(tracker.get_slot("receita_selecionada"))
         passos = (receita or {}).get("passos", []) or []
         total = len(passos)
 
@@ -550,11 +401,11 @@ class ActionProximoPasso(Action):
             FollowupAction("action_mostrar_passo_atual"),
         ]
 
-class ActionAbandonarReceita(Action):
+class ActionAbandonarReceita(AcaoAssincrona):
     def name(self) -> Text:
         return "action_abandonar_receita"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
         dispatcher.utter_message(
             text="Ok — saímos do modo-a-passo. Queres voltar à lista ou fazer uma nova busca?",
             buttons=[
@@ -564,11 +415,11 @@ class ActionAbandonarReceita(Action):
         )
         return [SlotSet("modo_passo", False), SlotSet("passo_atual", 0)]
 
-class ActionRegressarPasso(Action):
+class ActionRegressarPasso(AcaoAssincrona):
     def name(self) -> Text:
         return "action_regressar_passo"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
         passo_atual = int(tracker.get_slot("passo_atual") or 1)
         if passo_atual > 1:
             passo_atual -= 1
@@ -578,12 +429,12 @@ class ActionRegressarPasso(Action):
             FollowupAction("action_mostrar_passo_atual"),
         ]
 
-class ActionPerguntarAvaliacao(Action):
+class ActionPerguntarAvaliacao(AcaoAssincrona):
     def name(self) -> Text:
         return "action_perguntar_avaliacao"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        receita = tracker.get_slot("receita_selecionada")
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        receita = _resolver_receita(tracker.get_slot("receita_selecionada"))
         if not receita:
             dispatcher.utter_message(response="utter_sem_receita_selecionada")
             return []
@@ -600,12 +451,12 @@ class ActionPerguntarAvaliacao(Action):
         dispatcher.utter_message(text=msg, buttons=bts)
         return []
 
-class ActionRegistarRecenteEPerguntarFavoritos(Action):
+class ActionRegistarRecenteEPerguntarFavoritos(AcaoAssincrona):
     def name(self) -> Text:
         return "action_registar_recente_e_perguntar_favoritos"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
-        receita = tracker.get_slot("receita_selecionada")
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        receita = _resolver_receita(tracker.get_slot("receita_selecionada"))
         if not receita:
             dispatcher.utter_message(response="utter_sem_receita_selecionada")
             return []
@@ -689,35 +540,15 @@ class ActionRegistarRecenteEPerguntarFavoritos(Action):
 
             print(f"✅ AVALIAÇÃO EXTRAÍDA: {avaliacao}")
 
-        # Guardar em recentes.csv (sempre)
-        caminho = "recentes.csv"
-        header = [
-            "data_finalizacao",
-            "id",
-            "titulo", "categoria", "dificuldade", "tempo_total", "tempo_minutos",
-            "calorias", "rating_dataset",
-            "criterios", "ingredientes", "passos", 
-            "avaliacao_utilizador"
-        ]
-        _garantir_csv_com_header(caminho, header)
-        data_finalizacao = datetime.now().isoformat(timespec="seconds")
+        # Guardar em recentes (sempre)
         linha = _receita_para_linha_csv(receita, avaliacao)
-
-        with open(caminho, "a", encoding="utf-8-sig", newline="") as f:
-            writer = csv.writer(f, delimiter=";")
-            writer.writerow([
-                data_finalizacao,
-                linha["id"],
-                linha["titulo"], linha["categoria"], linha["dificuldade"],
-                linha["tempo_total"], linha["tempo_minutos"],
-                linha["calorias"], linha["rating_dataset"],
-                linha["criterios"], linha["ingredientes"], linha["passos"],
-                linha["avaliacao_utilizador"],
-            ])
+        linha["data_finalizacao"] = datetime.now().isoformat(timespec="seconds")
+        historico = obter_historico()
+        historico.registar_recente(tracker.sender_id, linha)
 
         rid = receita.get("id", "")
 
-        if _esta_nos_favoritos(rid):
+        if historico.esta_nos_favoritos(tracker.sender_id, rid):
             dispatcher.utter_message(
                 text="Remover dos favoritos?",
                 buttons=[
@@ -736,53 +567,34 @@ class ActionRegistarRecenteEPerguntarFavoritos(Action):
 
         return []
 
-class ActionGuardarFavoritosCSV(Action):
+class ActionGuardarFavoritosCSV(AcaoAssincrona):
     def name(self) -> Text:
         return "action_guardar_favoritos_csv"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        receita = tracker.get_slot("receita_selecionada")
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        receita = _resolver_receita(tracker.get_slot("receita_selecionada"))
         if not receita:
             dispatcher.utter_message(response="utter_sem_receita_selecionada")
             return []
 
-        caminho = "favoritos.csv"
-        header = [
-            "data_favorito",
-            "id",
-            "titulo", "categoria", "dificuldade", "tempo_total", "tempo_minutos",
-            "calorias", "rating_dataset",
-            "criterios", "ingredientes", "passos", 
-        ]
-        _garantir_csv_com_header(caminho, header)
-        data_favorito = datetime.now().isoformat(timespec="seconds")
         linha = _receita_para_linha_csv(receita, None)
-
-        with open(caminho, "a", encoding="utf-8-sig", newline="") as f:
-            writer = csv.writer(f, delimiter=";")
-            writer.writerow([
-                data_favorito,
-                linha["id"],
-                linha["titulo"], linha["categoria"], linha["dificuldade"],
-                linha["tempo_total"], linha["tempo_minutos"],
-                linha["calorias"], linha["rating_dataset"],
-                linha["criterios"], linha["ingredientes"], linha["passos"],
-            ])
+        linha["data_favorito"] = datetime.now().isoformat(timespec="seconds")
+        obter_historico().adicionar_favorito(tracker.sender_id, linha)
         dispatcher.utter_message(text="Feito ✅ Guardei nos teus favoritos!")
         return []
 
-class ActionRemoverFavoritosCSV(Action):
+class ActionRemoverFavoritosCSV(AcaoAssincrona):
     def name(self) -> Text:
         return "action_remover_favoritos_csv"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        receita = tracker.get_slot("receita_selecionada")
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        receita = _resolver_receita(tracker.get_slot("receita_selecionada"))
         if not receita:
             dispatcher.utter_message(response="utter_sem_receita_selecionada")
             return []
 
         rid = receita.get("id", "")
-        ok = _remover_dos_favoritos(rid)
+        ok = obter_historico().remover_favorito(tracker.sender_id, rid)
 
         if ok:
             dispatcher.utter_message(text="Feito ✅ Removi dos teus favoritos!")
@@ -791,61 +603,80 @@ class ActionRemoverFavoritosCSV(Action):
 
         return []
 
-def _ler_csv_dicts(caminho: str) -> List[Dict[str, Any]]:
-    if not os.path.exists(caminho):
-        return []
-    with open(caminho, "r", encoding="utf-8-sig", newline="") as f:
-        return list(csv.DictReader(f, delimiter=";"))
+def _receitas_do_historico(rows, limite: Optional[int] = None) -> List[Any]:
+    """Receitas do catálogo para as linhas do histórico, pela mesma ordem.
+
+    Cada id é procurado no índice por id do catálogo (sem percorrer o catálogo);
+    ids que já não existem são saltados e com ``limite`` pára ao chegar a esse número.
+    """
+    cat = catalogo.obter_catalogo()
+    receitas = []
+    for row in rows:
+        rid = (row.get("id", "") or "").strip()
+        receita = cat.receita_por_id(rid) if rid else None
+        if receita is not None:
+            receitas.append(receita)
+            if limite is not None and len(receitas) >= limite:
+                break
+    return receitas
+
+# Receitas por página nas listas de recentes e de favoritos
+PAGINA_RECENTES = 10
+PAGINA_FAVORITOS = 5
+
+
+def _pagina_do_historico(pedir_pagina, limite: int, cursor: Optional[str] = None):
+    """Próximas ``limite`` receitas do histórico (a seguir ao ``cursor``) que existem no catálogo.
+
+    ``pedir_pagina(n, cursor)`` devolve até n pares (cursor, linha) do armazenamento;
+    se algumas linhas forem de receitas que já não existem, pede mais. Devolve as
+    receitas e o cursor da página seguinte (None se esta for a última).
+    """
+    cat = catalogo.obter_catalogo()
+    receitas = []
+    while True:
+        # Uma linha a mais para saber se há página seguinte
+        bloco = pedir_pagina(limite + 1, cursor)
+        for chave, row in bloco:
+            if len(receitas) >= limite:
+                return receitas, cursor
+            cursor = chave
+            rid = (row.get("id", "") or "").strip()
+            receita = cat.receita_por_id(rid) if rid else None
+            if receita is not None:
+                receitas.append(receita)
+        if len(bloco) <= limite:
+            return receitas, None
+
+def _botao_pagina_seguinte(intent: str, cursor: str) -> Dict[str, str]:
+    return {"title": "➡️ Página seguinte", "payload": f"/{intent}{json.dumps({'cursor_pagina': cursor})}"}
 
-def _carregar_avaliacoes_recentes() -> Dict[str, str]:
-    """Carrega avaliações do recentes.csv e mapeia ID -> avaliação_utilizador"""
+def _avaliacoes_recentes(rows) -> Dict[str, str]:
+    """Mapeia ID -> avaliação_utilizador a partir das linhas do recentes.csv já lidas"""
     avaliacoes = {}
-    rows = _ler_csv_dicts("recentes.csv")
     for row in rows:
         rid = (row.get("id", "") or "").strip()
-        avaliacao = (row.get("avaliacao_utilizador", "") or "").strip()
+        avaliacao = avaliacao_limpa(row.get("avaliacao_utilizador", ""))
         if rid and avaliacao:
-            # Remove aspas ou espaços extras
-            avaliacao_limpa = avaliacao.replace('"', '').replace("'", "").strip()
-            if avaliacao_limpa and avaliacao_limpa != "None" and avaliacao_limpa != "null":
-                avaliacoes[rid] = avaliacao_limpa
+            avaliacoes[rid] = avaliacao
     return avaliacoes
 
-class ActionMostrarRecentesResumo(Action):
+class ActionMostrarRecentesResumo(AcaoAssincrona):
     def name(self) -> Text:
         return "action_mostrar_recentes_resumo"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        rows = _ler_csv_dicts("recentes.csv")
-        total = len(rows)
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        # Contagens mantidas a cada registo: não é preciso reler o histórico
+        resumo = obter_historico().resumo_recentes(tracker.sender_id)
 
-        if total == 0:
+        if resumo.total == 0:
             dispatcher.utter_message(text="Ainda não tenho registo de receitas feitas 🙂")
             return []
 
-        # Mais feita (por id)
-        counts: Dict[str, int] = {}
-        titulo_por_id: Dict[str, str] = {}
-        for r in rows:
-            rid = (r.get("id", "") or "").strip()
-            titulo = (r.get("titulo", "") or "").strip()
-            if rid:
-                counts[rid] = counts.get(rid, 0) + 1
-                if rid not in titulo_por_id and titulo:
-                    titulo_por_id[rid] = titulo
-
-        mais_feita_id = max(counts, key=counts.get) if counts else ""
-        mais_feita_titulo = titulo_por_id.get(mais_feita_id, "—")
-
-        # Última (pela data mais recente)
-        # ISO strings ordenam bem lexicograficamente se estiverem no formato YYYY-MM-DDTHH:MM:SS
-        ultima = max(rows, key=lambda x: (x.get("data_finalizacao", "") or ""))
-        ultima_titulo = (ultima.get("titulo", "") or "—").strip()
-
         msg = (
-            f"Tens {total} receitas feitas recentes:\n\n"
-            f"⭐ Mais feita: {mais_feita_titulo}\n"
-            f"📅 Última: {ultima_titulo}\n"
+            f"Tens {resumo.total} receitas feitas recentes:\n\n"
+            f"⭐ Mais feita: {resumo.mais_feita_titulo}\n"
+            f"📅 Última: {resumo.ultima_titulo}\n"
         )
         dispatcher.utter_message(
             text=msg,
@@ -856,51 +687,39 @@ class ActionMostrarRecentesResumo(Action):
         )
         return []
     
-class ActionMostrarRecentesTodas(Action):
+class ActionMostrarRecentesTodas(AcaoAssincrona):
     def name(self) -> Text:
         return "action_mostrar_recentes_todas"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        rows = _ler_csv_dicts("recentes.csv")
-        if not rows:      
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        historico = obter_historico()
+        cursor = tracker.get_slot("cursor_pagina")
+        # O cursor (botão "Página seguinte") só vale para este pedido
+        eventos = [SlotSet("cursor_pagina", None)] if cursor else []
+
+        # Total e avaliações vêm do resumo mantido a cada registo
+        resumo = historico.resumo_recentes(tracker.sender_id)
+        if resumo.total == 0:
             dispatcher.utter_message(
                 text="Ainda não tenho receitas recentes registadas 🙂",
                 buttons=[{"title": "⬅️ Listar recentes", "payload": "/listar_recentes"}],
             )
-            return []
-
-        # Carregar avaliações
-        avaliacoes = _carregar_avaliacoes_recentes()
-        
-        # Ordenar por data desc (mais recentes primeiro)
-        rows.sort(key=lambda x: (x.get("data_finalizacao", "") or ""), reverse=True)
-
-        # Carregar dataset completo para ir buscar detalhes por id
-        todas = carregar_receitas()
-        por_id = {r.get("id", ""): r for r in todas if r.get("id", "")}
+            return eventos
 
-        # Converter recentes.csv -> lista de receitas (do dataset) com avaliação
-        recentes_receitas = []
-        for row in rows:
-            rid = (row.get("id", "") or "").strip()
-            if rid and rid in por_id:
-                receita = por_id[rid].copy()
-                # Adicionar a avaliação do utilizador ao objeto da receita
-                receita['avaliacao_utilizador'] = avaliacoes.get(rid, "")
-                recentes_receitas.append(receita)
+        # Só as linhas desta página (mais recentes primeiro), com os detalhes pelo índice do catálogo
+        recentes_receitas, seguinte = _pagina_do_historico(
+            lambda n, c: historico.pagina_recentes(tracker.sender_id, n, c), PAGINA_RECENTES, cursor
+        )
 
         if not recentes_receitas:
             dispatcher.utter_message(
                 text="Tens receitas recentes registadas, mas não consegui encontrá-las no recipes.csv 😕",
                 buttons=[{"title": "⬅️ Voltar", "payload": "/listar_recentes"}],
             )
-            return []
-
-        # Limitar a 10 receitas (ajusta se quiseres mais)
-        recentes_receitas = recentes_receitas[:10]
+            return eventos
 
         # ✅ CONSTRUIR MENSAGEM COM AVALIAÇÃO DO UTILIZADOR
-        msg = f"Tens {len(rows)} receitas feitas recentes:\n\n"
+        msg = f"Tens {resumo.total} receitas feitas recentes:\n\n"
         buttons = []
 
         for i, receita in enumerate(recentes_receitas, 1):
@@ -913,9 +732,9 @@ class ActionMostrarRecentesTodas(Action):
             elif "difícil" in dificuldade_lower:
                 emoji = "😤"
 
-            # Obter avaliação do utilizador
-            avaliacao = receita.get('avaliacao_utilizador', '')
-            if avaliacao and avaliacao != 'None' and avaliacao != 'null':
+            # Obter avaliação do utilizador (a última que deu a esta receita)
+            avaliacao = resumo.avaliacao_de(receita.get('id', ''))
+            if avaliacao:
                 linha_avaliacao = f" | ⭐ {avaliacao}"
             else:
                 linha_avaliacao = " | ⭐ Não avaliou"
@@ -929,39 +748,31 @@ class ActionMostrarRecentesTodas(Action):
             })
 
         # Botões de navegação
+        if seguinte:
+            buttons.append(_botao_pagina_seguinte("recentes_ver_todas", seguinte))
         buttons.append({"title": "⬅️ Listar recentes", "payload": "/listar_recentes"})
         buttons.append({"title": "🔄 Nova busca", "payload": "/nova_busca"})
 
         dispatcher.utter_message(text=msg, buttons=buttons)
 
-        # ✅ CRÍTICO: Guardar no slot para /ver_receita funcionar
-        # IMPORTANTE: Não guardar a avaliação no slot para não interferir com outras ações
-        receitas_sem_avaliacao = [{k: v for k, v in r.items() if k != 'avaliacao_utilizador'} for r in recentes_receitas]
-        return [SlotSet("receitas_encontradas", receitas_sem_avaliacao)]
+        # ✅ CRÍTICO: Guardar no slot para /ver_receita funcionar (só as receitas desta página)
+        # (a avaliação não vai para o slot, fica só na mensagem)
+        return eventos + [SlotSet("receitas_encontradas", _receitas_para_slot(recentes_receitas))]
         
-class ActionMostrarRecentesPorCategoria(Action):
+class ActionMostrarRecentesPorCategoria(AcaoAssincrona):
     def name(self) -> Text:
         return "action_mostrar_recentes_por_categoria"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        rows = _ler_csv_dicts("recentes.csv")
-        if not rows:
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        resumo = obter_historico().resumo_recentes(tracker.sender_id)
+        if resumo.total == 0:
             dispatcher.utter_message(text="Ainda não tenho receitas recentes registadas 🙂")
             return []
 
-        # Contagens por categoria (baseadas no CSV)
-        count_entrada = 0
-        count_prato_principal = 0
-        count_sobremesa = 0
-
-        for r in rows:
-            cat = (r.get("categoria", "") or "").strip().lower()
-            if "entrada" in cat:
-                count_entrada += 1
-            elif "prato principal" in cat or "prato_principal" in cat:
-                count_prato_principal += 1
-            elif "sobremesa" in cat:
-                count_sobremesa += 1
+        # Contagens por categoria (mantidas a cada registo)
+        count_entrada = resumo.por_categoria["entrada"]
+        count_prato_principal = resumo.por_categoria["prato_principal"]
+        count_sobremesa = resumo.por_categoria["sobremesa"]
 
         msg = "🗂️ Recentes por categoria:\n\nEscolhe uma categoria:"
 
@@ -977,20 +788,20 @@ class ActionMostrarRecentesPorCategoria(Action):
         return []
 
 
-class ActionMostrarRecentesFiltradosPorCategoria(Action):
+class ActionMostrarRecentesFiltradosPorCategoria(AcaoAssincrona):
     def name(self) -> Text:
         return "action_mostrar_recentes_filtrados_por_categoria"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
         categoria_slot = (tracker.get_slot("categoria") or "").strip().lower()
 
-        rows = _ler_csv_dicts("recentes.csv")
+        rows = obter_historico().listar_recentes(tracker.sender_id)
         if not rows:
             dispatcher.utter_message(text="Ainda não tenho receitas recentes registadas 🙂")
             return []
 
-        # Carregar avaliações
-        avaliacoes = _carregar_avaliacoes_recentes()
+        # Avaliações a partir das mesmas linhas (vale a última de cada id)
+        avaliacoes = _avaliacoes_recentes(rows)
 
         def match_categoria(cat: str) -> bool:
             c = (cat or "").strip().lower()
@@ -1025,18 +836,8 @@ class ActionMostrarRecentesFiltradosPorCategoria(Action):
         # ordenar por data desc (mais recentes primeiro)
         filtradas_rows.sort(key=lambda x: (x.get("data_finalizacao", "") or ""), reverse=True)
 
-        # Carregar receitas completas e mapear por id
-        todas = carregar_receitas()
-        por_id = {r.get("id", ""): r for r in todas if r.get("id", "")}
-
-        receitas = []
-        for row in filtradas_rows:
-            rid = (row.get("id", "") or "").strip()
-            if rid and rid in por_id:
-                receita = por_id[rid].copy()
-                # Adicionar a avaliação do utilizador ao objeto da receita
-                receita['avaliacao_utilizador'] = avaliacoes.get(rid, "")
-                receitas.append(receita)
+        # Detalhes de cada id pelo índice do catálogo (limitado a 5, como nos favoritos — ajusta se quiseres)
+        receitas = _receitas_do_historico(filtradas_rows, limite=5)
 
         if not receitas:
             dispatcher.utter_message(
@@ -1045,9 +846,6 @@ class ActionMostrarRecentesFiltradosPorCategoria(Action):
             )
             return []
 
-        # Limitar a 5 (como exemplo dos favoritos) — ajusta se quiseres
-        receitas = receitas[:5]
-
         msg = f"Tens {len(filtradas_rows)} receitas feitas recentes (**{nome_cat}**):\n\n"
         buttons = []
 
@@ -1062,7 +860,7 @@ class ActionMostrarRecentesFiltradosPorCategoria(Action):
                 emoji = "😤"
 
             # Obter avaliação do utilizador
-            avaliacao = receita.get('avaliacao_utilizador', '')
+            avaliacao = avaliacoes.get(receita.get('id', ''), '')
             if avaliacao and avaliacao != 'None' and avaliacao != 'null':
                 linha_avaliacao = f" | ⭐ {avaliacao}"
             else:
@@ -1082,42 +880,34 @@ class ActionMostrarRecentesFiltradosPorCategoria(Action):
         dispatcher.utter_message(text=msg, buttons=buttons)
 
         # ✅ guardar para o /ver_receita funcionar como sempre
-        # Remover a avaliação do objeto para não interferir com outras ações
-        receitas_sem_avaliacao = [{k: v for k, v in r.items() if k != 'avaliacao_utilizador'} for r in receitas]
-        return [SlotSet("receitas_encontradas", receitas_sem_avaliacao)]
+        return [SlotSet("receitas_encontradas", _receitas_para_slot(receitas))]
 
-class ActionMostrarFavoritosLista(Action):
+class ActionMostrarFavoritosLista(AcaoAssincrona):
     def name(self) -> Text:
         return "action_mostrar_favoritos_lista"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        fav_rows = _ler_csv_dicts("favoritos.csv")
-        if not fav_rows:
-            dispatcher.utter_message(text="Ainda não tens receitas guardadas nos favoritos 🙂")
-            return []
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        historico = obter_historico()
+        cursor = tracker.get_slot("cursor_pagina")
+        # O cursor (botão "Página seguinte") só vale para este pedido
+        eventos = [SlotSet("cursor_pagina", None)] if cursor else []
 
-        # Ordenar por data desc (favoritos mais recentes primeiro)
-        fav_rows.sort(key=lambda x: (x.get("data_favorito", "") or ""), reverse=True)
-
-        # Carregar dataset completo para ir buscar detalhes por id
-        todas = carregar_receitas()
-        por_id = {r.get("id", ""): r for r in todas if r.get("id", "")}
+        total = historico.contar_favoritos(tracker.sender_id)
+        if total == 0:
+            dispatcher.utter_message(text="Ainda não tens receitas guardadas nos favoritos 🙂")
+            return eventos
 
-        favoritos_receitas = []
-        for row in fav_rows:
-            rid = (row.get("id", "") or "").strip()
-            if rid and rid in por_id:
-                favoritos_receitas.append(por_id[rid])
+        # Só os favoritos desta página (mais recentes primeiro), com os detalhes pelo índice do catálogo
+        favoritos_receitas, seguinte = _pagina_do_historico(
+            lambda n, c: historico.pagina_favoritos(tracker.sender_id, n, c), PAGINA_FAVORITOS, cursor
+        )
 
         if not favoritos_receitas:
             dispatcher.utter_message(text="Tens favoritos guardados, mas não consegui encontrá-los no recipes.csv 😕")
-            return []
-
-        # Limitar a 5 (como no teu exemplo). Se quiseres mais, muda aqui.
-        favoritos_receitas = favoritos_receitas[:5]
+            return eventos
 
         # Construir mensagem no mesmo formato do ActionMostrarReceitas
-        msg = f"Tens {len(fav_rows)} receitas guardadas nos favoritos:\n\n"
+        msg = f"Tens {total} receitas guardadas nos favoritos:\n\n"
         buttons = []
 
         for i, receita in enumerate(favoritos_receitas, 1):
@@ -1139,20 +929,22 @@ class ActionMostrarFavoritosLista(Action):
             })
 
         # Botões extra como pediste
+        if seguinte:
+            buttons.append(_botao_pagina_seguinte("listar_favoritos", seguinte))
         buttons.append({"title": "🗂️ Por categoria", "payload": "/favoritos_por_categoria"})
         buttons.append({"title": "🔄 Nova busca", "payload": "/nova_busca"})
 
         dispatcher.utter_message(text=msg, buttons=buttons)
 
         # ✅ IMPORTANTÍSSIMO: guardar no slot para o fluxo /ver_receita funcionar igual
-        return [SlotSet("receitas_encontradas", favoritos_receitas)]
+        return eventos + [SlotSet("receitas_encontradas", _receitas_para_slot(favoritos_receitas))]
 
-class ActionMostrarFavoritosPorCategoria(Action):
+class ActionMostrarFavoritosPorCategoria(AcaoAssincrona):
     def name(self) -> Text:
         return "action_mostrar_favoritos_por_categoria"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        rows = _ler_csv_dicts("favoritos.csv")
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        rows = obter_historico().listar_favoritos(tracker.sender_id)
         if not rows:
             dispatcher.utter_message(text="Ainda não tens favoritos 🙂")
             return []
@@ -1186,28 +978,20 @@ class ActionMostrarFavoritosPorCategoria(Action):
         return []
 
 
-class ActionMostrarFavoritosFiltradosPorCategoria(Action):
+class ActionMostrarFavoritosFiltradosPorCategoria(AcaoAssincrona):
     def name(self) -> Text:
         return "action_mostrar_favoritos_filtrados_por_categoria"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
         categoria_slot = (tracker.get_slot("categoria") or "").strip().lower()
 
-        fav_rows = _ler_csv_dicts("favoritos.csv")
+        fav_rows = obter_historico().listar_favoritos(tracker.sender_id)
         if not fav_rows:
             dispatcher.utter_message(text="Ainda não tens receitas guardadas nos favoritos 🙂")
             return []
 
-        # Carregar dataset completo para ir buscar detalhes por id
-        todas = carregar_receitas()
-        por_id = {r.get("id", ""): r for r in todas if r.get("id", "")}
-
-        # Converter favoritos.csv -> lista de receitas (do dataset)
-        favoritos_receitas = []
-        for row in fav_rows:
-            rid = (row.get("id", "") or "").strip()
-            if rid and rid in por_id:
-                favoritos_receitas.append(por_id[rid])
+        # Converter favoritos.csv -> lista de receitas (pelo índice por id do catálogo)
+        favoritos_receitas = _receitas_do_historico(fav_rows)
 
         if not favoritos_receitas:
             dispatcher.utter_message(text="Tens favoritos guardados, mas não consegui encontrá-los no recipes.csv 😕")
@@ -1274,22 +1058,28 @@ class ActionMostrarFavoritosFiltradosPorCategoria(Action):
         dispatcher.utter_message(text=msg, buttons=buttons)
 
         # IMPORTANTÍSSIMO: guardar para o /ver_receita funcionar como sempre
-        return [SlotSet("receitas_encontradas", filtradas)]
+        return [SlotSet("receitas_encontradas", _receitas_para_slot(filtradas))]
     
         
-class ActionBuscarPorNome(Action):
+# Peso de uma palavra-chave que só aparece no título com um erro de escrita
+# (tem de ficar acima de 500 para a receita passar o corte final)
+PESO_TITULO_APROXIMADO = 600
+
+
+class ActionBuscarPorNome(AcaoAssincrona):
     def name(self) -> Text:
         return "action_buscar_por_nome"
     
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         nome_receita = tracker.get_slot("nome_receita")
         
         if not nome_receita:
             dispatcher.utter_message(text="Não percebi que receita queres. Podes repetir?")
             return []
 
-        todas_receitas = carregar_receitas()
-        receitas_pontuadas = []
+        cat = catalogo.obter_catalogo()
+        indice = cat.indice_titulos
+        candidatas = []
         nome_busca = nome_receita.lower().strip()
 
         print(f"🔍 BUSCA POR NOME: '{nome_busca}'")
@@ -1300,62 +1090,83 @@ class ActionBuscarPorNome(Action):
         
         print(f"📝 PALAVRAS-CHAVE EXTRAÍDAS: {palavras_chave}")
 
-        for receita in todas_receitas:
-            titulo_receita = receita['titulo'].lower()
+        # Só receitas com pelo menos uma palavra-chave no título podem passar
+        # o corte de score > 500, por isso só essas são pontuadas
+        matches_por_receita = indice.contar_matches(palavras_chave)
+        # Palavras-chave que não aparecem em nenhum título (ex: "bacalhao", "lazanha")
+        # contam com peso menor nas receitas com uma palavra parecida no título
+        aproximados_por_receita = indice.contar_aproximados(palavras_chave)
+
+        # Receitas cujo título começa por cada palavra-chave
+        comecam_por = [set(indice.prefixos.comecam_por(p)) for p in palavras_chave]
+
+        for i in sorted(matches_por_receita.keys() | aproximados_por_receita.keys()):
+            titulo_receita = cat.titulos[i].lower()
             
             score = 0
             
             # 1. TÍTULO - PESO MÁXIMO (95% do score)
-            # matches_titulo = sum(1 for p in palavras_chave if p in titulo_receita)
-            titulo_palavras = re.findall(r'\b\w+\b', titulo_receita)
+            matches_titulo = matches_por_receita[i]
 
-            matches_titulo = sum(1 for p in palavras_chave if p in titulo_palavras)
+            # Peso massivo para matches no título
+            score += matches_titulo * 1000
 
+            # Peso menor para palavras do título escritas com erros
+            score += aproximados_por_receita[i] * PESO_TITULO_APROXIMADO
             
-            if matches_titulo > 0:
-                # Peso massivo para matches no título
-                score += matches_titulo * 1000
-                
+            # Os bónus abaixo são só para matches exatos: um título que só
+            # bate por aproximação não os leva
+            if matches_titulo:
                 # Bónus gigante se o nome exato estiver no título
                 if nome_busca in titulo_receita:
                     score += 5000
-                
+
                 # Bónus extra se o título começar com a palavra-chave
-                for palavra in palavras_chave:
-                    if titulo_receita.startswith(palavra):
+                for comeca in comecam_por:
+                    if i in comeca:
                         score += 2000
-                
-                print(f"  ✅ '{receita['titulo']}' → Score: {score} (matches título: {matches_titulo})")
             
+            print(f"  ✅ '{cat.titulos[i]}' → Score: {score} (matches título: {matches_titulo}, aproximados: {aproximados_por_receita[i]})")
+
+            # Máximo que pode chegar a ter: todas as palavras-chave nos ingredientes
+            limite = score + len(palavras_chave) + (cat.rating[i] * 0.5) - (indice.comprimentos[i] * 0.5)
+            # Só pode passar se tiver match no título (score > 500)
+            if limite > 500:
+                candidatas.append((limite, score, i))
+
+        def pontuar(candidata):
+            _, score, i = candidata
+
             # 2. INGREDIENTES - PESO MÍNIMO (apenas para desempate fino)
-            if matches_titulo > 0:
-                ingredientes_texto = " ".join(receita['ingredientes']).lower()
-                # Remove termos de medição para evitar falsos positivos
-                ingredientes_limpos = re.sub(r'colher(es)?\s*(de\s*)?(sopa|sobremesa|chá|café)', '', ingredientes_texto)
-                matches_ingredientes = sum(1 for p in palavras_chave if p in ingredientes_limpos)
-                score += matches_ingredientes * 1  # Peso insignificante
+            ingredientes_texto = " ".join(cat.lista_ingredientes(i)).lower()
+            # Remove termos de medição para evitar falsos positivos
+            ingredientes_limpos = re.sub(r'colher(es)?\s*(de\s*)?(sopa|sobremesa|chá|café)', '', ingredientes_texto)
+            matches_ingredientes = sum(1 for p in palavras_chave if p in ingredientes_limpos)
+            score += matches_ingredientes * 1  # Peso insignificante
 
             # 3. Bónus de qualidade (muito pequeno, apenas desempate)
-            score += (receita['rating'] * 0.5)
+            score += (cat.rating[i] * 0.5)
 
             # 4. Penalização de tamanho (favorece títulos mais curtos e precisos)
-            score -= (len(titulo_receita) * 0.5)
+            score -= (indice.comprimentos[i] * 0.5)
 
-            # Só adiciona se tiver match no título (score > 500)
-            if score > 500: 
-                receitas_pontuadas.append((score, receita))
+            return score if score > 500 else None
 
-        print(f"\n📊 TOTAL FILTRADAS: {len(receitas_pontuadas)} receitas")
+        print(f"\n📊 CANDIDATAS: {len(candidatas)} receitas")
 
-        # Ordenar por pontuação
-        receitas_pontuadas.sort(key=lambda x: x[0], reverse=True)
+        # TOP 10 por pontuação (empates pela ordem do CSV). Os ingredientes só são
+        # vistos nas candidatas que ainda podem entrar no top, da maior para a menor
+        melhores = ranking.top_k_com_limite(
+            ranking.por_ordem_decrescente(candidatas, lambda c: c[0]), 10,
+            limite=lambda c: c[0], pontuar=pontuar, desempate=lambda c: c[2],
+        )
         
         # Retorna as TOP 10
-        top_receitas = [r[1] for r in receitas_pontuadas[:10]]  # Top 10 receitas com maior pontuação
+        top_receitas = [cat.receita(c[2]) for _, c in melhores]  # Top 10 receitas com maior pontuação
         
         print(f"🏆 TOP 10 FINAL:")
-        for i, (score, r) in enumerate(receitas_pontuadas[:10], 1):
-            print(f"  {i}. {r['titulo']} (Score: {score:.1f})")
+        for i, (score, c) in enumerate(melhores, 1):
+            print(f"  {i}. {cat.titulos[c[2]]} (Score: {score:.1f})")
 
         if not top_receitas:
             dispatcher.utter_message(
@@ -1365,7 +1176,7 @@ class ActionBuscarPorNome(Action):
             return [SlotSet("nome_receita", None)]
 
         return [
-            SlotSet("receitas_encontradas", top_receitas),
+            SlotSet("receitas_encontradas", _receitas_para_slot(top_receitas)),
             FollowupAction("action_mostrar_receitas")
         ]
 
@@ -0,0 +1,62 @@
+"""Execução das ações fora do event loop do servidor de ações.
+
+O rasa_sdk chama ``Action.run`` dentro do event loop: uma ação síncrona que
+lê o CSV das receitas ou o histórico bloqueia todas as conversas em curso
+enquanto espera pelo disco. ``AcaoAssincrona`` tem um ``run`` assíncrono que
+passa o corpo síncrono da ação (``executar``) para um pool de threads com
+tamanho limitado, e o event loop continua a atender os outros pedidos.
+
+O catálogo (snapshot imutável) e o histórico (locks por ficheiro no CSV, uma
+ligação por thread no SQLite) já podem ser usados por várias threads.
+
+CHEFBOT_ACOES_THREADS muda o tamanho do pool (por omissão 8) e
+CHEFBOT_ACOES_EXECUTOR=0 volta a correr as ações dentro do event loop.
+"""
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Text
+import asyncio
+import functools
+import os
+import threading
+
+from rasa_sdk import Action, Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+USAR_EXECUTOR = os.environ.get("CHEFBOT_ACOES_EXECUTOR", "1") != "0"
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock_executor = threading.Lock()
+
+
+def obter_executor() -> ThreadPoolExecutor:
+    """Pool partilhado por todas as ações (criado no primeiro uso)"""
+    global _executor
+    if _executor is None:
+        with _lock_executor:
+            if _executor is None:
+                threads = int(os.environ.get("CHEFBOT_ACOES_THREADS", "8"))
+                _executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="chefbot-acao")
+    return _executor
+
+
+async def correr_bloqueante(funcao: Callable[..., Any], *args: Any) -> Any:
+    """Corre ``funcao(*args)`` no pool e espera pelo resultado sem bloquear o event loop"""
+    if not USAR_EXECUTOR:
+        return funcao(*args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(obter_executor(), functools.partial(funcao, *args))
+
+
+class AcaoAssincrona(Action, ABC):
+    """Ação com ``run`` assíncrono; as subclasses implementam ``executar`` (síncrono).
+
+    É abstrata para o ActionExecutor do rasa_sdk não a tentar registar como ação.
+    """
+
+    @abstractmethod
+    def executar(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        ...
+
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        return await correr_bloqueante(self.executar, dispatcher, tracker, domain)
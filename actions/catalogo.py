@@ -0,0 +1,451 @@
+"""Catálogo de receitas partilhado por todas as ações.
+
+O CSV é lido uma única vez por processo e mantido em memória, guardado
+por colunas (ver ``Catalogo``) em vez de um dict por receita. Em cada
+acesso comparamos o mtime/tamanho do ficheiro com os da última leitura:
+se o ficheiro mudou, o catálogo é reconstruído por inteiro e só depois
+substitui o anterior, por isso um pedido concorrente vê sempre ou o
+catálogo antigo ou o novo, nunca um catálogo a meio de ser construído.
+
+Se ao lado do CSV existir o catálogo binário gerado pelo ``db/pipeline.py``
+(``recipes.catalogo.bin``, colunas e índices já construídos) e o sha256 nele
+registado coincidir com o do CSV, o ficheiro é mapeado em memória e usado
+diretamente, sem parse nem construção de índices; caso contrário usa-se o
+CSV como sempre.
+"""
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import csv
+import hashlib
+import os
+import re
+import threading
+
+from .indices import IndiceFacetas, IndiceIngredientes, IndiceTitulos
+
+
+def localizar_csv() -> Optional[str]:
+    """Tenta encontrar o ficheiro na raiz ou na pasta db"""
+    caminho_csv = "recipes.csv"
+    if not os.path.exists(caminho_csv):
+        caminho_csv = os.path.join("db", "recipes.csv")
+    if not os.path.exists(caminho_csv):
+        return None
+    return caminho_csv
+
+
+def tempo_para_minutos(tempo_total: str) -> int:
+    """Converte '40 min', '1 h 20 m', etc. para minutos"""
+    tempo_minutos = 0
+    if tempo_total:
+        numeros = re.findall(r'\d+', tempo_total)
+        if numeros:
+            if 'h' in tempo_total.lower():
+                horas = int(numeros[0])
+                minutos = int(numeros[1]) if len(numeros) > 1 else 0
+                tempo_minutos = (horas * 60) + minutos
+            else:
+                tempo_minutos = int(numeros[0])
+    return tempo_minutos
+
+
+def normalizar_linha(row: Dict[str, str]) -> Dict[str, Any]:
+    """Transforma uma linha crua do CSV no objeto de receita usado pelas ações"""
+    # --- 1. TRATAMENTO DE LISTAS (separadas por | no CSV) ---
+    criterios = [c.strip().lower() for c in row.get('criterios', '').split('|')] if row.get('criterios') else []
+    ingredientes = [i.strip() for i in row.get('ingredientes', '').split('|')] if row.get('ingredientes') else []
+    passos = [p.strip() for p in row.get('passos', '').split('|')] if row.get('passos') else []
+
+    # --- 2. TRATAMENTO DE TEMPO (40 min, 1 h 20 m, etc) ---
+    tempo_total = row.get('tempo_total', '').strip()
+    tempo_minutos = tempo_para_minutos(tempo_total)
+
+    # --- 3. TRATAMENTO DE NÚMEROS ---
+    # Calorias (remove "Kcal")
+    calorias_str = row.get('calorias', '0').lower().replace('kcal', '').strip()
+    try:
+        calorias = int(calorias_str)
+    except:
+        calorias = 0
+
+    # Rating
+    rating_str = row.get('rating', '0').replace(',', '.').strip()
+    try:
+        rating = float(rating_str)
+    except:
+        rating = 0.0
+
+    # --- 4. PORÇÕES ---
+    porcoes_str = row.get('porcoes', '0').strip()
+    try:
+        porcoes = int(float(porcoes_str)) if porcoes_str else 0
+    except:
+        porcoes = 0
+
+    return {
+        'id': row.get('id', '').strip(),
+        'titulo': row.get('titulo', '').strip(),
+        'categoria': row.get('categoria', '').strip().lower(),
+        'dificuldade': row.get('dificuldade', '').strip().lower(),
+        'tempo_total': tempo_total,
+        'tempo_minutos': tempo_minutos,
+        'calorias': calorias,
+        'rating': rating,
+        'porcoes': porcoes,
+        'ingredientes': ingredientes,
+        'passos': passos,
+        'criterios': criterios,
+        'imagem': row.get('imagem', '').strip()
+    }
+
+
+CAMPOS = (
+    'id', 'titulo', 'categoria', 'dificuldade', 'tempo_total', 'tempo_minutos',
+    'calorias', 'rating', 'porcoes', 'ingredientes', 'passos', 'criterios', 'imagem',
+)
+
+# Separador das listas dentro da coluna de texto (não aparece no dataset)
+_SEP_LISTA = "\x1f"
+
+
+class ColunaTexto:
+    """Coluna de strings guardada num único bloco UTF-8 com offsets.
+
+    ``blob`` e ``offsets`` podem ser bytes/array ou memoryviews sobre um
+    ficheiro mapeado em memória (ver catalogo_binario.py).
+    """
+    __slots__ = ("_blob", "_offsets")
+
+    def __init__(self, blob: bytes, offsets: Sequence[int]):
+        self._blob = blob
+        self._offsets = offsets
+
+    @property
+    def blob(self):
+        return self._blob
+
+    @property
+    def offsets(self) -> Sequence[int]:
+        return self._offsets
+
+    @classmethod
+    def construir(cls, valores: Iterable[str]) -> "ColunaTexto":
+        partes = []
+        offsets = array('I', [0])
+        total = 0
+        for v in valores:
+            b = v.encode('utf-8')
+            partes.append(b)
+            total += len(b)
+            offsets.append(total)
+        return cls(b"".join(partes), offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]).decode('utf-8')
+
+
+def _juntar_lista(valores: List[str]) -> str:
+    # Cada elemento leva o separador à frente, assim [] e [""] não se confundem
+    return "".join(_SEP_LISTA + v for v in valores)
+
+
+def _separar_lista(texto: str) -> List[str]:
+    return texto.split(_SEP_LISTA)[1:]
+
+
+class _Internador:
+    """Atribui um código pequeno a cada valor distinto (categoria, dificuldade, ...)"""
+
+    def __init__(self):
+        self.tabela: List[Any] = []
+        self._codigos: Dict[Any, int] = {}
+
+    def codigo(self, valor: Any) -> int:
+        c = self._codigos.get(valor)
+        if c is None:
+            c = len(self.tabela)
+            self._codigos[valor] = c
+            self.tabela.append(valor)
+        return c
+
+
+class Catalogo:
+    """Receitas guardadas por colunas.
+
+    Os campos numéricos vivem em arrays tipados, categoria/dificuldade/critérios
+    são códigos para tabelas de valores distintos e o texto fica num bloco por
+    coluna. ``receitas()`` devolve vistas por linha que se comportam como os
+    dicts que as ações sempre usaram.
+    """
+
+    def __init__(self, colunas: Dict[str, Any], tabelas: Dict[str, List[Any]]):
+        self.ids: ColunaTexto = colunas['id']
+        self.titulos: ColunaTexto = colunas['titulo']
+        self.tempos_total: ColunaTexto = colunas['tempo_total']
+        self.imagens: ColunaTexto = colunas['imagem']
+        self.ingredientes: ColunaTexto = colunas['ingredientes']
+        self.passos: ColunaTexto = colunas['passos']
+        self.tempo_minutos: Sequence[int] = colunas['tempo_minutos']
+        self.calorias: Sequence[int] = colunas['calorias']
+        self.porcoes: Sequence[int] = colunas['porcoes']
+        self.rating: Sequence[float] = colunas['rating']
+        self.cod_categoria: Sequence[int] = colunas['categoria']
+        self.cod_dificuldade: Sequence[int] = colunas['dificuldade']
+        self.cod_criterios: Sequence[int] = colunas['criterios']
+        self.tabela_categorias: List[str] = tabelas['categoria']
+        self.tabela_dificuldades: List[str] = tabelas['dificuldade']
+        self.tabela_criterios: List[Tuple[str, ...]] = tabelas['criterios']
+        self._vistas: Optional[List["ReceitaView"]] = None
+        self._posicao_por_id: Optional[Dict[str, int]] = None
+        # Índices de pesquisa, preenchidos por construir_catalogo()
+        self.facetas: Optional[IndiceFacetas] = None
+        self.indice_ingredientes: Optional[IndiceIngredientes] = None
+        self.indice_titulos: Optional[IndiceTitulos] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def categoria(self, i: int) -> str:
+        return self.tabela_categorias[self.cod_categoria[i]]
+
+    def dificuldade(self, i: int) -> str:
+        return self.tabela_dificuldades[self.cod_dificuldade[i]]
+
+    def criterios(self, i: int) -> Tuple[str, ...]:
+        return self.tabela_criterios[self.cod_criterios[i]]
+
+    def lista_ingredientes(self, i: int) -> List[str]:
+        return _separar_lista(self.ingredientes[i])
+
+    def lista_passos(self, i: int) -> List[str]:
+        return _separar_lista(self.passos[i])
+
+    def receita(self, i: int) -> "ReceitaView":
+        return ReceitaView(self, i)
+
+    def posicao_do_id(self, receita_id: str) -> Optional[int]:
+        """Índice da receita com este id (ou None)"""
+        posicoes = self._posicao_por_id
+        if posicoes is None:
+            # Só no primeiro uso, para o catálogo mapeado não o construir no arranque
+            # (dois pedidos em simultâneo podem construí-lo os dois: o resultado é igual)
+            posicoes = self._posicao_por_id = {self.ids[i]: i for i in range(len(self.ids))}
+        return posicoes.get(receita_id.strip())
+
+    def receita_por_id(self, receita_id: str) -> Optional["ReceitaView"]:
+        i = self.posicao_do_id(receita_id)
+        return None if i is None else ReceitaView(self, i)
+
+    def receitas(self) -> List["ReceitaView"]:
+        """Uma vista por receita, pela ordem do CSV (criada uma vez e partilhada)"""
+        vistas = self._vistas
+        if vistas is None:
+            vistas = [ReceitaView(self, i) for i in range(len(self))]
+            self._vistas = vistas
+        return vistas
+
+
+_LEITORES = {
+    'id': lambda c, i: c.ids[i],
+    'titulo': lambda c, i: c.titulos[i],
+    'categoria': Catalogo.categoria,
+    'dificuldade': Catalogo.dificuldade,
+    'tempo_total': lambda c, i: c.tempos_total[i],
+    'tempo_minutos': lambda c, i: c.tempo_minutos[i],
+    'calorias': lambda c, i: c.calorias[i],
+    'rating': lambda c, i: c.rating[i],
+    'porcoes': lambda c, i: c.porcoes[i],
+    'ingredientes': Catalogo.lista_ingredientes,
+    'passos': Catalogo.lista_passos,
+    'criterios': lambda c, i: list(c.criterios(i)),
+    'imagem': lambda c, i: c.imagens[i],
+}
+
+
+class ReceitaView(Mapping):
+    """Vista só de leitura sobre uma linha do catálogo, com a interface de um dict.
+
+    Cada acesso a uma lista devolve uma lista nova, por isso quem a alterar
+    não mexe no catálogo. Para guardar num slot usar ``dict(vista)``.
+    """
+    __slots__ = ("_catalogo", "indice")
+
+    def __init__(self, catalogo: Catalogo, indice: int):
+        self._catalogo = catalogo
+        self.indice = indice
+
+    def __getitem__(self, campo: str) -> Any:
+        try:
+            leitor = _LEITORES[campo]
+        except KeyError:
+            raise KeyError(campo) from None
+        return leitor(self._catalogo, self.indice)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(CAMPOS)
+
+    def __len__(self) -> int:
+        return len(CAMPOS)
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def __repr__(self) -> str:
+        return f"ReceitaView({self.indice}, {self['titulo']!r})"
+
+
+def construir_catalogo(receitas: Iterable[Dict[str, Any]]) -> Catalogo:
+    """Constrói um catálogo colunar a partir de receitas já normalizadas"""
+    texto = {campo: [] for campo in ('id', 'titulo', 'tempo_total', 'imagem', 'ingredientes', 'passos')}
+    numeros = {
+        'tempo_minutos': array('i'),
+        'calorias': array('i'),
+        'porcoes': array('i'),
+        'rating': array('d'),
+    }
+    internadores = {campo: _Internador() for campo in ('categoria', 'dificuldade', 'criterios')}
+    codigos = {campo: array('H') for campo in internadores}
+
+    for r in receitas:
+        for campo in ('id', 'titulo', 'tempo_total', 'imagem'):
+            texto[campo].append(r[campo])
+        texto['ingredientes'].append(_juntar_lista(r['ingredientes']))
+        texto['passos'].append(_juntar_lista(r['passos']))
+        for campo, col in numeros.items():
+            col.append(r[campo])
+        codigos['categoria'].append(internadores['categoria'].codigo(r['categoria']))
+        codigos['dificuldade'].append(internadores['dificuldade'].codigo(r['dificuldade']))
+        codigos['criterios'].append(internadores['criterios'].codigo(tuple(r['criterios'])))
+
+    colunas: Dict[str, Any] = {campo: ColunaTexto.construir(v) for campo, v in texto.items()}
+    colunas.update(numeros)
+    colunas.update(codigos)
+    tabelas = {campo: i.tabela for campo, i in internadores.items()}
+    catalogo = Catalogo(colunas, tabelas)
+    catalogo.facetas = IndiceFacetas.construir(catalogo)
+    catalogo.indice_ingredientes = IndiceIngredientes.construir(catalogo)
+    catalogo.indice_titulos = IndiceTitulos.construir(catalogo)
+    return catalogo
+
+
+def ler_catalogo_csv(caminho_csv: str) -> Catalogo:
+    """Lê e normaliza todas as receitas do CSV (sem cache)"""
+    try:
+        with open(caminho_csv, 'r', encoding='utf-8-sig') as file:
+            reader = csv.DictReader(file, delimiter=';')
+            reader.fieldnames = [name.strip() for name in reader.fieldnames]
+            # As linhas são convertidas uma a uma: nunca existe a lista de dicts inteira
+            catalogo = construir_catalogo(normalizar_linha(row) for row in reader)
+
+        print(f"✅ Sucesso: {len(catalogo)} receitas carregadas do teu dataset.")
+        return catalogo
+
+    except Exception as e:
+        print(f"❌ Erro ao ler CSV: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+    return construir_catalogo([])
+
+
+# --- Catálogo binário pré-construído (gerado pelo db/pipeline.py) ---
+
+def caminho_artefacto(caminho_csv: str) -> str:
+    """recipes.csv -> recipes.catalogo.bin (na mesma pasta)"""
+    return os.path.splitext(caminho_csv)[0] + ".catalogo.bin"
+
+
+def assinatura_conteudo(caminho: str) -> Dict[str, Any]:
+    """Tamanho e sha256 do ficheiro (não depende do mtime, que muda num git clone)"""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return {"tamanho": os.path.getsize(caminho), "sha256": h.hexdigest()}
+
+
+def ler_catalogo(caminho_csv: str) -> Catalogo:
+    """Usa o catálogo binário quando está atualizado; senão lê o CSV"""
+    # Import tardio: catalogo_binario precisa das classes deste módulo
+    from .catalogo_binario import abrir_catalogo
+
+    catalogo = abrir_catalogo(caminho_artefacto(caminho_csv), caminho_csv)
+    if catalogo is None:
+        catalogo = ler_catalogo_csv(caminho_csv)
+    return catalogo
+
+
+def _assinatura_ficheiro(caminho: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(caminho)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _assinatura(caminho_csv: str) -> Tuple[Optional[Tuple[int, int]], ...]:
+    """(mtime, tamanho) do CSV e do artefacto — muda sempre que um deles é reescrito"""
+    return (_assinatura_ficheiro(caminho_csv), _assinatura_ficheiro(caminho_artefacto(caminho_csv)))
+
+
+class _Snapshot:
+    """Versão imutável do catálogo: nunca é alterada depois de publicada"""
+    __slots__ = ("caminho", "assinatura", "catalogo")
+
+    def __init__(self, caminho: str, assinatura: Tuple[Optional[Tuple[int, int]], ...], catalogo: Catalogo):
+        self.caminho = caminho
+        self.assinatura = assinatura
+        self.catalogo = catalogo
+
+
+_snapshot: Optional[_Snapshot] = None
+_lock_recarga = threading.Lock()
+
+
+_CATALOGO_VAZIO = construir_catalogo([])
+
+
+def obter_catalogo() -> Catalogo:
+    """Devolve o catálogo em cache, recarregando se o CSV mudou no disco"""
+    global _snapshot
+
+    caminho_csv = localizar_csv()
+    if caminho_csv is None:
+        print(f"❌ ERRO CRÍTICO: Não encontrei 'recipes.csv'.")
+        return _CATALOGO_VAZIO
+
+    snap = _snapshot
+    assinatura = _assinatura(caminho_csv)
+    if snap is not None and snap.caminho == caminho_csv and snap.assinatura == assinatura:
+        return snap.catalogo
+
+    with _lock_recarga:
+        # Outro pedido pode ter recarregado enquanto esperávamos pelo lock
+        snap = _snapshot
+        if snap is not None and snap.caminho == caminho_csv and snap.assinatura == assinatura:
+            return snap.catalogo
+
+        catalogo = ler_catalogo(caminho_csv)
+        # Publicação atómica: uma única atribuição troca o catálogo inteiro
+        _snapshot = _Snapshot(caminho_csv, assinatura, catalogo)
+        return catalogo
+
+
+def obter_receitas() -> List[ReceitaView]:
+    """Vistas (tipo dict, só de leitura) de todas as receitas do catálogo em cache.
+
+    A lista devolvida é partilhada entre pedidos: quem precisar de a
+    alterar deve trabalhar sobre uma cópia.
+    """
+    return obter_catalogo().receitas()
+
+
+def invalidar():
+    """Força a releitura do CSV no próximo acesso"""
+    global _snapshot
+    with _lock_recarga:
+        _snapshot = None
@@ -0,0 +1,314 @@
+"""Catálogo binário pré-construído, lido com mmap.
+
+O ``db/pipeline.py`` escreve ``recipes.catalogo.bin`` com as colunas do
+catálogo e os índices de pesquisa (facetas, ingredientes, títulos) já
+construídos. No arranque o servidor de ações mapeia o ficheiro em memória
+e monta o ``Catalogo`` por cima de memoryviews: não há parse do CSV nem
+construção de índices, e vários processos de ações partilham as mesmas
+páginas do ficheiro. Por processo só se criam os dicionários pequenos; os
+mapas chave -> posição (ids, termos das tabelas) só são construídos no
+primeiro uso.
+
+Formato (tudo little-endian)::
+
+    b"CHEFCAT\\0"  u32 tamanho do cabeçalho  cabeçalho JSON  (alinhamento a 8)  secções...
+
+O cabeçalho tem o sha256 do recipes.csv de onde o catálogo veio, as tabelas
+pequenas (categorias, dificuldades, critérios, chaves das facetas) e, para
+cada secção, ``[offset, tamanho, typecode]`` relativos ao início das secções.
+"""
+from array import array
+from collections.abc import Mapping
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import json
+import mmap
+import os
+import struct
+import sys
+
+from .catalogo import Catalogo, ColunaTexto, assinatura_conteudo
+from .indices import (
+    IndiceFacetas, IndiceIngredientes, IndiceTitulos, PrefixosTitulo, VocabularioAproximado,
+)
+
+
+MAGIA = b"CHEFCAT\0"
+VERSAO = 1
+_ALINHAMENTO = 8
+
+# typecodes usados nas secções; o leitor confirma que têm o mesmo tamanho nesta máquina
+_TIPOS = {t: array(t).itemsize for t in "BHIid"}
+
+_COLUNAS_TEXTO = ('id', 'titulo', 'tempo_total', 'imagem', 'ingredientes', 'passos')
+_COLUNAS_NUMERICAS = {
+    'tempo_minutos': 'i', 'calorias': 'i', 'porcoes': 'i', 'rating': 'd',
+    'categoria': 'H', 'dificuldade': 'H', 'criterios': 'H',
+}
+_GRUPOS_FACETAS = ('por_categoria', 'por_dificuldade', 'por_criterio', 'por_tempo', 'por_calorias')
+
+
+class TabelaMapeada(Mapping):
+    """Mapa str -> lista de inteiros guardado em arrays planos.
+
+    As chaves ficam ordenadas numa ``ColunaTexto`` e os valores num único
+    array: o valor da chave ``k`` é ``valores[inicios[k]:inicios[k + 1]]``,
+    opcionalmente passado por ``converter`` (ex.: índices -> palavras). Ao
+    abrir o ficheiro nada é copiado; o dict chave -> posição só é criado no
+    primeiro acesso à tabela (uma pesquisa binária sobre a coluna teria de
+    descodificar uma chave por passo, o que é lento demais para o fuzzy).
+    """
+    __slots__ = ("_chaves", "_inicios", "_valores", "_converter", "_posicoes")
+
+    def __init__(
+        self,
+        chaves: ColunaTexto,
+        inicios: Sequence[int],
+        valores: Sequence[int],
+        converter: Optional[Callable[[Sequence[int]], Any]] = None,
+    ):
+        self._chaves = chaves
+        self._inicios = inicios
+        self._valores = valores
+        self._converter = converter
+        self._posicoes: Optional[Dict[str, int]] = None
+
+    @staticmethod
+    def serializar(dados: Dict[str, Iterable[int]]) -> Tuple[ColunaTexto, array, array]:
+        chaves = sorted(dados)
+        inicios = array('I', [0])
+        valores = array('I')
+        for c in chaves:
+            valores.extend(dados[c])
+            inicios.append(len(valores))
+        return ColunaTexto.construir(chaves), inicios, valores
+
+    def _posicao(self, chave: Any) -> int:
+        posicoes = self._posicoes
+        if posicoes is None:
+            # Dois pedidos em simultâneo podem construí-lo os dois: o resultado é igual
+            posicoes = self._posicoes = {self._chaves[k]: k for k in range(len(self._chaves))}
+        return posicoes.get(chave, -1)
+
+    def __getitem__(self, chave: str) -> Any:
+        k = self._posicao(chave)
+        if k < 0:
+            raise KeyError(chave)
+        fatia = self._valores[self._inicios[k]:self._inicios[k + 1]]
+        return fatia if self._converter is None else self._converter(fatia)
+
+    def __contains__(self, chave: Any) -> bool:
+        return self._posicao(chave) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._chaves[k] for k in range(len(self._chaves)))
+
+    def __len__(self) -> int:
+        return len(self._chaves)
+
+
+# --- escrita ---
+
+class _Seccoes:
+    def __init__(self):
+        self.partes: List[Tuple[str, memoryview, str]] = []
+
+    def juntar(self, nome: str, dados: Any, tipo: str):
+        self.partes.append((nome, memoryview(dados).cast('B'), tipo))
+
+    def texto(self, nome: str, coluna: ColunaTexto):
+        self.juntar(nome + ".blob", coluna.blob, 'B')
+        self.juntar(nome + ".offsets", array('I', coluna.offsets), 'I')
+
+    def tabela(self, nome: str, dados: Dict[str, Iterable[int]]):
+        chaves, inicios, valores = TabelaMapeada.serializar(dados)
+        self.texto(nome + ".chaves", chaves)
+        self.juntar(nome + ".inicios", inicios, 'I')
+        self.juntar(nome + ".valores", valores, 'I')
+
+
+def _alinhar(n: int) -> int:
+    return -n % _ALINHAMENTO
+
+
+def escrever_catalogo(catalogo: Catalogo, f: BinaryIO, assinatura_csv: Dict[str, Any]):
+    """Escreve o catálogo (colunas + índices) no ficheiro binário aberto ``f``"""
+    n = len(catalogo)
+    seccoes = _Seccoes()
+
+    colunas_texto = {
+        'id': catalogo.ids, 'titulo': catalogo.titulos, 'tempo_total': catalogo.tempos_total,
+        'imagem': catalogo.imagens, 'ingredientes': catalogo.ingredientes, 'passos': catalogo.passos,
+    }
+    for nome in _COLUNAS_TEXTO:
+        seccoes.texto("coluna." + nome, colunas_texto[nome])
+    colunas_numericas = {
+        'tempo_minutos': catalogo.tempo_minutos, 'calorias': catalogo.calorias,
+        'porcoes': catalogo.porcoes, 'rating': catalogo.rating, 'categoria': catalogo.cod_categoria,
+        'dificuldade': catalogo.cod_dificuldade, 'criterios': catalogo.cod_criterios,
+    }
+    for nome, tipo in _COLUNAS_NUMERICAS.items():
+        seccoes.juntar("coluna." + nome, array(tipo, colunas_numericas[nome]), tipo)
+
+    # Facetas: um bitset de n bits por valor, todos com o mesmo tamanho
+    facetas = catalogo.facetas
+    bytes_bitset = (n + 7) // 8
+    chaves_facetas = {}
+    seccoes.juntar("facetas.ordem_rating", array('I', facetas.ordem_rating), 'I')
+    for grupo in _GRUPOS_FACETAS:
+        bitsets = getattr(facetas, grupo)
+        chaves_facetas[grupo] = list(bitsets)
+        dados = b"".join(b.to_bytes(bytes_bitset, 'little') for b in bitsets.values())
+        seccoes.juntar("facetas." + grupo, dados, 'B')
+
+    seccoes.tabela("ingredientes", catalogo.indice_ingredientes.postings)
+
+    titulos = catalogo.indice_titulos
+    seccoes.tabela("titulos", titulos.postings)
+    seccoes.texto("titulos.prefixos", ColunaTexto.construir(titulos.prefixos.palavras))
+    seccoes.juntar("titulos.prefixos.receitas", array('I', titulos.prefixos.receitas), 'I')
+    seccoes.juntar("titulos.comprimentos", array('I', titulos.comprimentos), 'I')
+
+    # Dicionário de remoções: os valores são índices nas palavras normalizadas
+    # (ordenadas) e as formas originais são índices nas chaves dos postings
+    aproximado = titulos.aproximado
+    normalizadas = sorted(aproximado.originais)
+    posicao_normalizada = {p: k for k, p in enumerate(normalizadas)}
+    posicao_termo = {t: k for k, t in enumerate(sorted(titulos.postings))}
+    seccoes.tabela("titulos.remocoes", {
+        v: [posicao_normalizada[p] for p in lista] for v, lista in aproximado.remocoes.items()
+    })
+    seccoes.tabela("titulos.originais", {
+        p: [posicao_termo[o] for o in lista] for p, lista in aproximado.originais.items()
+    })
+
+    indice_seccoes = {}
+    offset = 0
+    for nome, dados, tipo in seccoes.partes:
+        indice_seccoes[nome] = [offset, len(dados), tipo]
+        offset += len(dados) + _alinhar(len(dados))
+
+    cabecalho = json.dumps({
+        "versao": VERSAO,
+        "ordem_bytes": "little",
+        "tipos": _TIPOS,
+        "csv": assinatura_csv,
+        "receitas": n,
+        "tabelas": {
+            "categoria": catalogo.tabela_categorias,
+            "dificuldade": catalogo.tabela_dificuldades,
+            "criterios": catalogo.tabela_criterios,
+        },
+        "facetas": chaves_facetas,
+        "max_distancia": aproximado.max_distancia,
+        "seccoes": indice_seccoes,
+    }, ensure_ascii=False).encode('utf-8')
+
+    inicio = len(MAGIA) + 4 + len(cabecalho)
+    f.write(MAGIA)
+    f.write(struct.pack('<I', len(cabecalho)))
+    f.write(cabecalho)
+    f.write(b"\0" * _alinhar(inicio))
+    for _, dados, _ in seccoes.partes:
+        f.write(dados)
+        f.write(b"\0" * _alinhar(len(dados)))
+
+
+# --- leitura ---
+
+def _ler_cabecalho(f: BinaryIO) -> Optional[Tuple[Dict[str, Any], int]]:
+    inicio = f.read(len(MAGIA) + 4)
+    if len(inicio) < len(MAGIA) + 4 or inicio[:len(MAGIA)] != MAGIA:
+        return None
+    (tamanho,) = struct.unpack('<I', inicio[len(MAGIA):])
+    cabecalho = json.loads(f.read(tamanho).decode('utf-8'))
+    fim = len(MAGIA) + 4 + tamanho
+    return cabecalho, fim + _alinhar(fim)
+
+
+def abrir_catalogo(caminho: str, caminho_csv: str) -> Optional[Catalogo]:
+    """Catálogo mapeado a partir do ficheiro binário, ou None se não existir ou estiver desatualizado"""
+    try:
+        with open(caminho, 'rb') as f:
+            lido = _ler_cabecalho(f)
+            if lido is None:
+                print(f"⚠️ {caminho} não é um catálogo binário, a ler o CSV.")
+                return None
+            cabecalho, inicio = lido
+            if (cabecalho.get("versao") != VERSAO or cabecalho.get("ordem_bytes") != sys.byteorder
+                    or cabecalho.get("tipos") != _TIPOS):
+                print(f"⚠️ {caminho} foi gerado noutro formato ou máquina, a ler o CSV.")
+                return None
+            # O tamanho chega para rejeitar quase tudo sem ler o CSV
+            registado = cabecalho.get("csv") or {}
+            if registado.get("tamanho") != os.path.getsize(caminho_csv) or registado != assinatura_conteudo(caminho_csv):
+                print(f"⚠️ {caminho} está desatualizado (corre o db/pipeline.py), a ler o CSV.")
+                return None
+            # O mapa continua válido depois de fechar o ficheiro
+            mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        catalogo = _montar(cabecalho, memoryview(mapa)[inicio:])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError, struct.error) as e:
+        print(f"⚠️ Catálogo binário {caminho} ignorado: {e}")
+        return None
+
+    print(f"✅ Sucesso: {len(catalogo)} receitas carregadas do teu dataset (catálogo binário).")
+    return catalogo
+
+
+def _montar(cabecalho: Dict[str, Any], dados: memoryview) -> Catalogo:
+    seccoes = cabecalho["seccoes"]
+    n = cabecalho["receitas"]
+
+    def seccao(nome: str) -> memoryview:
+        offset, tamanho, tipo = seccoes[nome]
+        if offset + tamanho > len(dados):
+            raise ValueError(f"secção {nome} fora do ficheiro")
+        return dados[offset:offset + tamanho].cast(tipo)
+
+    def texto(nome: str) -> ColunaTexto:
+        return ColunaTexto(seccao(nome + ".blob"), seccao(nome + ".offsets"))
+
+    def tabela(nome: str, converter=None) -> TabelaMapeada:
+        return TabelaMapeada(texto(nome + ".chaves"), seccao(nome + ".inicios"), seccao(nome + ".valores"), converter)
+
+    colunas: Dict[str, Any] = {nome: texto("coluna." + nome) for nome in _COLUNAS_TEXTO}
+    for nome in _COLUNAS_NUMERICAS:
+        colunas[nome] = seccao("coluna." + nome)
+    for nome, coluna in colunas.items():
+        if len(coluna) != n:
+            raise ValueError(f"coluna {nome} com {len(coluna)} valores em vez de {n}")
+    tabelas = cabecalho["tabelas"]
+    catalogo = Catalogo(colunas, {
+        "categoria": tabelas["categoria"],
+        "dificuldade": tabelas["dificuldade"],
+        "criterios": [tuple(c) for c in tabelas["criterios"]],
+    })
+
+    bytes_bitset = (n + 7) // 8
+    grupos = {}
+    for grupo in _GRUPOS_FACETAS:
+        bloco = seccao("facetas." + grupo)
+        grupos[grupo] = {
+            chave: int.from_bytes(bloco[k * bytes_bitset:(k + 1) * bytes_bitset], 'little')
+            for k, chave in enumerate(cabecalho["facetas"][grupo])
+        }
+    catalogo.facetas = IndiceFacetas(seccao("facetas.ordem_rating"), **grupos)
+
+    catalogo.indice_ingredientes = IndiceIngredientes(tabela("ingredientes"))
+
+    postings = tabela("titulos")
+    termos = texto("titulos.chaves")
+    normalizadas = texto("titulos.originais.chaves")
+    aproximado = VocabularioAproximado(
+        tabela("titulos.remocoes", lambda fatia: [normalizadas[k] for k in fatia]),
+        tabela("titulos.originais", lambda fatia: [termos[k] for k in fatia]),
+        cabecalho["max_distancia"],
+    )
+    catalogo.indice_titulos = IndiceTitulos(
+        postings,
+        PrefixosTitulo(texto("titulos.prefixos"), seccao("titulos.prefixos.receitas")),
+        seccao("titulos.comprimentos"),
+        aproximado,
+    )
+    return catalogo
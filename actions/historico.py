@@ -0,0 +1,841 @@
+"""Persistência dos favoritos e das receitas feitas (recentes).
+
+As ações falam só com ``obter_historico()``; o motor de armazenamento é
+escolhido pela variável de ambiente ``CHEFBOT_HISTORICO``:
+
+* ``csv`` (omissão) — um favoritos.csv e um recentes.csv por utilizador,
+  em ``CHEFBOT_HISTORICO_DIR/<utilizador>/`` (omissão: historico/);
+* ``sqlite`` — uma base SQLite (modo WAL) com índices por (utilizador, id
+  de receita) e (utilizador, data), em ``CHEFBOT_HISTORICO_DB``
+  (omissão: historico.db).
+
+O utilizador é o ``sender_id`` do tracker: cada operação só lê as linhas
+desse utilizador. As linhas circulam sempre como dicts de strings, tal como
+vinham do ``csv.DictReader``, por isso as ações não sabem qual motor está ativo.
+
+As contagens do resumo das receitas feitas (``AgregadosRecentes``) são
+mantidas a cada registo em vez de recalculadas a partir do histórico todo.
+
+Os favoritos.csv/recentes.csv globais de versões anteriores podem ser
+atribuídos a um utilizador (por omissão ``UTILIZADOR_LEGADO``):
+
+    python -m actions.historico atribuir [utilizador]            # motor CSV
+    python -m actions.historico migrar [historico.db] [utilizador]  # para SQLite
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import csv
+import hashlib
+import heapq
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# sender_id que o ChefBot.html envia; é a quem pertencem os dados gravados
+# antes de o histórico ser separado por utilizador
+UTILIZADOR_LEGADO = "user"
+
+
+CABECALHO_RECENTES = [
+    "data_finalizacao",
+    "id",
+    "titulo", "categoria", "dificuldade", "tempo_total", "tempo_minutos",
+    "calorias", "rating_dataset",
+    "criterios", "ingredientes", "passos",
+    "avaliacao_utilizador",
+]
+
+CABECALHO_FAVORITOS = [
+    "data_favorito",
+    "id",
+    "titulo", "categoria", "dificuldade", "tempo_total", "tempo_minutos",
+    "calorias", "rating_dataset",
+    "criterios", "ingredientes", "passos",
+]
+
+
+class ArmazenamentoHistorico(ABC):
+    """Interface comum aos motores de armazenamento.
+
+    É abstrata para um motor incompleto falhar logo ao ser criado, e não a
+    meio de uma conversa.
+    """
+
+    @abstractmethod
+    def esta_nos_favoritos(self, utilizador: str, receita_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def adicionar_favorito(self, utilizador: str, linha: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def remover_favorito(self, utilizador: str, receita_id: str) -> bool:
+        """Remove todas as entradas da receita; devolve False se não existia"""
+        ...
+
+    @abstractmethod
+    def listar_favoritos(self, utilizador: str) -> List[Dict[str, str]]:
+        """Favoritos do utilizador pela ordem em que foram guardados"""
+        ...
+
+    @abstractmethod
+    def registar_recente(self, utilizador: str, linha: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def listar_recentes(self, utilizador: str) -> List[Dict[str, str]]:
+        """Receitas feitas pelo utilizador, pela ordem em que foram registadas"""
+        ...
+
+    def resumo_recentes(self, utilizador: str) -> "AgregadosRecentes":
+        """Contagens das receitas feitas (os motores guardam-nas e atualizam-nas a cada registo)"""
+        return AgregadosRecentes.de_linhas(self.listar_recentes(utilizador))
+
+    def pagina_recentes(self, utilizador: str, limite: int, cursor: Optional[str] = None) -> List[Tuple[str, Dict[str, str]]]:
+        """Até ``limite`` receitas feitas, da mais recente para a mais antiga, a seguir a ``cursor``.
+
+        Cada linha vem com o seu cursor: a página seguinte pede-se com o da última.
+        """
+        return paginar(self.listar_recentes(utilizador), "data_finalizacao", limite, cursor)
+
+    def pagina_favoritos(self, utilizador: str, limite: int, cursor: Optional[str] = None) -> List[Tuple[str, Dict[str, str]]]:
+        """Como pagina_recentes, para os favoritos (pela data em que foram guardados)"""
+        return paginar(self.listar_favoritos(utilizador), "data_favorito", limite, cursor)
+
+    def contar_favoritos(self, utilizador: str) -> int:
+        return len(self.listar_favoritos(utilizador))
+
+
+def _valores(linha: Dict[str, Any], cabecalho: List[str]) -> List[str]:
+    return ["" if linha.get(c) is None else str(linha.get(c)) for c in cabecalho]
+
+
+def _como_gravada(linha: Dict[str, Any], cabecalho: List[str]) -> Dict[str, str]:
+    """A linha tal como volta a ser lida do armazenamento (só strings, só as colunas do cabeçalho)"""
+    return dict(zip(cabecalho, _valores(linha, cabecalho)))
+
+
+def _cursor(data: str, posicao: int) -> str:
+    return f"{posicao}:{data}"
+
+
+def ler_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    """(data, posição) de um cursor de página; None se vier vazio ou estragado"""
+    try:
+        posicao, data = str(cursor).split(":", 1)
+        return data, int(posicao)
+    except (TypeError, ValueError):
+        return None
+
+
+def _cursor_por_id(data: str, receita_id: str, vez: int) -> str:
+    return f"{data}|{receita_id}|{vez}"
+
+
+def ler_cursor_por_id(cursor: Optional[str]) -> Optional[Tuple[str, str, int]]:
+    """(data, id, vez) de um cursor do paginar; None se vier vazio ou estragado"""
+    try:
+        data, receita_id, vez = str(cursor).rsplit("|", 2)
+        return data, receita_id, int(vez)
+    except (TypeError, ValueError):
+        return None
+
+
+def paginar(linhas: Iterable[Dict[str, str]], coluna: str, limite: int,
+            cursor: Optional[str] = None) -> List[Tuple[str, Dict[str, str]]]:
+    """Uma página de ``linhas`` (pela ordem em que foram gravadas), por ``coluna`` decrescente.
+
+    Em datas iguais fica primeiro a gravada primeiro (a ordem de um sort estável).
+    As linhas são percorridas uma vez e só as ``limite`` da página ficam em memória.
+
+    O cursor é a (data, id, vez) da última linha mostrada, em que ``vez`` conta as
+    linhas anteriores com a mesma data e o mesmo id. Ao contrário da posição no
+    ficheiro, não muda quando se removem outras receitas. Se a própria linha do
+    cursor tiver sido removida, as que têm a mesma data voltam todas: pode
+    repetir-se uma receita, mas nenhuma é saltada.
+    """
+    if limite <= 0:
+        return []
+    inicio = ler_cursor_por_id(cursor) if cursor else None
+    heap: List[Tuple[str, int, Dict[str, str]]] = []   # (data, -ordem, linha), a raiz é a pior
+    mesma_data: List[Tuple[int, Dict[str, str]]] = []   # (vez, linha) com a data do cursor, depois dele
+    vezes_mesma_data: Dict[str, int] = {}
+    encontrado = False
+    for ordem, linha in enumerate(linhas):
+        data = linha.get(coluna, "") or ""
+        if inicio is not None:
+            data_cursor, id_cursor, vez_cursor = inicio
+            if data > data_cursor:
+                continue
+            if data == data_cursor:
+                rid = (linha.get("id", "") or "").strip()
+                vez = vezes_mesma_data.get(rid, 0)
+                vezes_mesma_data[rid] = vez + 1
+                if not encontrado and rid == id_cursor and vez == vez_cursor:
+                    encontrado = True
+                    mesma_data.clear()   # as anteriores já saíram nas páginas de trás
+                elif len(mesma_data) < limite:
+                    mesma_data.append((vez, linha))
+                continue
+        entrada = (data, -ordem, linha)
+        if len(heap) < limite:
+            heapq.heappush(heap, entrada)
+        elif entrada[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entrada)
+
+    heap.sort(key=lambda e: e[:2], reverse=True)
+    pagina = [(_cursor_por_id(linha.get(coluna, "") or "", (linha.get("id", "") or "").strip(), vez), linha)
+              for vez, linha in mesma_data]
+    # Fora da data do cursor, as linhas anteriores com a mesma (data, id) ficam acima
+    # na ordem, por isso estão nesta página: a ``vez`` conta-se aqui mesmo
+    vezes: Dict[Tuple[str, str], int] = {}
+    for data, _, linha in heap[:limite - len(pagina)]:
+        chave = (data, (linha.get("id", "") or "").strip())
+        vez = vezes.get(chave, 0)
+        vezes[chave] = vez + 1
+        pagina.append((_cursor_por_id(data, chave[1], vez), linha))
+    return pagina
+
+
+def avaliacao_limpa(valor: Optional[str]) -> str:
+    """Avaliação gravada sem aspas; "" se não houver (linhas antigas têm "None" ou "null")"""
+    avaliacao = (valor or "").strip().replace('"', '').replace("'", "").strip()
+    return "" if avaliacao in ("None", "null") else avaliacao
+
+
+CATEGORIAS_RESUMO = ("entrada", "prato_principal", "sobremesa")
+
+
+def categoria_do_resumo(categoria: str) -> Optional[str]:
+    """Em qual das categorias do resumo cai a categoria de uma receita (None = nenhuma)"""
+    cat = (categoria or "").strip().lower()
+    if "entrada" in cat:
+        return "entrada"
+    if "prato principal" in cat or "prato_principal" in cat:
+        return "prato_principal"
+    if "sobremesa" in cat:
+        return "sobremesa"
+    return None
+
+
+class AgregadosRecentes:
+    """Contagens das receitas feitas por um utilizador, mantidas a cada registo.
+
+    Com isto o resumo e as contagens por categoria não precisam de reler o
+    histórico todo: o tamanho depende do número de receitas diferentes, não do
+    número de vezes que foram feitas. ``acrescentar`` dá sempre o mesmo
+    resultado que ``de_linhas`` sobre o histórico completo.
+    """
+
+    # Muda quando o formato guardado muda; resumos de outra versão são recalculados
+    VERSAO = 2
+
+    def __init__(self):
+        self.total = 0
+        # id -> [vezes, primeiro título não vazio, ordem da primeira vez, última avaliação dada]
+        self.por_receita: Dict[str, List[Any]] = {}
+        self.mais_feita = ""
+        self.ultima_data: Optional[str] = None
+        self.ultima_titulo = ""
+        self.por_categoria = {c: 0 for c in CATEGORIAS_RESUMO}
+        self.avaliacoes = 0
+        self.soma_avaliacoes = 0
+
+    @classmethod
+    def de_linhas(cls, linhas: List[Dict[str, str]]) -> "AgregadosRecentes":
+        agregados = cls()
+        for linha in linhas:
+            agregados.acrescentar(linha)
+        return agregados
+
+    def acrescentar(self, linha: Dict[str, str]) -> None:
+        rid = (linha.get("id", "") or "").strip()
+        titulo = (linha.get("titulo", "") or "").strip()
+        avaliacao = avaliacao_limpa(linha.get("avaliacao_utilizador", ""))
+        if rid:
+            entrada = self.por_receita.get(rid)
+            if entrada is None:
+                entrada = self.por_receita[rid] = [0, "", len(self.por_receita), ""]
+            entrada[0] += 1
+            if not entrada[1] and titulo:
+                entrada[1] = titulo
+            # Registos sem avaliação não apagam a anterior
+            if avaliacao:
+                entrada[3] = avaliacao
+            # Em caso de empate fica a que foi feita primeiro (como o max() sobre as contagens)
+            atual = self.por_receita.get(self.mais_feita)
+            if atual is None or entrada[0] > atual[0] or (entrada[0] == atual[0] and entrada[2] < atual[2]):
+                self.mais_feita = rid
+
+        # Última pela data; em caso de empate fica a primeira registada
+        data = linha.get("data_finalizacao", "") or ""
+        if self.ultima_data is None or data > self.ultima_data:
+            self.ultima_data = data
+            self.ultima_titulo = (linha.get("titulo", "") or "—").strip()
+
+        categoria = categoria_do_resumo(linha.get("categoria", ""))
+        if categoria is not None:
+            self.por_categoria[categoria] += 1
+
+        if avaliacao.replace(".", "", 1).isdigit():
+            self.avaliacoes += 1
+            self.soma_avaliacoes += float(avaliacao)
+
+        self.total += 1
+
+    @property
+    def mais_feita_titulo(self) -> str:
+        entrada = self.por_receita.get(self.mais_feita)
+        return entrada[1] if entrada and entrada[1] else "—"
+
+    @property
+    def media_avaliacoes(self) -> Optional[float]:
+        return self.soma_avaliacoes / self.avaliacoes if self.avaliacoes else None
+
+    def avaliacao_de(self, receita_id: str) -> str:
+        """Última avaliação que o utilizador deu à receita ("" se nunca a avaliou)"""
+        entrada = self.por_receita.get(receita_id)
+        return entrada[3] if entrada else ""
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            "versao": self.VERSAO, "total": self.total, "por_receita": self.por_receita, "mais_feita": self.mais_feita,
+            "ultima_data": self.ultima_data, "ultima_titulo": self.ultima_titulo,
+            "por_categoria": self.por_categoria,
+            "avaliacoes": self.avaliacoes, "soma_avaliacoes": self.soma_avaliacoes,
+        }
+
+    @classmethod
+    def de_dict(cls, dados: Dict[str, Any]) -> Optional["AgregadosRecentes"]:
+        """None se o resumo foi guardado noutro formato (quem chama recalcula-o)"""
+        if dados.get("versao") != cls.VERSAO:
+            return None
+        agregados = cls()
+        for chave, valor in dados.items():
+            if hasattr(agregados, chave):
+                setattr(agregados, chave, valor)
+        return agregados
+
+
+class BloqueioFicheiro:
+    """Lock exclusivo sobre um ficheiro CSV, entre threads e entre processos.
+
+    O lock é tirado num ficheiro ``<csv>.lock`` à parte (o CSV em si pode ser
+    substituído por os.replace enquanto alguém espera), com flock em POSIX e
+    msvcrt.locking em Windows. Várias instâncias do servidor de ações (ou
+    vários pedidos concorrentes no mesmo processo) ficam assim em fila.
+    """
+
+    _locks_locais: Dict[str, threading.Lock] = {}
+    _guarda = threading.Lock()
+
+    def __init__(self, caminho: str):
+        self.caminho_lock = os.path.abspath(caminho) + ".lock"
+        with BloqueioFicheiro._guarda:
+            self._local = BloqueioFicheiro._locks_locais.setdefault(self.caminho_lock, threading.Lock())
+        self._f = None
+
+    def __enter__(self):
+        self._local.acquire()
+        try:
+            os.makedirs(os.path.dirname(self.caminho_lock), exist_ok=True)
+            self._f = open(self.caminho_lock, "a+")
+            if fcntl is not None:
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_EX)
+            else:
+                self._f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self._f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue   # LK_LOCK desiste ao fim de ~10s; voltamos a tentar
+        except BaseException:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+            self._local.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+            else:
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._f.close()
+            self._f = None
+            self._local.release()
+
+
+def substituir_atomicamente(caminho: str, escrever) -> None:
+    """Escreve um ficheiro temporário na mesma pasta e troca-o pelo original com os.replace.
+
+    Quem lê vê sempre o ficheiro antigo inteiro ou o novo inteiro, e um crash a
+    meio deixa o original intacto.
+    """
+    pasta = os.path.dirname(caminho) or "."
+    fd, temporario = tempfile.mkstemp(dir=pasta, prefix=".tmp-", suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8-sig", newline="") as f:
+            escrever(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+_RE_NOME_SEGURO = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def pasta_do_utilizador(utilizador: str) -> str:
+    """Nome de pasta para o utilizador: o próprio sender_id se for seguro, senão um hash"""
+    utilizador = str(utilizador or "")
+    if _RE_NOME_SEGURO.fullmatch(utilizador):
+        return utilizador
+    return "h-" + hashlib.sha1(utilizador.encode("utf-8")).hexdigest()
+
+
+class ArmazenamentoCSV(ArmazenamentoHistorico):
+    """Favoritos e recentes em CSV (separador ';'), um par de ficheiros por utilizador.
+
+    Todas as leituras e escritas de um ficheiro passam pelo seu BloqueioFicheiro
+    e as reescritas (remover favorito) são feitas com substituir_atomicamente.
+
+    Os AgregadosRecentes ficam num recentes.resumo.json ao lado do recentes.csv,
+    atualizado com o lock do CSV. Guarda o (mtime, tamanho) do CSV: se o CSV
+    mudar por outra via (versões anteriores, edição à mão) é recalculado.
+    """
+
+    def __init__(self, pasta: str = "historico"):
+        self.pasta = pasta
+
+    def caminho_favoritos(self, utilizador: str) -> str:
+        return os.path.join(self.pasta, pasta_do_utilizador(utilizador), "favoritos.csv")
+
+    def caminho_recentes(self, utilizador: str) -> str:
+        return os.path.join(self.pasta, pasta_do_utilizador(utilizador), "recentes.csv")
+
+    def caminho_resumo_recentes(self, utilizador: str) -> str:
+        return os.path.join(self.pasta, pasta_do_utilizador(utilizador), "recentes.resumo.json")
+
+    @staticmethod
+    def _garantir_csv_com_header(caminho: str, header: List[str]):
+        existe = os.path.exists(caminho)
+        if not existe:
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            with open(caminho, "w", encoding="utf-8-sig", newline="") as f:
+                writer = csv.writer(f, delimiter=";")
+                writer.writerow(header)
+
+    @staticmethod
+    def _ler_csv_dicts(caminho: str) -> List[Dict[str, str]]:
+        if not os.path.exists(caminho):
+            return []
+        with open(caminho, "r", encoding="utf-8-sig", newline="") as f:
+            return list(csv.DictReader(f, delimiter=";"))
+
+    def _ler(self, caminho: str) -> List[Dict[str, str]]:
+        if not os.path.exists(caminho):
+            return []
+        with BloqueioFicheiro(caminho):
+            return self._ler_csv_dicts(caminho)
+
+    def _acrescentar_sem_lock(self, caminho: str, cabecalho: List[str], linha: Dict[str, Any]):
+        self._garantir_csv_com_header(caminho, cabecalho)
+        with open(caminho, "a", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(_valores(linha, cabecalho))
+
+    def _acrescentar(self, caminho: str, cabecalho: List[str], linha: Dict[str, Any]):
+        with BloqueioFicheiro(caminho):
+            self._acrescentar_sem_lock(caminho, cabecalho, linha)
+
+    @staticmethod
+    def _assinatura(caminho: str) -> List[int]:
+        estado = os.stat(caminho)
+        return [estado.st_mtime_ns, estado.st_size]
+
+    def _ler_resumo(self, utilizador: str, caminho: str) -> Optional[AgregadosRecentes]:
+        """Resumo guardado, se ainda corresponder ao recentes.csv (chamar com o lock do CSV)"""
+        try:
+            with open(self.caminho_resumo_recentes(utilizador), "r", encoding="utf-8-sig") as f:
+                dados = json.load(f)
+            if dados.get("recentes") != self._assinatura(caminho):
+                return None
+            return AgregadosRecentes.de_dict(dados["agregados"])
+        except (OSError, ValueError, KeyError, AttributeError):
+            return None
+
+    def _gravar_resumo(self, utilizador: str, caminho: str, agregados: AgregadosRecentes):
+        dados = {"recentes": self._assinatura(caminho), "agregados": agregados.como_dict()}
+        substituir_atomicamente(
+            self.caminho_resumo_recentes(utilizador), lambda f: json.dump(dados, f, ensure_ascii=False)
+        )
+
+    def esta_nos_favoritos(self, utilizador: str, receita_id: str) -> bool:
+        caminho = self.caminho_favoritos(utilizador)
+        if not receita_id or not os.path.exists(caminho):
+            return False
+        try:
+            with BloqueioFicheiro(caminho), open(caminho, "r", encoding="utf-8-sig", newline="") as f:
+                reader = csv.DictReader(f, delimiter=";")
+                for row in reader:
+                    if (row.get("id", "") or "").strip() == receita_id.strip():
+                        return True
+        except:
+            return False
+        return False
+
+    def adicionar_favorito(self, utilizador: str, linha: Dict[str, Any]) -> None:
+        self._acrescentar(self.caminho_favoritos(utilizador), CABECALHO_FAVORITOS, linha)
+
+    def remover_favorito(self, utilizador: str, receita_id: str) -> bool:
+        caminho = self.caminho_favoritos(utilizador)
+        if not receita_id or not os.path.exists(caminho):
+            return False
+        try:
+            # Ler, filtrar e reescrever com o lock na mão: nenhum append se perde pelo meio
+            with BloqueioFicheiro(caminho):
+                rows = self._ler_csv_dicts(caminho)
+
+                if not rows:
+                    return False
+
+                rid = receita_id.strip()
+                novas = [r for r in rows if (r.get("id", "") or "").strip() != rid]
+
+                if len(novas) == len(rows):
+                    return False
+
+                def escrever(f):
+                    writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()), delimiter=";")
+                    writer.writeheader()
+                    writer.writerows(novas)
+
+                substituir_atomicamente(caminho, escrever)
+
+            return True
+        except:
+            return False
+
+    def listar_favoritos(self, utilizador: str) -> List[Dict[str, str]]:
+        return self._ler(self.caminho_favoritos(utilizador))
+
+    def _pagina(self, caminho: str, coluna: str, limite: int, cursor: Optional[str]) -> List[Tuple[str, Dict[str, str]]]:
+        """Percorre o CSV em streaming (com o lock): só as linhas da página ficam em memória"""
+        if not os.path.exists(caminho):
+            return []
+        with BloqueioFicheiro(caminho), open(caminho, "r", encoding="utf-8-sig", newline="") as f:
+            return paginar(csv.DictReader(f, delimiter=";"), coluna, limite, cursor)
+
+    def pagina_favoritos(self, utilizador: str, limite: int, cursor: Optional[str] = None) -> List[Tuple[str, Dict[str, str]]]:
+        return self._pagina(self.caminho_favoritos(utilizador), "data_favorito", limite, cursor)
+
+    def contar_favoritos(self, utilizador: str) -> int:
+        caminho = self.caminho_favoritos(utilizador)
+        if not os.path.exists(caminho):
+            return 0
+        with BloqueioFicheiro(caminho), open(caminho, "r", encoding="utf-8-sig", newline="") as f:
+            return sum(1 for _ in csv.DictReader(f, delimiter=";"))
+
+    def registar_recente(self, utilizador: str, linha: Dict[str, Any]) -> None:
+        caminho = self.caminho_recentes(utilizador)
+        with BloqueioFicheiro(caminho):
+            agregados = self._ler_resumo(utilizador, caminho) if os.path.exists(caminho) else AgregadosRecentes()
+            self._acrescentar_sem_lock(caminho, CABECALHO_RECENTES, linha)
+            if agregados is None:
+                agregados = AgregadosRecentes.de_linhas(self._ler_csv_dicts(caminho))
+            else:
+                agregados.acrescentar(_como_gravada(linha, CABECALHO_RECENTES))
+            self._gravar_resumo(utilizador, caminho, agregados)
+
+    def listar_recentes(self, utilizador: str) -> List[Dict[str, str]]:
+        return self._ler(self.caminho_recentes(utilizador))
+
+    def pagina_recentes(self, utilizador: str, limite: int, cursor: Optional[str] = None) -> List[Tuple[str, Dict[str, str]]]:
+        return self._pagina(self.caminho_recentes(utilizador), "data_finalizacao", limite, cursor)
+
+    def resumo_recentes(self, utilizador: str) -> AgregadosRecentes:
+        caminho = self.caminho_recentes(utilizador)
+        if not os.path.exists(caminho):
+            return AgregadosRecentes()
+        with BloqueioFicheiro(caminho):
+            agregados = self._ler_resumo(utilizador, caminho)
+            if agregados is None:
+                # Histórico sem resumo (ou alterado por fora): recalcula uma vez e guarda
+                agregados = AgregadosRecentes.de_linhas(self._ler_csv_dicts(caminho))
+                self._gravar_resumo(utilizador, caminho, agregados)
+        return agregados
+
+    def atribuir_legado(
+        self,
+        utilizador: str = UTILIZADOR_LEGADO,
+        caminho_favoritos: str = "favoritos.csv",
+        caminho_recentes: str = "recentes.csv",
+    ) -> List[str]:
+        """Move os CSV globais antigos para a pasta do utilizador (se ele ainda não tiver os seus)"""
+        movidos = []
+        for origem, destino in (
+            (caminho_favoritos, self.caminho_favoritos(utilizador)),
+            (caminho_recentes, self.caminho_recentes(utilizador)),
+        ):
+            if not os.path.exists(origem):
+                continue
+            if os.path.exists(destino):
+                raise RuntimeError(f"{destino} já existe; não vou sobrescrever.")
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            os.replace(origem, destino)
+            movidos.append(destino)
+        return movidos
+
+
+def _colunas_sql(cabecalho: List[str]) -> str:
+    return ", ".join(f'"{c}" TEXT NOT NULL DEFAULT \'\'' for c in cabecalho)
+
+
+_ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS favoritos (utilizador TEXT NOT NULL, {_colunas_sql(CABECALHO_FAVORITOS)});
+CREATE INDEX IF NOT EXISTS favoritos_utilizador_id ON favoritos (utilizador, id);
+CREATE INDEX IF NOT EXISTS favoritos_utilizador_data ON favoritos (utilizador, data_favorito);
+CREATE TABLE IF NOT EXISTS recentes (utilizador TEXT NOT NULL, {_colunas_sql(CABECALHO_RECENTES)});
+CREATE INDEX IF NOT EXISTS recentes_utilizador_id ON recentes (utilizador, id);
+CREATE INDEX IF NOT EXISTS recentes_utilizador_data ON recentes (utilizador, data_finalizacao);
+CREATE TABLE IF NOT EXISTS recentes_resumo (utilizador TEXT PRIMARY KEY, agregados TEXT NOT NULL);
+"""
+
+# Bases criadas antes da separação por utilizador: as linhas existentes
+# passam a pertencer ao UTILIZADOR_LEGADO
+_ATUALIZAR_SEM_UTILIZADOR = f"""
+ALTER TABLE favoritos ADD COLUMN utilizador TEXT NOT NULL DEFAULT '{UTILIZADOR_LEGADO}';
+ALTER TABLE recentes ADD COLUMN utilizador TEXT NOT NULL DEFAULT '{UTILIZADOR_LEGADO}';
+DROP INDEX IF EXISTS favoritos_id;
+DROP INDEX IF EXISTS recentes_id;
+DROP INDEX IF EXISTS recentes_data;
+"""
+
+
+class ArmazenamentoSQLite(ArmazenamentoHistorico):
+    """Favoritos e recentes numa base SQLite em modo WAL.
+
+    Cada thread usa a sua ligação; cada escrita é uma transação, por isso
+    vários workers podem escrever ao mesmo tempo sem corromper nada. Os
+    AgregadosRecentes de cada utilizador ficam na tabela recentes_resumo e
+    são atualizados na mesma transação que regista a receita.
+    """
+
+    def __init__(self, caminho: str = "historico.db"):
+        self.caminho = caminho
+        self._local = threading.local()
+        con = self._ligacao()
+        colunas = {r[1] for r in con.execute("PRAGMA table_info(favoritos)")}
+        if colunas and "utilizador" not in colunas:
+            con.executescript(_ATUALIZAR_SEM_UTILIZADOR)
+        con.executescript(_ESQUEMA)
+
+    def _ligacao(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.caminho, timeout=30)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    @staticmethod
+    def _inserir(con: sqlite3.Connection, tabela: str, cabecalho: List[str], utilizador: str, linhas: List[Dict[str, Any]]):
+        colunas = ", ".join(f'"{c}"' for c in cabecalho)
+        marcas = ", ".join("?" for _ in cabecalho)
+        con.executemany(
+            f"INSERT INTO {tabela} (utilizador, {colunas}) VALUES (?, {marcas})",
+            [[utilizador] + _valores(l, cabecalho) for l in linhas],
+        )
+
+    def _listar(self, tabela: str, cabecalho: List[str], utilizador: str) -> List[Dict[str, str]]:
+        colunas = ", ".join(f'"{c}"' for c in cabecalho)
+        cur = self._ligacao().execute(
+            f"SELECT {colunas} FROM {tabela} WHERE utilizador = ? ORDER BY rowid", (utilizador,)
+        )
+        return [dict(r) for r in cur]
+
+    def _pagina(self, tabela: str, cabecalho: List[str], coluna: str, utilizador: str,
+                limite: int, cursor: Optional[str]) -> List[Tuple[str, Dict[str, str]]]:
+        """Keyset sobre o índice (utilizador, data): só lê as linhas da página"""
+        colunas = ", ".join(f'"{c}"' for c in cabecalho)
+        sql = f"SELECT rowid AS _posicao, {colunas} FROM {tabela} WHERE utilizador = ?"
+        parametros: List[Any] = [utilizador]
+        inicio = ler_cursor(cursor) if cursor else None
+        if inicio is not None:
+            data, posicao = inicio
+            # O "<=" deixa o SQLite saltar no índice diretamente para o cursor
+            sql += f' AND "{coluna}" <= ? AND ("{coluna}" < ? OR rowid > ?)'
+            parametros += [data, data, posicao]
+        # Em datas iguais, a gravada primeiro (como o sort estável dos outros motores)
+        sql += f' ORDER BY "{coluna}" DESC, rowid ASC LIMIT ?'
+        parametros.append(limite)
+        pagina = []
+        for r in self._ligacao().execute(sql, parametros):
+            linha = dict(r)
+            posicao = linha.pop("_posicao")
+            pagina.append((_cursor(linha[coluna], posicao), linha))
+        return pagina
+
+    def esta_nos_favoritos(self, utilizador: str, receita_id: str) -> bool:
+        if not receita_id:
+            return False
+        cur = self._ligacao().execute(
+            "SELECT 1 FROM favoritos WHERE utilizador = ? AND id = ? LIMIT 1", (utilizador, receita_id.strip())
+        )
+        return cur.fetchone() is not None
+
+    def adicionar_favorito(self, utilizador: str, linha: Dict[str, Any]) -> None:
+        with self._ligacao() as con:
+            self._inserir(con, "favoritos", CABECALHO_FAVORITOS, utilizador, [linha])
+
+    def remover_favorito(self, utilizador: str, receita_id: str) -> bool:
+        if not receita_id:
+            return False
+        with self._ligacao() as con:
+            cur = con.execute(
+                "DELETE FROM favoritos WHERE utilizador = ? AND id = ?", (utilizador, receita_id.strip())
+            )
+        return cur.rowcount > 0
+
+    def listar_favoritos(self, utilizador: str) -> List[Dict[str, str]]:
+        return self._listar("favoritos", CABECALHO_FAVORITOS, utilizador)
+
+    def pagina_favoritos(self, utilizador: str, limite: int, cursor: Optional[str] = None) -> List[Tuple[str, Dict[str, str]]]:
+        return self._pagina("favoritos", CABECALHO_FAVORITOS, "data_favorito", utilizador, limite, cursor)
+
+    def contar_favoritos(self, utilizador: str) -> int:
+        cur = self._ligacao().execute("SELECT COUNT(*) FROM favoritos WHERE utilizador = ?", (utilizador,))
+        return cur.fetchone()[0]
+
+    @staticmethod
+    def _resumo_guardado(con: sqlite3.Connection, utilizador: str) -> Optional[AgregadosRecentes]:
+        row = con.execute("SELECT agregados FROM recentes_resumo WHERE utilizador = ?", (utilizador,)).fetchone()
+        return None if row is None else AgregadosRecentes.de_dict(json.loads(row[0]))
+
+    @staticmethod
+    def _guardar_resumo(con: sqlite3.Connection, utilizador: str, agregados: AgregadosRecentes):
+        con.execute(
+            "INSERT OR REPLACE INTO recentes_resumo (utilizador, agregados) VALUES (?, ?)",
+            (utilizador, json.dumps(agregados.como_dict(), ensure_ascii=False)),
+        )
+
+    def registar_recente(self, utilizador: str, linha: Dict[str, Any]) -> None:
+        with self._ligacao() as con:
+            # O INSERT tira o lock de escrita: ninguém mexe no resumo até ao commit
+            self._inserir(con, "recentes", CABECALHO_RECENTES, utilizador, [linha])
+            agregados = self._resumo_guardado(con, utilizador)
+            if agregados is None:
+                agregados = AgregadosRecentes.de_linhas(self.listar_recentes(utilizador))
+            else:
+                agregados.acrescentar(_como_gravada(linha, CABECALHO_RECENTES))
+            self._guardar_resumo(con, utilizador, agregados)
+
+    def listar_recentes(self, utilizador: str) -> List[Dict[str, str]]:
+        return self._listar("recentes", CABECALHO_RECENTES, utilizador)
+
+    def pagina_recentes(self, utilizador: str, limite: int, cursor: Optional[str] = None) -> List[Tuple[str, Dict[str, str]]]:
+        return self._pagina("recentes", CABECALHO_RECENTES, "data_finalizacao", utilizador, limite, cursor)
+
+    def resumo_recentes(self, utilizador: str) -> AgregadosRecentes:
+        con = self._ligacao()
+        agregados = self._resumo_guardado(con, utilizador)
+        if agregados is None:
+            # Bases anteriores ao resumo: calcula-o uma vez, com o lock de escrita
+            with con:
+                con.execute("BEGIN IMMEDIATE")
+                agregados = self._resumo_guardado(con, utilizador)
+                if agregados is None:
+                    agregados = AgregadosRecentes.de_linhas(self.listar_recentes(utilizador))
+                    self._guardar_resumo(con, utilizador, agregados)
+        return agregados
+
+
+def migrar_csv_para_sqlite(
+    caminho_db: str = "historico.db",
+    utilizador: str = UTILIZADOR_LEGADO,
+    caminho_favoritos: str = "favoritos.csv",
+    caminho_recentes: str = "recentes.csv",
+) -> Dict[str, int]:
+    """Copia os favoritos.csv e recentes.csv globais para a base SQLite, em nome
+    de ``utilizador`` (tudo numa transação).
+
+    Recusa correr se esse utilizador já tiver dados na base, para não duplicar linhas.
+    """
+    destino = ArmazenamentoSQLite(caminho_db)
+    con = destino._ligacao()
+    for tabela in ("favoritos", "recentes"):
+        if con.execute(f"SELECT 1 FROM {tabela} WHERE utilizador = ? LIMIT 1", (utilizador,)).fetchone():
+            raise RuntimeError(f"'{utilizador}' já tem dados em '{tabela}' ({caminho_db}); migração cancelada.")
+
+    favoritos = ArmazenamentoCSV._ler_csv_dicts(caminho_favoritos)
+    recentes = ArmazenamentoCSV._ler_csv_dicts(caminho_recentes)
+    with con:
+        ArmazenamentoSQLite._inserir(con, "favoritos", CABECALHO_FAVORITOS, utilizador, favoritos)
+        ArmazenamentoSQLite._inserir(con, "recentes", CABECALHO_RECENTES, utilizador, recentes)
+        # Um resumo (vazio) calculado antes da migração deixava de bater certo
+        con.execute("DELETE FROM recentes_resumo WHERE utilizador = ?", (utilizador,))
+    return {"favoritos": len(favoritos), "recentes": len(recentes)}
+
+
+_historico: Optional[ArmazenamentoHistorico] = None
+_lock_historico = threading.Lock()
+
+
+def criar_historico(motor: Optional[str] = None) -> ArmazenamentoHistorico:
+    motor = (motor or os.environ.get("CHEFBOT_HISTORICO", "csv")).strip().lower()
+    if motor == "csv":
+        return ArmazenamentoCSV(os.environ.get("CHEFBOT_HISTORICO_DIR", "historico"))
+    if motor == "sqlite":
+        return ArmazenamentoSQLite(os.environ.get("CHEFBOT_HISTORICO_DB", "historico.db"))
+    raise ValueError(f"Motor de histórico desconhecido: {motor!r} (usa 'csv' ou 'sqlite')")
+
+
+def obter_historico() -> ArmazenamentoHistorico:
+    """Motor de armazenamento do processo (criado no primeiro uso)"""
+    global _historico
+    if _historico is None:
+        with _lock_historico:
+            if _historico is None:
+                _historico = criar_historico()
+    return _historico
+
+
+if __name__ == "__main__":
+    comando = sys.argv[1] if len(sys.argv) > 1 else ""
+    if comando == "migrar":
+        destino = sys.argv[2] if len(sys.argv) > 2 else "historico.db"
+        utilizador = sys.argv[3] if len(sys.argv) > 3 else UTILIZADOR_LEGADO
+        n = migrar_csv_para_sqlite(destino, utilizador)
+        print(f"✅ Migrados {n['favoritos']} favoritos e {n['recentes']} recentes de '{utilizador}' para {destino}")
+    elif comando == "atribuir":
+        utilizador = sys.argv[2] if len(sys.argv) > 2 else UTILIZADOR_LEGADO
+        armazenamento = ArmazenamentoCSV(os.environ.get("CHEFBOT_HISTORICO_DIR", "historico"))
+        for caminho in armazenamento.atribuir_legado(utilizador):
+            print(f"✅ {caminho}")
+    else:
+        print("Uso: python -m actions.historico migrar [historico.db] [utilizador]")
+        print("     python -m actions.historico atribuir [utilizador]")
+        sys.exit(1)
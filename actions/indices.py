@@ -0,0 +1,380 @@
+"""Índices construídos sobre o catálogo no momento em que é carregado.
+
+As facetas usam bitsets (inteiros Python) em que o bit ``k`` representa a
+receita que está na posição ``k`` da ordenação por rating (melhor primeiro).
+Uma pesquisa passa a ser um AND entre bitsets e o top-k sai diretamente
+dos bits mais baixos, sem ordenar nada.
+
+Os índices de texto guardam, para cada termo normalizado, a lista ordenada
+dos índices (no catálogo) das receitas onde o termo aparece.
+"""
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+import re
+import unicodedata
+
+from .ranking import primeiros_k
+
+
+# Intervalos (min exclusivo, max inclusivo) usados pelos slots do Rasa
+FAIXAS_TEMPO: Dict[str, Tuple[Optional[int], Optional[int]]] = {
+    "ate_30min": (None, 30),
+    "30_60min": (30, 60),
+    "mais_1h": (60, None),
+}
+
+FAIXAS_CALORIAS: Dict[str, Tuple[Optional[int], Optional[int]]] = {
+    "leve": (None, 300),
+    "moderado": (300, 600),
+    "reforçado": (600, 900),
+    "hipercalorico": (900, None),
+}
+
+
+def _na_faixa(valor: int, faixa: Tuple[Optional[int], Optional[int]]) -> bool:
+    minimo, maximo = faixa
+    if minimo is not None and valor <= minimo:
+        return False
+    if maximo is not None and valor > maximo:
+        return False
+    return True
+
+
+class IndiceFacetas:
+    """Bitsets por categoria, dificuldade, critério, faixa de tempo e de calorias"""
+
+    def __init__(
+        self,
+        ordem_rating: Sequence[int],
+        por_categoria: Dict[str, int],
+        por_dificuldade: Dict[str, int],
+        por_criterio: Dict[str, int],
+        por_tempo: Dict[str, int],
+        por_calorias: Dict[str, int],
+    ):
+        # ordem_rating[k] = índice (no catálogo) da k-ésima melhor receita
+        self.ordem_rating = ordem_rating
+        self.todos = (1 << len(ordem_rating)) - 1
+        self.por_categoria = por_categoria
+        self.por_dificuldade = por_dificuldade
+        self.por_criterio = por_criterio
+        self.por_tempo = por_tempo
+        self.por_calorias = por_calorias
+
+    @classmethod
+    def construir(cls, catalogo) -> "IndiceFacetas":
+        n = len(catalogo)
+        # sort estável: em caso de empate mantém a ordem do CSV, como o list.sort antigo
+        ordem = sorted(range(n), key=lambda i: catalogo.rating[i], reverse=True)
+
+        por_categoria: Dict[str, int] = {}
+        por_dificuldade: Dict[str, int] = {}
+        por_criterio: Dict[str, int] = {}
+        por_tempo = {nome: 0 for nome in FAIXAS_TEMPO}
+        por_calorias = {nome: 0 for nome in FAIXAS_CALORIAS}
+
+        for pos, i in enumerate(ordem):
+            bit = 1 << pos
+            cat = catalogo.categoria(i)
+            por_categoria[cat] = por_categoria.get(cat, 0) | bit
+            dif = catalogo.dificuldade(i)
+            por_dificuldade[dif] = por_dificuldade.get(dif, 0) | bit
+            for crit in catalogo.criterios(i):
+                por_criterio[crit] = por_criterio.get(crit, 0) | bit
+            for nome, faixa in FAIXAS_TEMPO.items():
+                if _na_faixa(catalogo.tempo_minutos[i], faixa):
+                    por_tempo[nome] |= bit
+            for nome, faixa in FAIXAS_CALORIAS.items():
+                if _na_faixa(catalogo.calorias[i], faixa):
+                    por_calorias[nome] |= bit
+
+        return cls(array('I', ordem), por_categoria, por_dificuldade, por_criterio, por_tempo, por_calorias)
+
+    @staticmethod
+    def _unir(tabela: Dict[str, int], aceita: Callable[[str], bool]) -> int:
+        bits = 0
+        for valor, b in tabela.items():
+            if aceita(valor):
+                bits |= b
+        return bits
+
+    def categoria_contem(self, termo: str) -> int:
+        """Receitas cuja categoria contém ``termo``"""
+        return self._unir(self.por_categoria, lambda c: termo in c)
+
+    def dificuldade_em(self, termos: List[str]) -> int:
+        """Receitas cuja dificuldade é exatamente um dos ``termos``"""
+        return self._unir(self.por_dificuldade, lambda d: d in termos)
+
+    def criterio_contem(self, termo: str) -> int:
+        """Receitas com algum critério que contém ``termo``"""
+        return self._unir(self.por_criterio, lambda c: termo in c)
+
+    def por_rating(self, bits: int) -> Iterator[int]:
+        """Índices (no catálogo) das receitas presentes em ``bits``, da melhor para a pior"""
+        while bits:
+            menor = bits & -bits
+            bits ^= menor
+            yield self.ordem_rating[menor.bit_length() - 1]
+
+    def top_k(self, bits: int, k: int, excluir: Optional[Callable[[int], bool]] = None) -> List[int]:
+        """Índices (no catálogo) das ``k`` melhores receitas presentes em ``bits``.
+
+        ``excluir`` é aplicado só às receitas visitadas, por ordem de rating,
+        e a procura pára assim que houver ``k`` resultados.
+        """
+        return primeiros_k(self.por_rating(bits), k, excluir)
+
+
+def normalizar(s: str) -> str:
+    """Remove acentos e passa a minúsculas (igual a normalizar() em db/extract_data.py)"""
+    if not isinstance(s, str):
+        s = str(s)
+    s = s.lower()
+    s = unicodedata.normalize("NFD", s)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return s
+
+
+def singular(termo: str) -> str:
+    """Reduz plurais portugueses comuns ao singular (termo já sem acentos)"""
+    if len(termo) <= 3 or not termo.endswith("s"):
+        return termo
+    if termo.endswith(("oes", "aes")):        # limões, pães
+        return termo[:-3] + "ao"
+    if termo.endswith("ais"):                 # cereais
+        return termo[:-3] + "al"
+    if termo.endswith("eis"):                 # pastéis
+        return termo[:-3] + "el"
+    if termo.endswith(("res", "zes")):        # colheres, nozes
+        return termo[:-2]
+    if termo.endswith("ns"):                  # atuns
+        return termo[:-2] + "m"
+    return termo[:-1]                         # ovos, batatas, tomates
+
+
+# Palavras que não identificam um ingrediente
+_PALAVRAS_VAZIAS = {"de", "da", "do", "das", "dos", "e", "em", "com", "a", "o", "as", "os", "q", "b", "qb"}
+
+_RE_PALAVRA = re.compile(r"[a-z]+")
+
+
+def termos_ingrediente(texto: str) -> List[str]:
+    """Termos indexáveis de um ingrediente: sem acentos, no singular, sem palavras vazias"""
+    return [
+        singular(p)
+        for p in _RE_PALAVRA.findall(normalizar(texto))
+        if p not in _PALAVRAS_VAZIAS and len(p) > 1
+    ]
+
+
+class IndiceIngredientes:
+    """Índice invertido termo de ingrediente -> receitas que o usam"""
+
+    def __init__(self, postings: Mapping[str, Sequence[int]]):
+        self.postings = postings
+
+    @classmethod
+    def construir(cls, catalogo) -> "IndiceIngredientes":
+        listas: Dict[str, array] = {}
+        for i in range(len(catalogo)):
+            termos = set()
+            for ing in catalogo.lista_ingredientes(i):
+                termos.update(termos_ingrediente(ing))
+            for t in termos:
+                lista = listas.get(t)
+                if lista is None:
+                    lista = listas[t] = array('I')
+                lista.append(i)   # i cresce, por isso cada lista fica ordenada
+        return cls(listas)
+
+    def receitas_com(self, ingrediente: str) -> Iterable[int]:
+        """Receitas que têm todos os termos do ingrediente (ex.: 'azeite de oliva')"""
+        termos = set(termos_ingrediente(ingrediente))
+        if not termos:
+            return ()
+        listas = []
+        for t in termos:
+            lista = self.postings.get(t)
+            if lista is None:
+                return ()
+            listas.append(lista)
+        # Interseção a partir da lista mais curta
+        listas.sort(key=len)
+        if len(listas) == 1:
+            return listas[0]
+        comuns = set(listas[0])
+        for lista in listas[1:]:
+            comuns.intersection_update(lista)
+            if not comuns:
+                break
+        return sorted(comuns)
+
+    def contar_matches(self, ingredientes: Iterable[str]) -> Counter:
+        """Para cada receita, quantos dos ``ingredientes`` do utilizador ela usa"""
+        contagens: Counter = Counter()
+        for ing in ingredientes:
+            contagens.update(self.receitas_com(ing))
+        return contagens
+
+
+_RE_PALAVRA_TITULO = re.compile(r'\b\w+\b')
+
+
+class PrefixosTitulo:
+    """Trie de prefixos da primeira palavra de cada título, em forma compacta.
+
+    Em vez de um nó por letra guardamos as primeiras palavras ordenadas: os
+    títulos que começam por um prefixo ocupam um intervalo contíguo, que se
+    encontra com duas pesquisas binárias (a mesma travessia de uma trie).
+    Como as palavras-chave não têm espaços, ``titulo.startswith(p)`` equivale a
+    a primeira palavra do título começar por ``p``.
+    """
+
+    def __init__(self, palavras: Sequence[str], receitas: Sequence[int]):
+        self.palavras = palavras
+        self.receitas = receitas
+
+    @classmethod
+    def construir(cls, titulos_lower: Iterable[str]) -> "PrefixosTitulo":
+        pares = []
+        for i, t in enumerate(titulos_lower):
+            partes = t.split(None, 1)
+            pares.append((partes[0] if partes else "", i))
+        pares.sort()
+        return cls([p for p, _ in pares], array('I', [i for _, i in pares]))
+
+    def comecam_por(self, prefixo: str) -> Sequence[int]:
+        ini = bisect_left(self.palavras, prefixo)
+        fim = bisect_left(self.palavras, prefixo + "\U0010ffff", ini)
+        return self.receitas[ini:fim]
+
+
+def distancia_edicao(a: str, b: str, limite: int) -> int:
+    """Distância de Levenshtein entre ``a`` e ``b``; devolve ``limite + 1`` assim que o ultrapassa"""
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        for j, cb in enumerate(b, 1):
+            atual.append(min(
+                anterior[j] + 1,                # apagar
+                atual[j - 1] + 1,               # inserir
+                anterior[j - 1] + (ca != cb),   # substituir
+            ))
+        if min(atual) > limite:
+            return limite + 1
+        anterior = atual
+    return anterior[-1]
+
+
+def _remocoes(palavra: str, n: int) -> set:
+    """Todas as variantes de ``palavra`` com até ``n`` letras removidas (inclui a própria)"""
+    variantes = {palavra}
+    fronteira = {palavra}
+    for _ in range(n):
+        seguinte = set()
+        for p in fronteira:
+            for i in range(len(p)):
+                seguinte.add(p[:i] + p[i + 1:])
+        variantes |= seguinte
+        fronteira = seguinte
+    return variantes
+
+
+class VocabularioAproximado:
+    """Dicionário de remoções (estilo SymSpell) para procurar palavras com erros.
+
+    Duas palavras a distância <= n partilham sempre uma variante obtida
+    removendo no máximo n letras a cada uma, por isso basta gerar as remoções
+    da palavra pedida e confirmar os candidatos com a distância de edição.
+    Tudo é comparado sem acentos, logo "acucar" encontra "açúcar".
+    """
+
+    def __init__(self, remocoes: Mapping[str, List[str]], originais: Mapping[str, List[str]], max_distancia: int):
+        self.remocoes = remocoes
+        self.originais = originais
+        self.max_distancia = max_distancia
+
+    @classmethod
+    def construir(cls, palavras: Iterable[str], max_distancia: int = 1) -> "VocabularioAproximado":
+        originais: Dict[str, List[str]] = {}
+        for p in palavras:
+            originais.setdefault(normalizar(p), []).append(p)
+        remocoes: Dict[str, List[str]] = {}
+        for norm in originais:
+            for v in _remocoes(norm, max_distancia):
+                remocoes.setdefault(v, []).append(norm)
+        return cls(remocoes, originais, max_distancia)
+
+    def procurar(self, palavra: str, max_distancia: Optional[int] = None) -> List[str]:
+        """Palavras do vocabulário (na forma original) a distância <= max_distancia"""
+        if max_distancia is None or max_distancia > self.max_distancia:
+            max_distancia = self.max_distancia
+        norm = normalizar(palavra)
+        encontradas = set()
+        for v in _remocoes(norm, max_distancia):
+            for candidata in self.remocoes.get(v, ()):
+                if candidata not in encontradas and distancia_edicao(norm, candidata, max_distancia) <= max_distancia:
+                    encontradas.add(candidata)
+        return [o for norm_c in sorted(encontradas) for o in self.originais[norm_c]]
+
+
+def distancia_tolerada(palavra: str) -> int:
+    """Erros aceites numa palavra-chave: nenhum em palavras curtas, 1 nas restantes"""
+    return 0 if len(palavra) < 5 else 1
+
+
+class IndiceTitulos:
+    """Palavras dos títulos -> receitas, prefixos da primeira palavra e tamanho dos títulos"""
+
+    def __init__(
+        self,
+        postings: Mapping[str, Sequence[int]],
+        prefixos: PrefixosTitulo,
+        comprimentos: Sequence[int],
+        aproximado: Optional[VocabularioAproximado] = None,
+    ):
+        self.postings = postings
+        self.prefixos = prefixos
+        self.comprimentos = comprimentos
+        if aproximado is None:
+            aproximado = VocabularioAproximado.construir(postings)
+        self.aproximado = aproximado
+
+    @classmethod
+    def construir(cls, catalogo) -> "IndiceTitulos":
+        titulos = [catalogo.titulos[i].lower() for i in range(len(catalogo))]
+        listas: Dict[str, array] = {}
+        for i, t in enumerate(titulos):
+            for palavra in set(_RE_PALAVRA_TITULO.findall(t)):
+                lista = listas.get(palavra)
+                if lista is None:
+                    lista = listas[palavra] = array('I')
+                lista.append(i)
+        comprimentos = array('I', [len(t) for t in titulos])
+        return cls(listas, PrefixosTitulo.construir(titulos), comprimentos)
+
+    def contar_matches(self, palavras: Iterable[str]) -> Counter:
+        """Para cada receita, quantas das ``palavras`` são palavras do título"""
+        contagens: Counter = Counter()
+        for p in palavras:
+            contagens.update(self.postings.get(p, ()))
+        return contagens
+
+    def contar_aproximados(self, palavras: Iterable[str]) -> Counter:
+        """Como contar_matches, mas para palavras-chave que não existem em nenhum título:
+        cada uma conta uma vez por receita com uma palavra parecida no título"""
+        contagens: Counter = Counter()
+        for p in palavras:
+            if p in self.postings:
+                continue
+            distancia = distancia_tolerada(p)
+            receitas = set()
+            for parecida in self.aproximado.procurar(p, distancia):
+                receitas.update(self.postings[parecida])
+            contagens.update(receitas)
+        return contagens
@@ -0,0 +1,186 @@
+"""Motor de pesquisa vetorizado com NumPy (ver pesquisa.py).
+
+As colunas do catálogo passam a arrays NumPy (sem cópia: tanto os arrays
+tipados como as memoryviews do catálogo binário expõem o buffer). Cada
+receita fica reduzida a uma "célula": a combinação de categoria,
+dificuldade, faixas de tempo e de calorias em que cai, e critérios (estes
+numa matriz de bits, uma palavra de 64 bits por cada 64 critérios
+distintos). Há muito menos células do que receitas, por isso os filtros de
+uma consulta avaliam-se sobre as células e a máscara booleana das receitas
+é um único gather (``aceites[celula]``), feito só sobre a janela do ranking
+que está a ser percorrida.
+
+Top-k: as receitas estão também por ordem de rating (a mesma ordem dos
+bitsets, com empates pela ordem do CSV). ``pesquisar`` e ``pesquisar_lote``
+percorrem essa ordem em janelas crescentes e param em cada consulta assim
+que têm k resultados.
+"""
+from typing import Dict, List, Optional, Sequence
+import threading
+import weakref
+
+import numpy as np
+
+from .indices import FAIXAS_CALORIAS, FAIXAS_TEMPO
+from .pesquisa import Filtros
+
+# Primeira janela (em posições do ranking) percorrida por pesquisar_lote; duplica a cada passo
+_JANELA_INICIAL = 256
+
+
+def _bits_faixas(valores: np.ndarray, faixas) -> np.ndarray:
+    """Bit j ligado se o valor está na faixa j (as faixas podem sobrepor-se)"""
+    bits = np.zeros(len(valores), dtype=np.int64)
+    for j, (minimo, maximo) in enumerate(faixas.values()):
+        dentro = np.ones(len(valores), dtype=bool)
+        if minimo is not None:
+            dentro &= valores > minimo
+        if maximo is not None:
+            dentro &= valores <= maximo
+        bits |= dentro.astype(np.int64) << j
+    return bits
+
+
+class MotorNumpy:
+    def __init__(self, catalogo):
+        self.catalogo = catalogo
+        n = self.n = len(catalogo)
+        self.rating = np.asarray(catalogo.rating)
+        self.ordem_rating = np.asarray(catalogo.facetas.ordem_rating, dtype=np.intp)
+
+        # Critérios: matriz de bits por código de critérios (tuplos internados no catálogo)
+        self.criterios = sorted({c for tupla in catalogo.tabela_criterios for c in tupla})
+        coluna = {c: j for j, c in enumerate(self.criterios)}
+        self.palavras = max(1, (len(self.criterios) + 63) // 64)
+        bits_por_codigo = np.zeros((len(catalogo.tabela_criterios), self.palavras), dtype=np.uint64)
+        for cod, tupla in enumerate(catalogo.tabela_criterios):
+            for c in tupla:
+                j = coluna[c]
+                bits_por_codigo[cod, j // 64] |= np.uint64(1 << (j % 64))
+
+        atributos = np.column_stack([
+            np.asarray(catalogo.cod_categoria, dtype=np.int64),
+            np.asarray(catalogo.cod_dificuldade, dtype=np.int64),
+            _bits_faixas(np.asarray(catalogo.tempo_minutos), FAIXAS_TEMPO),
+            _bits_faixas(np.asarray(catalogo.calorias), FAIXAS_CALORIAS),
+            np.asarray(catalogo.cod_criterios, dtype=np.int64),
+        ]).reshape(n, 5)
+        # celulas[c] = atributos da célula c; celula[i] = célula da receita i
+        self.celulas, celula = np.unique(atributos, axis=0, return_inverse=True)
+        self.celula = celula.reshape(-1).astype(np.intp)
+        self.criterios_celula = bits_por_codigo[self.celulas[:, 4]]
+        # As mesmas células pela ordem do ranking (posição 0 = melhor rating)
+        self.celula_por_posicao = self.celula[self.ordem_rating]
+
+        self._cache: Dict[Filtros, np.ndarray] = {}
+
+    # --- filtros -> células aceites ---
+
+    def _bits_criterio(self, termo: str) -> np.ndarray:
+        bits = np.zeros(self.palavras, dtype=np.uint64)
+        for j, c in enumerate(self.criterios):
+            if termo in c:
+                bits[j // 64] |= np.uint64(1 << (j % 64))
+        return bits
+
+    def aceites(self, filtros: Filtros) -> np.ndarray:
+        """Máscara sobre as células (o ingrediente a evitar não entra aqui)"""
+        chave = filtros._replace(evitar=None)
+        aceites = self._cache.get(chave)
+        if aceites is not None:
+            return aceites
+
+        cat = self.catalogo
+        celulas = self.celulas
+        aceites = np.ones(len(celulas), dtype=bool)
+        if filtros.categoria is not None:
+            tabela = np.array([filtros.categoria in c for c in cat.tabela_categorias], dtype=bool)
+            aceites &= tabela[celulas[:, 0]]
+        if filtros.dificuldades is not None:
+            tabela = np.array([d in filtros.dificuldades for d in cat.tabela_dificuldades], dtype=bool)
+            aceites &= tabela[celulas[:, 1]]
+        if filtros.tempo is not None:
+            aceites &= (celulas[:, 2] >> list(FAIXAS_TEMPO).index(filtros.tempo)) & 1 == 1
+        if filtros.calorias is not None:
+            aceites &= (celulas[:, 3] >> list(FAIXAS_CALORIAS).index(filtros.calorias)) & 1 == 1
+        if filtros.criterio is not None:
+            aceites &= (self.criterios_celula & self._bits_criterio(filtros.criterio)).any(axis=1)
+
+        # Há poucas combinações de slots distintas; se a cache crescer demais recomeça
+        if len(self._cache) > 4096:
+            self._cache = {}
+        self._cache[chave] = aceites
+        return aceites
+
+    # --- top-k ---
+
+    def _sem_evitar(self, receitas: np.ndarray, evitar: Optional[str], limite: int) -> List[int]:
+        """As primeiras ``limite`` receitas sem o ingrediente a evitar (só verifica as que visita)"""
+        if not evitar:
+            return receitas[:limite].tolist()
+        ingredientes = self.catalogo.ingredientes
+        resultado: List[int] = []
+        # Converte aos bocados: numa janela grande só as primeiras costumam ser precisas
+        passo = max(4 * limite, 32)
+        for inicio in range(0, len(receitas), passo):
+            for i in receitas[inicio:inicio + passo].tolist():
+                if evitar not in ingredientes[i].lower():
+                    resultado.append(i)
+                    if len(resultado) >= limite:
+                        return resultado
+        return resultado
+
+    def _continuar(self, aceites: np.ndarray, evitar: Optional[str], k: int,
+                   resultado: List[int], inicio: int, janela: int) -> List[int]:
+        """Percorre o ranking a partir de ``inicio``, em janelas crescentes, até ter k receitas"""
+        while inicio < self.n and len(resultado) < k:
+            fim = min(self.n, inicio + janela)
+            posicoes = np.flatnonzero(aceites[self.celula_por_posicao[inicio:fim]])
+            if len(posicoes):
+                novas = self.ordem_rating[posicoes + inicio]
+                resultado.extend(self._sem_evitar(novas, evitar, k - len(resultado)))
+            inicio, janela = fim, janela * 2
+        return resultado
+
+    def pesquisar(self, filtros: Filtros, k: int = 5) -> List[int]:
+        """As k melhores receitas para uma consulta"""
+        return self._continuar(self.aceites(filtros), filtros.evitar, k, [], 0, _JANELA_INICIAL)
+
+    def pesquisar_lote(self, consultas: Sequence[Filtros], k: int = 5) -> List[List[int]]:
+        """O mesmo que [pesquisar(f, k) for f in consultas], com as consultas avaliadas em conjunto.
+
+        A primeira janela do ranking é avaliada para todas as consultas numa só
+        matriz consultas x posições; quase todas ficam resolvidas aí e só as
+        restantes (poucos resultados ou muitas exclusões) continuam uma a uma.
+        """
+        resultados: List[List[int]] = [[] for _ in consultas]
+        if self.n == 0 or not consultas or k <= 0:
+            return resultados
+        # aceites[q, c]: a consulta q aceita a célula c
+        aceites = np.stack([self.aceites(f) for f in consultas])
+        fim = min(self.n, _JANELA_INICIAL)
+        matriz = aceites[:, self.celula_por_posicao[:fim]]
+        linhas, colunas = np.nonzero(matriz)
+        receitas = self.ordem_rating[colunas]
+        cortes = np.searchsorted(linhas, np.arange(len(consultas) + 1)).tolist()
+        for q, f in enumerate(consultas):
+            resultado = self._sem_evitar(receitas[cortes[q]:cortes[q + 1]], f.evitar, k)
+            if len(resultado) < k:
+                resultado = self._continuar(aceites[q], f.evitar, k, resultado, fim, 2 * _JANELA_INICIAL)
+            resultados[q] = resultado
+        return resultados
+
+
+_motores: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_lock_motores = threading.Lock()
+
+
+def obter_motor(catalogo) -> MotorNumpy:
+    """Motor do catálogo (criado no primeiro uso e descartado com o catálogo)"""
+    motor = _motores.get(catalogo)
+    if motor is None:
+        with _lock_motores:
+            motor = _motores.get(catalogo)
+            if motor is None:
+                motor = _motores[catalogo] = MotorNumpy(catalogo)
+    return motor
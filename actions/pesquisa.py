@@ -0,0 +1,135 @@
+"""Pesquisa por filtros (slots do ActionBuscarReceitas) sobre o catálogo.
+
+Os slots são primeiro traduzidos para ``Filtros`` e depois avaliados por um
+de dois motores, que devolvem sempre as mesmas receitas pela mesma ordem:
+
+  - ``bitsets`` (por omissão): AND entre os bitsets das facetas, ordenados
+    por rating, e top-k pelos bits mais baixos (ver indices.IndiceFacetas);
+  - ``numpy``: máscara booleana vetorizada sobre arrays NumPy, com suporte
+    para avaliar muitas consultas de uma vez (ver motor_numpy.py).
+
+CHEFBOT_MOTOR_PESQUISA=numpy escolhe o segundo (precisa do NumPy instalado).
+"""
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+import os
+
+from .indices import FAIXAS_CALORIAS, FAIXAS_TEMPO
+
+
+class Filtros(NamedTuple):
+    """Restrições de uma pesquisa; None = sem restrição"""
+    categoria: Optional[str] = None              # a categoria tem de conter este texto
+    tempo: Optional[str] = None                  # nome de uma faixa de FAIXAS_TEMPO
+    dificuldades: Optional[Tuple[str, ...]] = None   # a dificuldade tem de ser uma destas
+    criterio: Optional[str] = None               # algum critério tem de conter este texto
+    calorias: Optional[str] = None               # nome de uma faixa de FAIXAS_CALORIAS
+    evitar: Optional[str] = None                 # os ingredientes não podem conter este texto
+
+
+_DIFICULDADES = {
+    "facil": ("muito fácil", "fácil"),
+    "medio": ("médio",),
+    "dificil": ("difícil",),
+}
+
+# O CSV tem "Sem glúten", "Vegan", etc
+_RESTRICOES = {
+    "vegetariano": "vegetariano",
+    "vegano": "vegan",
+    "sem_gluten": "sem glúten",
+    "sem_lactose": "sem lactose",
+    "sem_acucar": "sem açúcar",
+    "sem_ovo": "sem ovo",
+}
+
+
+def filtros_dos_slots(categoria=None, tempo=None, dificuldade=None, restricao=None,
+                      ingrediente_evitar=None, preferencia_calorica=None) -> Filtros:
+    """Traduz os slots do Rasa para Filtros (valores desconhecidos não filtram)"""
+    termo_categoria = None
+    if categoria:
+        # Normaliza para minúsculas para comparar
+        termo_categoria = categoria.lower()
+        if termo_categoria == "prato_principal":
+            termo_categoria = "prato principal"
+
+    return Filtros(
+        categoria=termo_categoria,
+        tempo=tempo if tempo in FAIXAS_TEMPO else None,   # "tanto_faz" não filtra
+        dificuldades=_DIFICULDADES.get(dificuldade),      # "qualquer" não filtra
+        criterio=_RESTRICOES.get(restricao),              # "nenhuma" não filtra
+        calorias=preferencia_calorica if preferencia_calorica in FAIXAS_CALORIAS else None,
+        evitar=ingrediente_evitar.lower() if ingrediente_evitar else None,
+    )
+
+
+def pesquisar_bitsets(catalogo, filtros: Filtros, k: int = 5) -> List[int]:
+    """Índices das k melhores receitas (por rating) que passam os filtros"""
+    # Cada filtro é um AND entre bitsets pré-calculados no arranque
+    facetas = catalogo.facetas
+    candidatos = facetas.todos
+    if filtros.categoria is not None:
+        candidatos &= facetas.categoria_contem(filtros.categoria)
+    if filtros.tempo is not None:
+        candidatos &= facetas.por_tempo[filtros.tempo]
+    if filtros.dificuldades is not None:
+        candidatos &= facetas.dificuldade_em(list(filtros.dificuldades))
+    if filtros.criterio is not None:
+        # Basta um dos critérios da receita conter o termo
+        candidatos &= facetas.criterio_contem(filtros.criterio)
+    if filtros.calorias is not None:
+        candidatos &= facetas.por_calorias[filtros.calorias]
+
+    # Ingrediente a evitar: verificado só nas receitas visitadas pelo top-k
+    excluir = None
+    if filtros.evitar:
+        evitar = filtros.evitar
+        excluir = lambda i: evitar in catalogo.ingredientes[i].lower()
+
+    # Os bits já estão por rating (melhores primeiro): basta tirar os k primeiros
+    return facetas.top_k(candidatos, k, excluir)
+
+
+MOTORES = ("bitsets", "numpy")
+
+
+def motor_configurado() -> str:
+    motor = os.environ.get("CHEFBOT_MOTOR_PESQUISA", "bitsets").strip().lower()
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de pesquisa desconhecido: {motor!r} (usa 'bitsets' ou 'numpy')")
+    return motor
+
+
+_avisou_sem_numpy = False
+
+
+def _motor_numpy(catalogo, motor: Optional[str]):
+    """O MotorNumpy do catálogo, ou None se o motor escolhido for o dos bitsets"""
+    global _avisou_sem_numpy
+    if (motor or motor_configurado()) != "numpy":
+        return None
+    try:
+        from .motor_numpy import obter_motor
+    except ImportError:
+        if not _avisou_sem_numpy:
+            _avisou_sem_numpy = True
+            print("⚠️ CHEFBOT_MOTOR_PESQUISA=numpy mas o NumPy não está instalado: a usar os bitsets.")
+        return None
+    return obter_motor(catalogo)
+
+
+def pesquisar(catalogo, filtros: Filtros, k: int = 5, motor: Optional[str] = None) -> List[int]:
+    """Pesquisa com o motor escolhido (por omissão o de CHEFBOT_MOTOR_PESQUISA)"""
+    motor_numpy = _motor_numpy(catalogo, motor)
+    if motor_numpy is not None:
+        return motor_numpy.pesquisar(filtros, k)
+    return pesquisar_bitsets(catalogo, filtros, k)
+
+
+def pesquisar_lote(catalogo, consultas: Sequence[Filtros], k: int = 5,
+                   motor: Optional[str] = None) -> List[List[int]]:
+    """Várias pesquisas de uma vez (testes de carga, avaliações)"""
+    motor_numpy = _motor_numpy(catalogo, motor)
+    if motor_numpy is not None:
+        return motor_numpy.pesquisar_lote(consultas, k)
+    return [pesquisar_bitsets(catalogo, f, k) for f in consultas]
@@ -0,0 +1,87 @@
+"""Seleção das k melhores receitas, partilhada pelas ações de pesquisa.
+
+Nenhuma das funções ordena a lista toda de candidatos:
+
+  - ``top_k``: heap com no máximo k elementos, O(n log k);
+  - ``top_k_com_limite``: para quando a pontuação é cara mas há um limite
+    superior barato; percorre os candidatos do maior para o menor limite e
+    pára assim que nenhum dos que faltam pode entrar no top-k;
+  - ``primeiros_k``: para candidatos que já vêm pela ordem final (ex: listas
+    ordenadas por rating), fica com os k primeiros aceites e pára aí.
+
+Os empates resolvem-se sempre pelo ``desempate`` mais pequeno (por omissão a
+ordem de chegada), o mesmo resultado de um sort estável.
+"""
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+import heapq
+
+
+def top_k(itens: Iterable[Any], k: int, chave: Optional[Callable[[Any], Any]] = None,
+          desempate: Optional[Callable[[Any], Any]] = None) -> List[Any]:
+    """Os k itens com maior ``chave``, do melhor para o pior.
+
+    Igual a ``sorted(itens, key=chave, reverse=True)[:k]`` quando ``desempate``
+    é a ordem dos itens, mas só guarda k itens de cada vez.
+    """
+    if k <= 0:
+        return []
+    if desempate is None:
+        # nlargest já desempata pela ordem de chegada (e é bem mais rápido que um heap à mão)
+        return heapq.nlargest(k, itens, key=chave)
+    valor = (lambda item: item) if chave is None else chave
+    return heapq.nlargest(k, itens, key=lambda item: (valor(item), -desempate(item)))
+
+
+def por_ordem_decrescente(itens: Iterable[Any], chave: Callable[[Any], float]) -> Iterator[Any]:
+    """Os itens do maior para o menor ``chave``, tirados de um heap à medida que são pedidos"""
+    heap = [(-chave(item), ordem, item) for ordem, item in enumerate(itens)]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def top_k_com_limite(candidatos: Iterable[Any], k: int,
+                     limite: Callable[[Any], float],
+                     pontuar: Callable[[Any], Optional[float]],
+                     desempate: Optional[Callable[[Any], Any]] = None) -> List[Tuple[float, Any]]:
+    """Top-k com paragem antecipada: pares (pontuação, candidato), do melhor para o pior.
+
+    ``candidatos`` têm de vir por ordem decrescente de ``limite`` (ver
+    por_ordem_decrescente, ou uma lista já ordenada por rating), com
+    ``limite(c) >= pontuar(c)``. ``pontuar`` pode devolver None para excluir o
+    candidato. Os que ficam depois da paragem nunca chegam a ser pontuados.
+    """
+    if k <= 0:
+        return []
+    heap: List[Tuple[float, Any, int, Any]] = []
+    for ordem, candidato in enumerate(candidatos):
+        # Empate com a k-ésima ainda pode entrar (desempate menor), por isso só pára abaixo
+        if len(heap) == k and limite(candidato) < heap[0][0]:
+            break
+        pontuacao = pontuar(candidato)
+        if pontuacao is None:
+            continue
+        segundo = -(ordem if desempate is None else desempate(candidato))
+        if len(heap) < k:
+            heapq.heappush(heap, (pontuacao, segundo, -ordem, candidato))
+        else:
+            pior = heap[0]
+            if pontuacao > pior[0] or (pontuacao == pior[0] and segundo > pior[1]):
+                heapq.heapreplace(heap, (pontuacao, segundo, -ordem, candidato))
+    heap.sort(reverse=True)
+    return [(entrada[0], entrada[3]) for entrada in heap]
+
+
+def primeiros_k(ordenados: Iterable[Any], k: int,
+                excluir: Optional[Callable[[Any], bool]] = None) -> List[Any]:
+    """Os k primeiros que ``excluir`` não rejeita; os restantes nem são vistos"""
+    resultado: List[Any] = []
+    if k <= 0:
+        return resultado
+    for item in ordenados:
+        if excluir is not None and excluir(item):
+            continue
+        resultado.append(item)
+        if len(resultado) >= k:
+            break
+    return resultado
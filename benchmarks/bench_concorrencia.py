@@ -0,0 +1,147 @@
+"""
+Benchmark de latência do servidor de ações com muitas conversas em simultâneo.
+
+Corre as ações pelo ActionExecutor do rasa_sdk (o mesmo que o `rasa run actions`
+usa para cada pedido), dentro de um único event loop, com N conversas ao mesmo
+tempo. Cada conversa (sender_id próprio) faz o percurso habitual:
+
+  buscar receitas -> mostrar -> receita completa -> avaliar -> guardar favorito
+  -> recentes -> favoritos
+
+com uma pausa entre cada resposta e a mensagem seguinte. Mede-se a latência
+de cada pedido desde que chega (incluindo o tempo à espera do event loop) e o
+débito, com as ações a correr no pool de threads (assincrono.py) e dentro do
+event loop (como antes).
+
+--latencia-disco MS acrescenta um sleep bloqueante a cada operação do histórico,
+para simular um disco lento ou partilhado (NFS, volume de rede).
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_concorrencia.py [--conversas 64] [--latencia-disco 2] [--pausa 50]
+                                           [--historico csv|sqlite]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from rasa_sdk.executor import ActionExecutor  # noqa: E402
+
+from actions import assincrono, historico  # noqa: E402
+
+METODOS_HISTORICO = ("esta_nos_favoritos", "adicionar_favorito", "remover_favorito",
+                     "listar_favoritos", "registar_recente", "listar_recentes")
+
+# (ação, mensagem do utilizador, slots extra) - o mesmo percurso para todas as conversas
+PERCURSO = [
+    ("action_buscar_receitas", {}, {"categoria": "sobremesa", "tempo": "ate_30min"}),
+    ("action_mostrar_receitas", {}, {}),
+    ("action_mostrar_receita_completa", {}, {"numero_receita": "1"}),
+    ("action_perguntar_avaliacao", {}, {}),
+    ("action_registar_recente_e_perguntar_favoritos",
+     {"intent": {"name": "dar_avaliacao"}, "entities": [{"entity": "avaliacao_utilizador", "value": 4}], "text": "4"}, {}),
+    ("action_guardar_favoritos_csv", {}, {}),
+    ("action_mostrar_recentes_resumo", {}, {}),
+    ("action_mostrar_favoritos_lista", {}, {}),
+]
+
+
+def simular_disco_lento(armazenamento, segundos: float):
+    """Acrescenta um sleep bloqueante (como uma leitura lenta) a cada operação do histórico"""
+    for nome in METODOS_HISTORICO:
+        original = getattr(armazenamento, nome)
+
+        @functools.wraps(original)
+        def lento(*args, _original=original, **kwargs):
+            time.sleep(segundos)
+            return _original(*args, **kwargs)
+
+        setattr(armazenamento, nome, lento)
+
+
+async def conversa(executor: ActionExecutor, sender: str, pausa: float, latencias: list):
+    slots = {}
+    # A latência conta desde que o pedido "chega" (resposta anterior + pausa do utilizador):
+    # se o event loop estiver ocupado com outra ação, a espera também entra na conta
+    chegada = time.perf_counter()
+    for acao, mensagem, extra in PERCURSO:
+        slots.update(extra)
+        pedido = {
+            "next_action": acao,
+            "sender_id": sender,
+            "tracker": {"sender_id": sender, "slots": dict(slots), "latest_message": mensagem, "events": []},
+            "domain": {},
+        }
+        resposta = await executor.run(pedido)
+        fim = time.perf_counter()
+        latencias.append(fim - chegada)
+        # Versões antigas do rasa_sdk devolvem um dict, as recentes um modelo
+        eventos = resposta["events"] if isinstance(resposta, dict) else resposta.events
+        for evento in eventos:
+            if evento.get("event") == "slot":
+                slots[evento["name"]] = evento["value"]
+            elif evento.get("event") == "reset_slots":
+                slots = {}
+        chegada = fim + pausa
+        await asyncio.sleep(pausa)
+
+
+async def ronda(executor: ActionExecutor, conversas: int, pausa: float, prefixo: str):
+    latencias: list = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(conversa(executor, f"{prefixo}-{n}", pausa, latencias) for n in range(conversas)))
+    return time.perf_counter() - t0, latencias
+
+
+def percentil(valores, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversas", type=int, default=64)
+    parser.add_argument("--latencia-disco", type=float, default=2.0, help="ms por operação do histórico (0 = sem atraso)")
+    parser.add_argument("--pausa", type=float, default=50.0, help="ms entre a resposta e a mensagem seguinte de cada conversa")
+    parser.add_argument("--historico", choices=("csv", "sqlite"), default="csv")
+    args = parser.parse_args()
+
+    # Histórico numa pasta temporária para não tocar no do projeto
+    destino = tempfile.mkdtemp(prefix="chefbot-bench-")
+    os.environ["CHEFBOT_HISTORICO"] = args.historico
+    os.environ["CHEFBOT_HISTORICO_DIR"] = destino
+    os.environ["CHEFBOT_HISTORICO_DB"] = os.path.join(destino, "historico.db")
+    if args.latencia_disco > 0:
+        simular_disco_lento(historico.obter_historico(), args.latencia_disco / 1000)
+
+    executor = ActionExecutor()
+    executor.register_package("actions")
+
+    print(f"{args.conversas} conversas x {len(PERCURSO)} ações, histórico {args.historico}, "
+          f"+{args.latencia_disco:g} ms por operação do histórico, pausa de {args.pausa:g} ms, "
+          f"{assincrono.obter_executor()._max_workers} threads\n")
+    print(f"{'modo':<16} {'p50 (ms)':>9} {'p99 (ms)':>9} {'máx (ms)':>9} {'total (s)':>10} {'ações/s':>9}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Aquecimento: carrega o catálogo e os índices antes de medir
+        asyncio.run(ronda(executor, 1, 0, "aquecimento"))
+
+    for nome, usar_executor in (("event loop", False), ("pool de threads", True)):
+        assincrono.USAR_EXECUTOR = usar_executor
+        with contextlib.redirect_stdout(io.StringIO()):
+            total, latencias = asyncio.run(ronda(executor, args.conversas, args.pausa / 1000, nome.replace(" ", "_")))
+        print(f"{nome:<16} {statistics.median(latencias) * 1e3:>9.1f} {percentil(latencias, 99) * 1e3:>9.1f} "
+              f"{max(latencias) * 1e3:>9.1f} {total:>10.2f} {len(latencias) / total:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark dos motores de pesquisa por filtros do ActionBuscarReceitas.
+
+Corre todas as combinações de slots com até 3 filtros ativos (categoria, tempo,
+dificuldade, restrição, ingrediente a evitar, calorias) com:
+
+  - bitsets        o motor atual (pesquisa.pesquisar_bitsets), uma consulta de cada vez;
+  - numpy          o MotorNumpy, uma consulta de cada vez;
+  - numpy (lote)   o MotorNumpy.pesquisar_lote, todas as consultas de uma vez.
+
+Confirma que os três devolvem as mesmas receitas pela mesma ordem. Além do
+catálogo real, repete-o N vezes (com tempos/calorias/ratings perturbados)
+para ver como cada motor escala.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_pesquisa.py [multiplicador ...]     (por omissão: 1 20)
+"""
+
+import contextlib
+import io
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from actions import catalogo as catalogo_mod  # noqa: E402
+from actions.motor_numpy import MotorNumpy  # noqa: E402
+from actions.pesquisa import filtros_dos_slots, pesquisar_bitsets  # noqa: E402
+
+CATEGORIAS = [None, "entrada", "prato_principal", "sobremesa"]
+TEMPOS = [None, "ate_30min", "30_60min", "mais_1h", "tanto_faz"]
+DIFICULDADES = [None, "facil", "medio", "dificil", "qualquer"]
+RESTRICOES = [None, "vegetariano", "vegano", "sem_gluten", "sem_lactose", "sem_acucar", "sem_ovo", "nenhuma"]
+EVITAR = [None, "ovo", "leite", "frango"]
+CALORIAS = [None, "leve", "moderado", "reforçado", "hipercalorico"]
+
+
+def consultas():
+    lista = []
+    for combinacao in itertools.product(CATEGORIAS, TEMPOS, DIFICULDADES, RESTRICOES, EVITAR, CALORIAS):
+        if sum(v is not None for v in combinacao) <= 3:
+            c, t, d, r, e, k = combinacao
+            lista.append(filtros_dos_slots(c, t, d, r, e, k))
+    return lista
+
+
+def catalogo_aumentado(base, multiplicador: int):
+    if multiplicador == 1:
+        return base
+    rnd = random.Random(multiplicador)
+    receitas = []
+    for copia in range(multiplicador):
+        for r in base.receitas():
+            r = dict(r)
+            r["id"] = f"{r['id']}-{copia}"
+            if copia:
+                r["tempo_minutos"] = max(0, r["tempo_minutos"] + rnd.randint(-15, 15))
+                r["calorias"] = max(0, r["calorias"] + rnd.randint(-150, 150))
+                r["rating"] = round(min(5.0, max(0.0, r["rating"] + rnd.uniform(-0.5, 0.5))), 1)
+            receitas.append(r)
+    return catalogo_mod.construir_catalogo(receitas)
+
+
+def cronometrar(funcao, repeticoes: int = 3):
+    """Melhor tempo de várias repetições e o resultado da última"""
+    melhor = None
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        resultado = funcao()
+        dt = time.perf_counter() - t0
+        melhor = dt if melhor is None else min(melhor, dt)
+    return melhor, resultado
+
+
+def main():
+    multiplicadores = [int(a) for a in sys.argv[1:]] or [1, 20]
+    with contextlib.redirect_stdout(io.StringIO()):
+        base = catalogo_mod.obter_catalogo()
+    lista = consultas()
+    print(f"{len(lista)} consultas por motor\n")
+    print(f"{'receitas':>9}  {'motor':<14} {'total (ms)':>11} {'µs/consulta':>12} {'vs bitsets':>11}")
+
+    for m in multiplicadores:
+        cat = catalogo_aumentado(base, m)
+        t0 = time.perf_counter()
+        motor = MotorNumpy(cat)
+        preparacao = time.perf_counter() - t0
+
+        t_bits, r_bits = cronometrar(lambda: [pesquisar_bitsets(cat, f, 5) for f in lista])
+        t_np, r_np = cronometrar(lambda: [motor.pesquisar(f, 5) for f in lista])
+        t_lote, r_lote = cronometrar(lambda: motor.pesquisar_lote(lista, 5))
+
+        for nome, t, r in (("bitsets", t_bits, r_bits), ("numpy", t_np, r_np), ("numpy (lote)", t_lote, r_lote)):
+            diferentes = sum(a != b for a, b in zip(r, r_bits))
+            aviso = "" if diferentes == 0 else f"   ❌ {diferentes} resultados diferentes"
+            print(f"{len(cat):>9}  {nome:<14} {t * 1e3:>11.1f} {t / len(lista) * 1e6:>12.1f} "
+                  f"{t_bits / t:>10.2f}x{aviso}")
+        print(f"{'':>9}  (preparação do MotorNumpy: {preparacao * 1e3:.1f} ms)\n")
+
+
+if __name__ == "__main__":
+    main()
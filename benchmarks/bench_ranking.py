@@ -0,0 +1,142 @@
+"""
+Micro-benchmark da seleção top-k das ações de pesquisa (actions/ranking.py).
+
+Gera catálogos sintéticos (título, ingredientes, rating) e compara, para os
+três padrões usados pelas ações:
+
+  - ingredientes   (ActionBuscarPorIngredientes) ordenar por posição + sort  vs  ranking.top_k;
+  - nome           (ActionBuscarPorNome) pontuar todas as candidatas (regex nos
+                   ingredientes) + sort  vs  ranking.top_k_com_limite, que só
+                   pontua as que ainda podem entrar no top 10;
+  - facetas        (IndiceFacetas.top_k) filtrar a lista toda ordenada por
+                   rating + [:5]  vs  ranking.primeiros_k.
+
+Confirma que cada par devolve as mesmas receitas pela mesma ordem.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_ranking.py [n_receitas ...]     (por omissão: 1600 30000 300000)
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from actions import ranking  # noqa: E402
+
+PALAVRAS = ["frango", "arroz", "bacalhau", "batata", "cebola", "alho", "tomate", "natas", "ovo",
+            "leite", "farinha", "açúcar", "chocolate", "limão", "cenoura", "queijo", "massa", "atum"]
+MEDIDAS = ["1 colher de sopa de", "2 colheres de chá de", "100 g de", "1 chávena de", "q.b. de"]
+CONSULTA = ["bacalhau", "batata", "natas"]
+
+
+def catalogo_sintetico(n: int, semente: int = 0):
+    rnd = random.Random(semente)
+    titulos, ingredientes, ratings = [], [], []
+    for _ in range(n):
+        titulos.append(rnd.sample(PALAVRAS, rnd.randint(2, 6)))
+        ingredientes.append([f"{rnd.choice(MEDIDAS)} {p}" for p in rnd.sample(PALAVRAS, rnd.randint(3, 10))])
+        ratings.append(round(rnd.uniform(0, 5), 1))
+    return titulos, ingredientes, ratings
+
+
+def cronometrar(funcao, repeticoes: int = 3):
+    """Melhor tempo de várias repetições e o resultado da última"""
+    melhor = None
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        resultado = funcao()
+        dt = time.perf_counter() - t0
+        melhor = dt if melhor is None else min(melhor, dt)
+    return melhor, resultado
+
+
+def padrao_ingredientes(titulos, ingredientes, ratings):
+    # Como no ActionBuscarPorIngredientes: contagens {posição: matches} pela ordem do
+    # índice invertido (não pela do CSV), pontuação matches + rating * 0.1
+    contagens = {}
+    for i, lista in enumerate(ingredientes):
+        contagem = sum(1 for p in CONSULTA if any(p in ing for ing in lista))
+        if contagem:
+            contagens[i] = contagem
+    ordem_indice = list(contagens.items())
+    random.Random(2).shuffle(ordem_indice)
+    contagens = dict(ordem_indice)
+
+    def antes():
+        pontuadas = [(m + ratings[i] * 0.1, i) for i, m in sorted(contagens.items())]
+        return sorted(pontuadas, key=lambda x: x[0], reverse=True)[:5]
+
+    def depois():
+        pontuadas = ((m + ratings[i] * 0.1, i) for i, m in contagens.items())
+        return ranking.top_k(pontuadas, 5, chave=lambda x: x[0], desempate=lambda x: x[1])
+
+    return antes, depois
+
+
+def padrao_nome(titulos, ingredientes, ratings):
+    # Como no ActionBuscarPorNome: peso grande no título, ingredientes só desempatam
+    candidatas = []
+    for i, titulo in enumerate(titulos):
+        matches = sum(1 for p in CONSULTA if p in titulo)
+        if matches:
+            candidatas.append((matches * 1000, i))
+
+    def pontuar_ingredientes(score, i):
+        texto = " ".join(ingredientes[i]).lower()
+        limpos = re.sub(r'colher(es)?\s*(de\s*)?(sopa|sobremesa|chá|café)', '', texto)
+        score += sum(1 for p in CONSULTA if p in limpos)
+        score += ratings[i] * 0.5
+        score -= len(titulos[i]) * 0.5
+        return score
+
+    def antes():
+        pontuadas = [(pontuar_ingredientes(s, i), i) for s, i in candidatas]
+        return [(s, i) for s, i in sorted(pontuadas, key=lambda x: x[0], reverse=True)[:10]]
+
+    def depois():
+        com_limite = [(s + len(CONSULTA) + ratings[i] * 0.5 - len(titulos[i]) * 0.5, s, i) for s, i in candidatas]
+        melhores = ranking.top_k_com_limite(
+            ranking.por_ordem_decrescente(com_limite, lambda c: c[0]), 10,
+            limite=lambda c: c[0], pontuar=lambda c: pontuar_ingredientes(c[1], c[2]), desempate=lambda c: c[2],
+        )
+        return [(s, c[2]) for s, c in melhores]
+
+    return antes, depois
+
+
+def padrao_facetas(titulos, ingredientes, ratings):
+    # Posting list já ordenada por rating (como as do IndiceFacetas) e receitas a excluir
+    rnd = random.Random(1)
+    ordenados = sorted(range(len(ratings)), key=lambda i: -ratings[i])
+    excluir = set(rnd.sample(range(len(ratings)), len(ratings) // 3))
+
+    def antes():
+        return [i for i in ordenados if i not in excluir][:5]
+
+    def depois():
+        return ranking.primeiros_k(ordenados, 5, excluir.__contains__)
+
+    return antes, depois
+
+
+def main():
+    tamanhos = [int(a) for a in sys.argv[1:]] or [1600, 30000, 300000]
+    print(f"{'receitas':>9} {'padrão':<13} {'antes (ms)':>11} {'top-k (ms)':>11} {'ganho':>7}")
+    for n in tamanhos:
+        catalogo = catalogo_sintetico(n)
+        for nome, padrao in (("ingredientes", padrao_ingredientes), ("nome", padrao_nome), ("facetas", padrao_facetas)):
+            antes, depois = padrao(*catalogo)
+            t_antes, r_antes = cronometrar(antes)
+            t_depois, r_depois = cronometrar(depois)
+            if r_antes != r_depois:
+                raise SystemExit(f"❌ Resultados diferentes ({nome}, {n} receitas)")
+            print(f"{n:>9} {nome:<13} {t_antes * 1e3:>11.2f} {t_depois * 1e3:>11.2f} {t_antes / t_depois:>6.1f}x")
+    print("\n✅ Mesmos resultados em todos os padrões")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Teste de stress do histórico (favoritos/recentes) com escritas concorrentes.
+
+Simula várias instâncias do servidor de ações (processos), cada uma com várias
+threads, a adicionar/remover favoritos e a registar recentes para o mesmo
+utilizador ao mesmo tempo. No fim confirma que não se perdeu nenhuma escrita:
+
+  - recentes: tem de existir exatamente uma linha por registo feito;
+  - resumo dos recentes: as contagens mantidas (e as avaliações) batem com as linhas gravadas;
+  - favoritos: ficam só os ids que não foram removidos, sem duplicados.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/stress_historico.py [csv|sqlite] [processos] [threads] [operacoes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from actions.historico import AgregadosRecentes, ArmazenamentoCSV, ArmazenamentoSQLite  # noqa: E402
+
+UTILIZADOR = "stress"
+
+
+def _abrir(motor: str, destino: str):
+    if motor == "sqlite":
+        return ArmazenamentoSQLite(os.path.join(destino, "historico.db"))
+    return ArmazenamentoCSV(destino)
+
+
+def _trabalho_thread(armazenamento, processo: int, thread: int, operacoes: int):
+    for n in range(operacoes):
+        rid = f"p{processo}-t{thread}-{n}"
+        armazenamento.registar_recente(UTILIZADOR, {"id": rid, "titulo": f"Receita {rid}", "avaliacao_utilizador": str(n % 5 + 1)})
+        armazenamento.adicionar_favorito(UTILIZADOR, {"id": rid, "titulo": f"Receita {rid}"})
+        # Metade dos favoritos são removidos logo a seguir (reescrita do ficheiro todo no CSV)
+        if n % 2 == 0:
+            if not armazenamento.remover_favorito(UTILIZADOR, rid):
+                raise RuntimeError(f"remover_favorito({rid}) não encontrou o favorito acabado de adicionar")
+
+
+def _trabalho_processo(motor: str, destino: str, processo: int, threads: int, operacoes: int):
+    armazenamento = _abrir(motor, destino)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futuros = [
+            pool.submit(_trabalho_thread, armazenamento, processo, t, operacoes)
+            for t in range(threads)
+        ]
+        for f in futuros:
+            f.result()
+    return processo
+
+
+def main():
+    motor = sys.argv[1] if len(sys.argv) > 1 else "csv"
+    processos = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    operacoes = int(sys.argv[4]) if len(sys.argv) > 4 else 50
+
+    destino = tempfile.mkdtemp(prefix="chefbot-stress-")
+    print(f"🔨 {motor}: {processos} processos x {threads} threads x {operacoes} operações em {destino}")
+
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        futuros = [
+            pool.submit(_trabalho_processo, motor, destino, p, threads, operacoes)
+            for p in range(processos)
+        ]
+        for f in futuros:
+            f.result()
+    duracao = time.perf_counter() - inicio
+
+    armazenamento = _abrir(motor, destino)
+    esperados_recentes = {
+        f"p{p}-t{t}-{n}" for p in range(processos) for t in range(threads) for n in range(operacoes)
+    }
+    esperados_favoritos = {rid for rid in esperados_recentes if int(rid.rsplit("-", 1)[1]) % 2 == 1}
+
+    linhas_recentes = armazenamento.listar_recentes(UTILIZADOR)
+    recentes = [r["id"] for r in linhas_recentes]
+    favoritos = [r["id"] for r in armazenamento.listar_favoritos(UTILIZADOR)]
+
+    erros = []
+    if len(recentes) != len(esperados_recentes) or set(recentes) != esperados_recentes:
+        erros.append(f"recentes: {len(recentes)} linhas, esperadas {len(esperados_recentes)}")
+    resumo = armazenamento.resumo_recentes(UTILIZADOR)
+    if resumo.como_dict() != AgregadosRecentes.de_linhas(linhas_recentes).como_dict():
+        erros.append(f"resumo dos recentes: total {resumo.total}, diferente das {len(recentes)} linhas")
+    # Cada thread avalia as suas receitas com 1..5 (n % 5 + 1)
+    soma_esperada = processos * threads * sum(n % 5 + 1 for n in range(operacoes))
+    if resumo.avaliacoes != len(esperados_recentes) or resumo.soma_avaliacoes != soma_esperada:
+        erros.append(f"resumo dos recentes: {resumo.avaliacoes} avaliações (soma {resumo.soma_avaliacoes}), "
+                     f"esperadas {len(esperados_recentes)} (soma {soma_esperada})")
+    if len(favoritos) != len(set(favoritos)):
+        erros.append("favoritos: há ids duplicados")
+    if set(favoritos) != esperados_favoritos:
+        perdidos = len(esperados_favoritos - set(favoritos))
+        a_mais = len(set(favoritos) - esperados_favoritos)
+        erros.append(f"favoritos: {perdidos} perdidos, {a_mais} que deviam ter sido removidos")
+
+    total = processos * threads * operacoes
+    print(f"⏱️ {total} registos (+{total} favoritos, {processos * threads * ((operacoes + 1) // 2)} remoções) em {duracao:.2f}s")
+    if erros:
+        for e in erros:
+            print(f"❌ {e}")
+        sys.exit(1)
+    print("✅ Nenhuma escrita perdida.")
+
+
+if __name__ == "__main__":
+    main()
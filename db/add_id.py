@@ -1,8 +1,14 @@
+# Passo antigo da cadeia clean_csv.py -> add_id.py (ver pipeline.py)
 import csv
 
+from pipeline import IdsExistentes, atribuir_ids
+
 input_file = "recipes_old.csv"
 output_file = "recipes.csv"
 
+# Ids já publicados: as receitas que já existiam mantêm o id (os favoritos dependem dele)
+existentes = IdsExistentes.ler(output_file)
+
 with open(input_file, "r", encoding="utf-8") as f_in, \
      open(output_file, "w", encoding="utf-8", newline="") as f_out:
 
@@ -15,8 +21,8 @@ with open(input_file, "r", encoding="utf-8") as f_in, \
     # Escrever novo cabeçalho com 'id' no início
     writer.writerow(["id"] + header)
 
-    # Escrever linhas com ID crescente
-    for idx, row in enumerate(reader, start=1):
-        writer.writerow([idx] + row)
+    # Escrever linhas com o id de cada receita
+    for row in atribuir_ids((dict(zip(header, valores)) for valores in reader), existentes):
+        writer.writerow([row["id"]] + [row[c] for c in header])
 
 print("CSV criado com sucesso:", output_file)
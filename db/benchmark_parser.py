@@ -0,0 +1,65 @@
+"""
+Benchmark do parse das páginas de receita sobre as fixtures (db/fixtures/).
+
+Compara a versão antiga (parse_recipe_html_antigo: várias passagens, html.parser)
+com a de uma só passagem (parse_recipe_html), com html.parser e com lxml, e
+confirma que os resultados são iguais aos da versão antiga.
+
+Uso (dentro da pasta db/):
+    python benchmark_parser.py [repeticoes] [pasta_html]
+"""
+
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+import extract_data as X
+
+
+def carregar_paginas(pasta):
+    paginas = []
+    for caminho in sorted(glob.glob(os.path.join(pasta, "**", "*-fid-*.html"), recursive=True)):
+        with open(caminho, "r", encoding="utf-8") as f:
+            paginas.append((caminho, f.read()))
+    return paginas
+
+
+def medir(nome, funcao, paginas, repeticoes):
+    resultados = []
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # o parse escreve as "Ignorada: ..."
+        for _ in range(repeticoes):
+            resultados = [funcao(html, caminho, "Sobremesa") for caminho, html in paginas]
+    duracao = time.perf_counter() - inicio
+    por_segundo = len(paginas) * repeticoes / duracao
+    print(f"{nome:<32} {por_segundo:8.1f} páginas/s")
+    return por_segundo, resultados
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    pasta = sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+    paginas = carregar_paginas(pasta)
+    if not paginas:
+        raise SystemExit(f"Não há páginas de receita em {pasta} (corre o gerar_fixtures.py).")
+    print(f"{len(paginas)} páginas x {repeticoes} repetições\n")
+
+    base, antigos = medir("antigo (html.parser)", X.parse_recipe_html_antigo, paginas, repeticoes)
+    variantes = [("uma passagem (html.parser)", "html.parser")]
+    if X.PARSER_HTML == "lxml":
+        variantes.append(("uma passagem (lxml)", "lxml"))
+    else:
+        print("(lxml não está instalado: só html.parser)")
+
+    for nome, parser in variantes:
+        vel, novos = medir(nome, lambda h, u, c: X.parse_recipe_html(h, u, c, parser=parser), paginas, repeticoes)
+        diferentes = sum(1 for a, b in zip(antigos, novos) if a != b)
+        print(f"{'':<32} {vel / base:8.2f}x, {diferentes} resultados diferentes do antigo")
+
+
+if __name__ == "__main__":
+    main()
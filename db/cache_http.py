@@ -0,0 +1,179 @@
+"""
+Cache local das respostas HTTP do crawler (extract_data.py).
+
+  - Os corpos ficam comprimidos (gzip) e endereçados pelo conteúdo:
+    objetos/<sha256[:2]>/<sha256>.gz. Páginas iguais ocupam o espaço de uma.
+  - Um índice SQLite (indice.db) guarda, por URL, o sha256 do corpo e os
+    validadores (ETag / Last-Modified) para revalidar com pedidos condicionais:
+    se o site responder 304, usa-se o corpo guardado.
+  - Em modo offline não sai nenhum pedido: o que está na cache é servido, o
+    resto dá 504 (como o "only-if-cached" dos browsers). Serve para voltar a
+    fazer o parse de todo o corpus depois de mexer no parser.
+
+Só se guardam respostas 200.
+"""
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Iterator, Optional
+
+import requests
+
+Entrada = namedtuple("Entrada", "url sha256 etag last_modified content_type")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS respostas (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    etag TEXT NOT NULL DEFAULT '',
+    last_modified TEXT NOT NULL DEFAULT '',
+    content_type TEXT NOT NULL DEFAULT '',
+    obtido_em REAL NOT NULL,
+    validado_em REAL NOT NULL
+);
+"""
+
+
+class CacheHTTP:
+    def __init__(self, pasta: str = "cache_http", offline: bool = False):
+        self.pasta = pasta
+        self.offline = offline
+        self.caminho_indice = os.path.join(pasta, "indice.db")
+        os.makedirs(os.path.join(pasta, "objetos"), exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.estatisticas = {"offline": 0, "304": 0, "guardadas": 0, "em_falta": 0}
+        with self._ligacao() as con:
+            con.executescript(_ESQUEMA)
+
+    def _ligacao(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.caminho_indice, timeout=30)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def _contar(self, chave: str):
+        with self._lock:
+            self.estatisticas[chave] += 1
+
+    # --- corpos (content-addressed) ---
+
+    def _caminho_objeto(self, sha: str) -> str:
+        return os.path.join(self.pasta, "objetos", sha[:2], sha + ".gz")
+
+    def ler_corpo(self, sha: str) -> bytes:
+        with gzip.open(self._caminho_objeto(sha), "rb") as f:
+            return f.read()
+
+    def _guardar_corpo(self, corpo: bytes) -> str:
+        sha = hashlib.sha256(corpo).hexdigest()
+        destino = self._caminho_objeto(sha)
+        if not os.path.exists(destino):
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            fd, temporario = tempfile.mkstemp(dir=os.path.dirname(destino), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(gzip.compress(corpo, compresslevel=6, mtime=0))
+                os.replace(temporario, destino)
+            except BaseException:
+                if os.path.exists(temporario):
+                    os.remove(temporario)
+                raise
+        return sha
+
+    # --- índice por URL ---
+
+    def procurar(self, url: str) -> Optional[Entrada]:
+        row = self._ligacao().execute(
+            "SELECT url, sha256, etag, last_modified, content_type FROM respostas WHERE url = ?", (url,)
+        ).fetchone()
+        return Entrada(*row) if row else None
+
+    def urls(self) -> Iterator[Entrada]:
+        """Todas as entradas da cache (por ordem de chegada)"""
+        cur = self._ligacao().execute(
+            "SELECT url, sha256, etag, last_modified, content_type FROM respostas ORDER BY rowid"
+        )
+        for row in cur:
+            yield Entrada(*row)
+
+    def guardar(self, url: str, resp: requests.Response) -> Entrada:
+        sha = self._guardar_corpo(resp.content)
+        entrada = Entrada(
+            url, sha,
+            resp.headers.get("ETag", ""),
+            resp.headers.get("Last-Modified", ""),
+            resp.headers.get("Content-Type", ""),
+        )
+        agora = time.time()
+        with self._ligacao() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*entrada, agora, agora),
+            )
+        self._contar("guardadas")
+        return entrada
+
+    def revalidada(self, url: str, resp: requests.Response, entrada: Entrada) -> Entrada:
+        """Resposta 304: mantém o corpo e atualiza os validadores se o servidor mandou novos"""
+        entrada = entrada._replace(
+            etag=resp.headers.get("ETag", entrada.etag),
+            last_modified=resp.headers.get("Last-Modified", entrada.last_modified),
+        )
+        with self._ligacao() as con:
+            con.execute(
+                "UPDATE respostas SET etag = ?, last_modified = ?, validado_em = ? WHERE url = ?",
+                (entrada.etag, entrada.last_modified, time.time(), url),
+            )
+        self._contar("304")
+        return entrada
+
+    @staticmethod
+    def cabecalhos_condicionais(entrada: Optional[Entrada]) -> Dict[str, str]:
+        cabecalhos = {}
+        if entrada is not None:
+            if entrada.etag:
+                cabecalhos["If-None-Match"] = entrada.etag
+            if entrada.last_modified:
+                cabecalhos["If-Modified-Since"] = entrada.last_modified
+        return cabecalhos
+
+    def servir_offline(self, url: str) -> requests.Response:
+        entrada = self.procurar(url)
+        if entrada is not None:
+            self._contar("offline")
+        return self.resposta(url, entrada)
+
+    def resposta(self, url: str, entrada: Optional[Entrada]) -> requests.Response:
+        """Constrói uma requests.Response a partir da cache (504 se não houver entrada)"""
+        resp = requests.Response()
+        resp.url = url
+        if entrada is None:
+            self._contar("em_falta")
+            resp.status_code = 504
+            resp._content = b""
+            return resp
+        resp.status_code = 200
+        resp._content = self.ler_corpo(entrada.sha256)
+        if entrada.content_type:
+            resp.headers["Content-Type"] = entrada.content_type
+        if entrada.etag:
+            resp.headers["ETag"] = entrada.etag
+        if entrada.last_modified:
+            resp.headers["Last-Modified"] = entrada.last_modified
+        resp.encoding = requests.utils.get_encoding_from_headers(resp.headers) or "utf-8"
+        return resp
+
+    def resumo(self) -> str:
+        e = self.estatisticas
+        return (f"cache: {e['guardadas']} guardadas, {e['304']} revalidadas (304), "
+                f"{e['offline']} servidas offline, {e['em_falta']} em falta")
@@ -1,37 +1,23 @@
-import csv
+# Passo antigo da cadeia clean_csv.py -> add_id.py. O pipeline.py faz tudo
+# num só passo (e gera o artefacto normalizado); este script usa as mesmas
+# etapas e continua a gerar exatamente o mesmo recipes_old.csv.
+from pipeline import escritor_recipes_old, ler_linhas, limpar
 
 input_file = "petitchef_recipes.csv"  # o teu ficheiro original
 output_file = "recipes_old.csv"  # ficheiro limpo
 
-with open(input_file, "r", encoding="utf-8", newline="") as fin, \
-     open(output_file, "w", encoding="utf-8", newline="") as fout:
-
-    reader = csv.DictReader(fin)
-
-    fieldnames = reader.fieldnames
+with open(output_file, "w", encoding="utf-8", newline="") as fout:
+    campos = []
+    linhas = limpar(ler_linhas(input_file, campos))
+    primeira = next(linhas, None)
 
     # escreve CSV novo com ; e sem aspas
-    writer = csv.DictWriter(
-        fout,
-        fieldnames=fieldnames,
-        delimiter=';',          # <<< agora usa ponto e vírgula
-        quoting=csv.QUOTE_NONE, # <<< não mete aspas
-        escapechar='\\'         # caso algum campo tenha ; no futuro
-    )
-
+    writer = escritor_recipes_old(fout, campos)
     writer.writeheader()
 
-    for row in reader:
-        # limpar aspas NOS CAMPOS titulo e passos
-        for col in ("titulo", "passos"):
-            if row.get(col) is not None:
-                row[col] = row[col].replace('"', "").replace("'", "")
-
-        # normalizar dificuldade: "Muito Fácil" -> "Fácil"
-        if row.get("dificuldade") == "Muito Fácil":
-            row["dificuldade"] = "Fácil"
-
+    if primeira is not None:
+        writer.writerow(primeira)
+    for row in linhas:
         writer.writerow(row)
 
 print("Feito! Ficheiro gerado:", output_file)
-
@@ -1,12 +1,30 @@
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
-from bs4.element import Tag
+from bs4.element import CData, NavigableString, Tag
+import argparse
+import concurrent.futures
 import csv
+import os
+import queue
 import re
+import threading
 import time
 import unicodedata
+from collections import Counter
+from urllib.parse import urlsplit
 
-BASE = "https://pt.petitchef.com"
+from cache_http import CacheHTTP
+from pipeline import _FicheiroAtomico, chave_conteudo
+
+try:
+    import lxml  # noqa: F401  (só para saber se o BeautifulSoup o pode usar)
+    PARSER_HTML = "lxml"
+except ImportError:
+    PARSER_HTML = "html.parser"
+
+# Pode ser trocado (--base / PETITCHEF_BASE) para o servidor_fixtures.py local
+BASE = os.environ.get("PETITCHEF_BASE", "https://pt.petitchef.com")
 
 CATEGORIAS = {
     "Entrada": "entrada",
@@ -24,6 +42,12 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (projeto-scraping-petitchef)"
 }
 
+# Valores por omissão do crawler (ver --concorrencia, --taxa e --rajada)
+CONCORRENCIA = 8        # pedidos HTTP em simultâneo (no total)
+TAXA_POR_HOST = 2.0     # pedidos/segundo por host (antes: 1 pedido + sleep(1))
+RAJADA_POR_HOST = 2     # pedidos que podem sair seguidos antes de o limite atuar
+PREFETCH_LISTAGENS = 4  # páginas de listagem pedidas em avanço
+
 CRITERIOS_POSSIVEIS = [
     "Sem glúten",
     "Vegan",
@@ -34,6 +58,102 @@ CRITERIOS_POSSIVEIS = [
 ]
 
 
+class BaldeDeTokens:
+    """
+    Rate limit por token bucket: enche `taxa` tokens por segundo até `capacidade`
+    e cada pedido gasta um. Substitui o time.sleep(1) fixo depois de cada pedido,
+    que também esperava pelo tempo da própria resposta.
+    """
+
+    def __init__(self, taxa: float, capacidade: int = 1):
+        self.taxa = taxa
+        self.capacidade = max(1, capacidade)
+        self.tokens = float(self.capacidade)
+        self.ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        if self.taxa <= 0:
+            return  # sem limite
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self.tokens = min(self.capacidade, self.tokens + (agora - self.ultimo) * self.taxa)
+                self.ultimo = agora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                espera = (1 - self.tokens) / self.taxa
+            time.sleep(espera)
+
+
+class ClienteHTTP:
+    """
+    Sessão HTTP partilhada pelas threads do crawler:
+      - keep-alive com um pool de ligações (HTTPAdapter) do tamanho da concorrência;
+      - limite global de pedidos em simultâneo (semáforo);
+      - um BaldeDeTokens por host;
+      - opcionalmente uma CacheHTTP: pedidos condicionais (ETag/Last-Modified) e,
+        em modo offline, nenhum pedido à rede.
+    """
+
+    def __init__(self, concorrencia: int = CONCORRENCIA, taxa_por_host: float = TAXA_POR_HOST,
+                 rajada: int = RAJADA_POR_HOST, timeout: float = 10, cache: CacheHTTP = None):
+        self.timeout = timeout
+        self.cache = cache
+        self.taxa_por_host = taxa_por_host
+        self.rajada = rajada
+
+        self.sessao = requests.Session()
+        self.sessao.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, concorrencia))
+        self.sessao.mount("http://", adapter)
+        self.sessao.mount("https://", adapter)
+
+        self._vagas = threading.BoundedSemaphore(max(1, concorrencia))
+        self._baldes = {}
+        self._lock = threading.Lock()
+
+    def _balde(self, url: str) -> BaldeDeTokens:
+        host = urlsplit(url).netloc
+        with self._lock:
+            balde = self._baldes.get(host)
+            if balde is None:
+                balde = self._baldes[host] = BaldeDeTokens(self.taxa_por_host, self.rajada)
+            return balde
+
+    def get(self, url: str) -> requests.Response:
+        if self.cache is None:
+            self._balde(url).adquirir()
+            with self._vagas:
+                return self.sessao.get(url, timeout=self.timeout)
+
+        if self.cache.offline:
+            return self.cache.servir_offline(url)
+
+        entrada = self.cache.procurar(url)
+        self._balde(url).adquirir()
+        with self._vagas:
+            resp = self.sessao.get(url, timeout=self.timeout, headers=self.cache.cabecalhos_condicionais(entrada))
+
+        if resp.status_code == 304 and entrada is not None:
+            return self.cache.resposta(url, self.cache.revalidada(url, resp, entrada))
+        if resp.status_code == 200:
+            self.cache.guardar(url, resp)
+        return resp
+
+
+_cliente_padrao = None
+
+
+def cliente_padrao() -> ClienteHTTP:
+    """Cliente sequencial (1 pedido de cada vez, 1/s) para quem usa as funções soltas"""
+    global _cliente_padrao
+    if _cliente_padrao is None:
+        _cliente_padrao = ClienteHTTP(concorrencia=1, taxa_por_host=1.0, rajada=1)
+    return _cliente_padrao
+
+
 def obter_imagem_principal(soup):
     """
     Tenta obter a imagem principal da receita.
@@ -112,38 +232,81 @@ def normalizar(s: str) -> str:
     return s
 
 
-def get_recipe_links_limited(slug, max_needed, max_pages=150):
-    links = []
-    page = 1
-
-    while len(links) < max_needed and page <= max_pages:
-        if page == 1:
-            url = f"{BASE}/receitas/{slug}"
-        else:
-            url = f"{BASE}/receitas/{slug}-page-{page}"
+def url_listagem(slug, page):
+    if page == 1:
+        return f"{BASE}/receitas/{slug}"
+    return f"{BASE}/receitas/{slug}-page-{page}"
 
-        print(f"[LISTA] {url}")
-        resp = requests.get(url, headers=HEADERS)
-        if resp.status_code != 200:
-            print("Falhou página:", resp.status_code)
-            break
 
-        soup = BeautifulSoup(resp.text, "html.parser")
+def links_da_listagem(slug, page, cliente):
+    """
+    Descarrega uma página de listagem e devolve os links de receita (fid-) por ordem,
+    ou None se a página falhou (fim da paginação, erro de rede, ...).
+    """
+    url = url_listagem(slug, page)
+    print(f"[LISTA] {url}")
+    try:
+        resp = cliente.get(url)
+    except requests.exceptions.RequestException as e:
+        print("Falhou página:", e)
+        return None
+    if resp.status_code != 200:
+        print("Falhou página:", resp.status_code)
+        return None
 
-        for a in soup.select("h2 a"):
-            href = a.get("href", "")
-            if "/receitas/" in href and "fid-" in href:
-                if href.startswith("/"):
-                    href = BASE + href
-                if href not in links:
-                    links.append(href)
-                    if len(links) >= max_needed:
-                        break
+    soup = BeautifulSoup(resp.text, "html.parser")
+    links = []
+    for a in soup.select("h2 a"):
+        href = a.get("href", "")
+        if "/receitas/" in href and "fid-" in href:
+            if href.startswith("/"):
+                href = BASE + href
+            links.append(href)
+    return links
 
-        page += 1
-        time.sleep(1)
 
-    return links
+def gerar_links(slug, max_needed, max_pages=150, cliente=None, prefetch=PREFETCH_LISTAGENS):
+    """
+    Percorre as páginas de listagem da categoria e vai devolvendo (yield) cada
+    link de receita novo assim que é encontrado, para o parse das receitas
+    poder começar antes de a listagem acabar.
+
+    Os URLs das páginas são previsíveis (-page-N), por isso as `prefetch` páginas
+    seguintes já vão sendo pedidas em paralelo enquanto a atual é tratada. Os links
+    saem sempre pela ordem das páginas; assim que há `max_needed` links únicos
+    (set, em vez do `in` numa lista) os pedidos por fazer são cancelados.
+    """
+    cliente = cliente or cliente_padrao()
+    vistos = set()
+    if max_needed <= 0:
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, prefetch)) as pool:
+        pedidas = {}   # página -> Future
+        proxima = 1
+        try:
+            for page in range(1, max_pages + 1):
+                while proxima <= max_pages and proxima < page + max(1, prefetch):
+                    pedidas[proxima] = pool.submit(links_da_listagem, slug, proxima, cliente)
+                    proxima += 1
+
+                links = pedidas.pop(page).result()
+                if links is None:
+                    return
+
+                for href in links:
+                    if href not in vistos:
+                        vistos.add(href)
+                        yield href
+                        if len(vistos) >= max_needed:
+                            return
+        finally:
+            for futuro in pedidas.values():
+                futuro.cancel()
+
+
+def get_recipe_links_limited(slug, max_needed, max_pages=150, cliente=None):
+    return list(gerar_links(slug, max_needed, max_pages, cliente))
 
 
 def extract_text_after_heading(soup, heading_text):
@@ -156,19 +319,425 @@ def extract_text_after_heading(soup, heading_text):
     return el
 
 
-def parse_recipe(url, categoria):
-    print(f"[RECEITA] {url}")
+def descarregar_receita(url, cliente=None):
+    """
+    Pede a página da receita. Devolve (estado, html):
+      - ("ok", html) se correu bem;
+      - ("falhou", None) para respostas definitivas (404, 410, ...);
+      - ("erro", None) para falhas temporárias (rede, 5xx, 429), que vale a pena repetir.
+    """
+    cliente = cliente or cliente_padrao()
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=10)
+        resp = cliente.get(url)
     except requests.exceptions.RequestException as e:
         print(f"  -> Erro de rede, a ignorar esta receita: {e}")
-        return None
+        return "erro", None
 
     if resp.status_code != 200:
         print("  -> Falhou receita:", resp.status_code)
+        temporario = resp.status_code >= 500 or resp.status_code == 429
+        return ("erro" if temporario else "falhou"), None
+
+    return "ok", resp.text
+
+
+def parse_recipe(url, categoria, cliente=None):
+    print(f"[RECEITA] {url}")
+    _estado, html = descarregar_receita(url, cliente)
+    if html is None:
         return None
+    return parse_recipe_html(html, url, categoria)
 
-    soup = BeautifulSoup(resp.text, "html.parser")
+
+# Os mesmos tipos de texto que soup.stripped_strings considera (sem comentários, scripts, ...)
+_TIPOS_TEXTO = (NavigableString, CData)
+# Tags cujo texto o BeautifulSoup guarda com outro tipo (Script, Stylesheet, ...)
+_CONTENTORES_ESPECIAIS = frozenset(("script", "style", "template", "rt", "rp"))
+
+RE_KCAL = re.compile(r"(\d+)\s*Kcal", re.IGNORECASE)
+RE_TEMPO = re.compile(r"\b\d+\s*(h|min)")
+RE_RATING = re.compile(r"(\d+(?:[.,]\d+)?)/5")
+RE_PORCOES = re.compile(r'(\d+)\s*(porções|doses|servings)', re.I)
+
+
+class _Documento:
+    """
+    A página achatada por ordem do documento (a ordem de soup.descendants):
+      - tags: nome, atributos e `fim` (índice a seguir ao último descendente);
+      - textos: a string e se é texto "normal" (o que o stripped_strings/get_text
+        do BeautifulSoup veem) ou outro (comentários, scripts, estilos, ...).
+    Pode ser construída a partir de uma árvore BeautifulSoup ou diretamente do lxml.
+    """
+
+    TAG, TEXTO, OUTRO = 0, 1, 2
+    __slots__ = ("tipos", "valores", "atributos", "fins")
+
+    def __init__(self):
+        self.tipos = []
+        self.valores = []     # nome da tag ou a string
+        self.atributos = []   # atributos da tag (None para textos)
+        self.fins = []
+
+    def _tag(self, nome, atributos):
+        i = len(self.tipos)
+        self.tipos.append(self.TAG)
+        self.valores.append(nome)
+        self.atributos.append(atributos)
+        self.fins.append(i + 1)
+        return i
+
+    def _texto(self, texto, normal):
+        i = len(self.tipos)
+        self.tipos.append(self.TEXTO if normal else self.OUTRO)
+        self.valores.append(texto)
+        self.atributos.append(None)
+        self.fins.append(i + 1)
+
+    @classmethod
+    def de_soup(cls, soup):
+        doc = cls()
+        abertas = []   # (tag bs4, índice)
+        for el in soup.descendants:
+            pai = el.parent
+            while abertas and abertas[-1][0] is not pai:
+                doc.fins[abertas.pop()[1]] = len(doc.tipos)
+            if isinstance(el, Tag):
+                abertas.append((el, doc._tag(el.name, el.attrs)))
+            else:
+                doc._texto(str(el), type(el) in _TIPOS_TEXTO)
+        for _, i in abertas:
+            doc.fins[i] = len(doc.tipos)
+        return doc
+
+    @classmethod
+    def de_lxml(cls, html):
+        from lxml import etree, html as lxml_html
+
+        try:
+            raiz = lxml_html.document_fromstring(html)
+        except ValueError:  # str com declaração de encoding
+            raiz = lxml_html.document_fromstring(html.encode("utf-8"))
+
+        doc = cls()
+        abertas = []       # índices das tags abertas
+        especiais = []     # profundidade dos contentores especiais abertos (script, style, ...)
+        for evento, el in etree.iterwalk(raiz, events=("start", "end", "comment", "pi")):
+            if evento == "start":
+                nome = el.tag
+                atributos = dict(el.attrib)
+                if "class" in atributos:
+                    atributos["class"] = atributos["class"].split()
+                abertas.append(doc._tag(nome, atributos))
+                if nome in _CONTENTORES_ESPECIAIS:
+                    especiais.append(len(abertas))
+                if el.text:
+                    doc._texto(el.text, not especiais)
+                continue
+            if evento == "end":
+                if especiais and especiais[-1] == len(abertas):
+                    especiais.pop()
+                doc.fins[abertas.pop()] = len(doc.tipos)
+            else:  # comentário / processing instruction: no BeautifulSoup é uma string à parte
+                if el.text:
+                    doc._texto(el.text, False)
+            if el.tail:
+                doc._texto(el.tail, not especiais)
+        return doc
+
+    def texto(self, i, separador="", strip=False):
+        """O equivalente a tag.get_text(separador, strip=strip) para a tag no índice i"""
+        partes = []
+        tipos, valores = self.tipos, self.valores
+        for k in range(i + 1, self.fins[i]):
+            if tipos[k] == self.TEXTO:
+                t = valores[k]
+                if strip:
+                    t = t.strip()
+                    if not t:
+                        continue
+                partes.append(t)
+        return separador.join(partes)
+
+    def tags(self, i, nomes):
+        """Índices das tags descendentes de i com um destes nomes (como tag.find_all(nomes))"""
+        tipos, valores = self.tipos, self.valores
+        return [k for k in range(i + 1, self.fins[i]) if tipos[k] == self.TAG and valores[k] in nomes]
+
+
+def _classes(atributos):
+    valor = atributos.get("class") or ()
+    return valor.split() if isinstance(valor, str) else valor
+
+
+class _Passagem:
+    """Tudo o que o parse de uma receita precisa, recolhido numa só passagem pelo _Documento"""
+
+    def __init__(self, doc: _Documento):
+        self.doc = doc
+        self.og = self.twitter = self.h1 = self.sf_val = self.sec_ingredientes = None
+        self.i_ingredientes = self.i_preparacao = self.i_nutricao = None
+        self.calorias = self.rating = self.porcoes_texto = None
+        self.servings_digito = self.servings_ultimo = None
+        self.tem_servings = False
+        self.imgs_depois_h1 = []
+        self.textos_h1 = []
+        n_textos_h1 = 0
+
+        TAG, TEXTO = _Documento.TAG, _Documento.TEXTO
+        tipos, valores, atributos = doc.tipos, doc.valores, doc.atributos
+        for i in range(len(tipos)):
+            tipo = tipos[i]
+            if tipo == TAG:
+                nome = valores[i]
+                attrs = atributos[i]
+                if nome == "meta":
+                    if self.og is None and attrs.get("property") == "og:image":
+                        self.og = attrs
+                    if self.twitter is None and attrs.get("name") == "twitter:image":
+                        self.twitter = attrs
+                elif nome == "h1":
+                    if self.h1 is None:
+                        self.h1 = i
+                elif nome in ("h2", "h3"):
+                    if self.i_ingredientes is None and "Ingredientes" in doc.texto(i):
+                        self.i_ingredientes = i
+                    if self.i_preparacao is None and "Preparação" in doc.texto(i):
+                        self.i_preparacao = i
+                    if self.i_nutricao is None and "nutrição" in doc.texto(i, " ", strip=True).strip().lower():
+                        self.i_nutricao = i
+                elif nome == "section":
+                    if self.sec_ingredientes is None and attrs.get("id") == "rd-ingredients":
+                        self.sec_ingredientes = i
+
+                if self.h1 is not None and nome in ("figure", "img") and i > self.h1 \
+                        and len(self.imgs_depois_h1) < 60:
+                    self.imgs_depois_h1.append(i)
+
+                if "data-servings" in attrs:
+                    self.tem_servings = True
+                    valor = attrs["data-servings"].strip()
+                    self.servings_ultimo = valor
+                    if self.servings_digito is None and valor and valor.isdigit():
+                        self.servings_digito = valor
+                if self.sf_val is None and "class" in attrs and "sf-val" in _classes(attrs):
+                    self.sf_val = i
+                continue
+
+            # --- texto (de qualquer tipo: conta para os 40 textos a seguir ao h1) ---
+            if self.h1 is not None and n_textos_h1 < 40:
+                n_textos_h1 += 1
+                t = valores[i].strip()
+                if t:
+                    self.textos_h1.append(t)
+
+            if tipo == TEXTO:
+                t = valores[i].strip()
+                if not t:
+                    continue
+                if self.calorias is None:
+                    m = RE_KCAL.search(t)
+                    if m:
+                        self.calorias = f"{m.group(1)} Kcal"
+                if self.rating is None:
+                    m = RE_RATING.search(t)
+                    if m and "votos" in t:
+                        self.rating = m.group(1).replace(",", ".")
+                if self.porcoes_texto is None:
+                    m = RE_PORCOES.search(t)
+                    if m:
+                        self.porcoes_texto = m.group(1)
+
+    def titulo(self):
+        return self.doc.texto(self.h1, strip=True) if self.h1 is not None else ""
+
+    def imagem(self):
+        """Mesma estratégia que obter_imagem_principal: og:image, twitter:image, img a seguir ao h1"""
+        if self.og is not None and self.og.get("content"):
+            return self.og["content"].strip()
+        if self.twitter is not None and self.twitter.get("content"):
+            return self.twitter["content"].strip()
+        doc = self.doc
+        for i in self.imgs_depois_h1:
+            if doc.valores[i] != "img":
+                imgs = doc.tags(i, ("img",))
+                if not imgs:
+                    continue
+                i = imgs[0]
+            attrs = doc.atributos[i]
+            src = attrs.get("src") or attrs.get("data-src") or attrs.get("data-lazy-src")
+            if src:
+                return src.strip()
+        return None
+
+    def porcoes(self):
+        doc = self.doc
+        porcoes = None
+        # data-servings: o primeiro valor numérico (se nenhum for, fica o último, como antes)
+        if self.tem_servings:
+            porcoes = self.servings_digito if self.servings_digito is not None else self.servings_ultimo
+
+        if not porcoes and self.sf_val is not None:
+            text = doc.texto(self.sf_val, strip=True)
+            if text and text.isdigit():
+                porcoes = text
+            else:
+                last_val = doc.atributos[self.sf_val].get("data-laste", "")
+                if last_val and last_val.isdigit():
+                    porcoes = last_val
+
+        if not porcoes and self.sec_ingredientes is not None:
+            for k in doc.tags(self.sec_ingredientes, ("div", "span")):
+                if 'servings' in str(doc.atributos[k].get('class', '')):
+                    match = RE_PORCOES.search(doc.texto(k, strip=True))
+                    if match:
+                        porcoes = match.group(1)
+                        break
+
+        if not porcoes:
+            porcoes = self.porcoes_texto or porcoes
+        return porcoes
+
+    def lista_depois_de(self, i_heading):
+        """Itens (li/p) do bloco a seguir a um heading, como extract_text_after_heading + find_all_next"""
+        doc = self.doc
+        itens = []
+        if i_heading is None:
+            return itens
+        tipos, valores = doc.tipos, doc.valores
+        n = len(tipos)
+        i = i_heading + 1
+        while i < n and tipos[i] != _Documento.TAG:
+            i += 1
+        if i >= n:
+            return itens
+        if valores[i] in ("ul", "ol"):
+            return [doc.texto(k, " ", strip=True) for k in doc.tags(i, ("li",))]
+        for k in range(i + 1, n):
+            if tipos[k] != _Documento.TAG:
+                continue
+            if valores[k] in ("h2", "h3"):
+                break
+            if valores[k] in ("li", "p"):
+                itens.append(doc.texto(k, " ", strip=True))
+        return itens
+
+    def textos_da_seccao(self, i_heading):
+        """Textos desde o heading até ao próximo h2/h3, como iter_texto_da_seccao"""
+        if i_heading is None:
+            return
+        tipos, valores = self.doc.tipos, self.doc.valores
+        for k in range(i_heading + 1, len(tipos)):
+            if tipos[k] == _Documento.TAG:
+                if valores[k] in ("h2", "h3"):
+                    break
+                continue
+            t = valores[k].strip()
+            if t:
+                yield t
+
+
+def parse_recipe_html(html, url, categoria, parser=None):
+    """
+    Extrai os campos da receita do HTML já descarregado (None se for para ignorar).
+
+    Percorre a página uma única vez (_Passagem) em vez das várias passagens de
+    parse_recipe_html_antigo. Com parser="lxml" (por omissão, se estiver instalado)
+    a página é lida diretamente pelo lxml, sem construir a árvore do BeautifulSoup;
+    com "html.parser" o resultado é igual ao da versão antiga.
+    """
+    if (parser or PARSER_HTML) == "lxml":
+        doc = _Documento.de_lxml(html)
+    else:
+        doc = _Documento.de_soup(BeautifulSoup(html, "html.parser"))
+    p = _Passagem(doc)
+
+    imagem = p.imagem()
+    if not imagem:
+        print("  -> Ignorada: não tem imagem")
+        return None
+
+    titulo = p.titulo()
+    if "?" in titulo:
+        print("  -> Ignorada: título contém '?'")
+        return None
+
+    calorias = p.calorias
+    if calorias is None:
+        print("  -> Ignorada: não tem Kcal")
+        return None
+
+    dificuldade = None
+    tempo_total = None
+    if p.h1 is not None:
+        for t in p.textos_h1:
+            if any(pal in t for pal in ("Fácil", "Médio", "Difícil")):
+                dificuldade = t
+                break
+        for t in p.textos_h1:
+            if RE_TEMPO.search(t):
+                tempo_total = t
+                break
+
+    if tempo_total is None:
+        print("  -> Ignorada: não tem tempo total")
+        return None
+
+    rating = p.rating
+    if rating is None:
+        print("  -> Ignorada: não tem rating")
+        return None
+
+    porcoes = p.porcoes()
+    if porcoes is None:
+        print("  -> Ignorada: não tem número de porções")
+        return None
+
+    ingredientes = p.lista_depois_de(p.i_ingredientes)
+    if not ingredientes:
+        print("  -> Ignorada: não tem ingredientes")
+        return None
+
+    ingredientes_str = " | ".join(ingredientes)
+    if ";" in ingredientes_str:
+        print("  -> Ignorada: ingredientes contêm ';'")
+        return None
+
+    passos_str = " | ".join(p.lista_depois_de(p.i_preparacao))
+    if ";" in passos_str:
+        print("  -> Ignorada: passos contêm ';'")
+        return None
+
+    criterios_encontrados = []
+    crit_norm_list = [(crit, normalizar(crit)) for crit in CRITERIOS_POSSIVEIS]
+    for text in p.textos_da_seccao(p.i_nutricao):
+        t_norm = normalizar(text)
+        for crit_original, crit_norm in crit_norm_list:
+            if crit_norm in t_norm and crit_original not in criterios_encontrados:
+                criterios_encontrados.append(crit_original)
+
+    return {
+        "titulo": titulo,
+        "categoria": categoria,
+        "dificuldade": dificuldade,
+        "tempo_total": tempo_total,
+        "calorias": calorias,
+        "rating": rating,
+        "porcoes": porcoes,
+        "ingredientes": ingredientes_str,
+        "passos": passos_str,
+        "criterios": " | ".join(criterios_encontrados),
+        "imagem": imagem,
+        "url": url,
+    }
+
+
+def parse_recipe_html_antigo(html, url, categoria):
+    """
+    Versão anterior do parse (várias passagens por soup.stripped_strings / find_all_next,
+    sempre com html.parser). Fica como referência: o benchmark_parser.py compara-a com
+    parse_recipe_html em velocidade e no resultado.
+    """
+    soup = BeautifulSoup(html, "html.parser")
     
         # imagem principal (obrigatória)
     imagem = obter_imagem_principal(soup)
@@ -359,46 +928,356 @@ def parse_recipe(url, categoria):
         "passos": passos_str,
         "criterios": " | ".join(criterios_encontrados),
         "imagem": imagem,
-
+        "url": url,
     }
 
 
 
-def main():
-    todas = []
-
-    for categoria_nome, slug in CATEGORIAS.items():
-        alvo = TARGETS[categoria_nome]
-        links = get_recipe_links_limited(slug, max_needed=alvo)
-        print(f"{categoria_nome}: {len(links)} links apanhados (alvo={alvo})")
-
-        for url in links:
-            dados = parse_recipe(url, categoria_nome)
-            if dados:
-                todas.append(dados)
-            time.sleep(1)
-
-    campos = [
-        "titulo",
-        "categoria",
-        "dificuldade",
-        "tempo_total",
-        "calorias",
-        "rating",
-        "porcoes",
-        "ingredientes",
-        "passos",
-        "criterios",
-        "imagem", 
-    ]
-
-    with open("petitchef_recipes.csv", "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=campos)
-        writer.writeheader()
-        for r in todas:
-            writer.writerow(r)
-
-    print("Feito: petitchef_recipes.csv")
+_FIM = object()
+
+
+def _parse_seguro(html, url, categoria, parser=None):
+    """Parse de uma página (corre nos processos do parse): um erro numa página não para o crawl"""
+    try:
+        return parse_recipe_html(html, url, categoria, parser)
+    except Exception as e:
+        print(f"  -> Erro a processar {url}: {e}")
+        return None
+
+
+def crawl(categorias, targets, cliente, trabalhadores=CONCORRENCIA, max_pages=150,
+          conhecidos=frozenset(), so_novos=False, processos=0, parser=None,
+          prefetch=PREFETCH_LISTAGENS):
+    """
+    Crawl em pipeline produtor/consumidor:
+      - uma thread produtora percorre as listagens (gerar_links) e mete os links numa fila limitada;
+      - `trabalhadores` threads descarregam as receitas;
+      - com processos > 0, o parse (CPU) corre num ProcessPoolExecutor, alimentado pelas
+        threads de download através de outra fila limitada; com processos=0 o parse é
+        feito na própria thread que descarregou a página.
+    O ritmo real de pedidos é controlado pelo ClienteHTTP (concorrência global e token bucket).
+
+    Os links em `conhecidos` (já visitados numa execução anterior) são saltados. Por omissão
+    contam para o alvo de cada categoria (retomar o mesmo crawl); com so_novos=True o alvo
+    conta apenas links novos (modo incremental).
+
+    Devolve (yield) tuplos (ordem, categoria_nome, url, dados, estado) à medida que as receitas
+    ficam prontas; `ordem` numera os links pedidos pela ordem das listagens, dados é None
+    para receitas ignoradas e estado é "ok", "ignorada", "falhou" ou "erro" (temporário).
+    """
+    parser = parser or PARSER_HTML
+    links = queue.Queue(maxsize=trabalhadores * 4)
+    paginas = queue.Queue(maxsize=max(1, processos) * 4)   # download -> parse
+    resultados = queue.Queue()
+    pool = concurrent.futures.ProcessPoolExecutor(processos) if processos > 0 else None
+
+    def produtor():
+        ordem = 0
+        try:
+            for categoria_nome, slug in categorias.items():
+                alvo = targets[categoria_nome]
+                n = saltados = 0
+                limite_listagem = max_pages * 1000 if so_novos else alvo
+                for url in gerar_links(slug, limite_listagem, max_pages, cliente, prefetch):
+                    if url in conhecidos:
+                        saltados += 1
+                        continue
+                    links.put((ordem, categoria_nome, url))
+                    ordem += 1
+                    n += 1
+                    if so_novos and n >= alvo:
+                        break
+                print(f"{categoria_nome}: {n} links novos, {saltados} já visitados (alvo={alvo})")
+        finally:
+            for _ in range(trabalhadores):
+                links.put(_FIM)
+
+    def descarregador():
+        while True:
+            item = links.get()
+            if item is _FIM:
+                (paginas if pool else resultados).put(_FIM)
+                return
+            ordem, categoria_nome, url = item
+            print(f"[RECEITA] {url}")
+            estado, html = descarregar_receita(url, cliente)
+            if html is None:
+                resultados.put((ordem, categoria_nome, url, None, estado))
+            elif pool:
+                paginas.put((ordem, categoria_nome, url, html))
+            else:
+                dados = _parse_seguro(html, url, categoria_nome, parser)
+                resultados.put((ordem, categoria_nome, url, dados, "ok" if dados else "ignorada"))
+
+    def despachante():
+        """Passa as páginas descarregadas aos processos do parse (no máximo 2 por processo em curso)"""
+        vagas = threading.BoundedSemaphore(processos * 2)
+        em_curso = []
+
+        def pronto(futuro, ordem, categoria_nome, url):
+            try:
+                dados = futuro.result()
+                estado = "ok" if dados else "ignorada"
+            except Exception as e:  # processo que morreu, pool parado, ...
+                print(f"  -> Erro a processar {url}: {e}")
+                dados, estado = None, "erro"
+            resultados.put((ordem, categoria_nome, url, dados, estado))
+            vagas.release()
+
+        terminados = 0
+        while terminados < trabalhadores:
+            item = paginas.get()
+            if item is _FIM:
+                terminados += 1
+                continue
+            ordem, categoria_nome, url, html = item
+            vagas.acquire()
+            try:
+                futuro = pool.submit(_parse_seguro, html, url, categoria_nome, parser)
+            except RuntimeError as e:  # pool já fechado (Ctrl-C)
+                vagas.release()
+                print(f"  -> Erro a processar {url}: {e}")
+                resultados.put((ordem, categoria_nome, url, None, "erro"))
+                continue
+            futuro.add_done_callback(lambda f, o=ordem, c=categoria_nome, u=url: pronto(f, o, c, u))
+            em_curso.append(futuro)
+        concurrent.futures.wait(em_curso)
+        resultados.put(_FIM)
+
+    threading.Thread(target=produtor, daemon=True).start()
+    for _ in range(trabalhadores):
+        threading.Thread(target=descarregador, daemon=True).start()
+    if pool:
+        threading.Thread(target=despachante, daemon=True).start()
+
+    completo = False
+    try:
+        terminados = 0
+        while terminados < (1 if pool else trabalhadores):
+            item = resultados.get()
+            if item is _FIM:
+                terminados += 1
+                continue
+            yield item
+        completo = True
+    finally:
+        if pool:
+            # Interrompido a meio (Ctrl-C): não fica à espera dos parses pendentes
+            pool.shutdown(wait=completo, cancel_futures=not completo)
+
+
+CAMPOS = [
+    "titulo",
+    "categoria",
+    "dificuldade",
+    "tempo_total",
+    "calorias",
+    "rating",
+    "porcoes",
+    "ingredientes",
+    "passos",
+    "criterios",
+    "imagem",
+    "url",
+]
+
+
+class SaidaIncremental:
+    """
+    Escreve as receitas no CSV à medida que ficam prontas (flush linha a linha) e
+    mantém um diário de URLs já visitados em `<saida>.visitados` ("estado<TAB>url").
+
+    Ao arrancar, os URLs conhecidos são os do diário mais os da coluna `url` do
+    CSV, por isso um crash entre escrever a linha e o diário não duplica receitas.
+    Falhas temporárias ("erro") não vão para o diário e são tentadas de novo.
+
+    Um CSV antigo, sem a coluna `url`, é migrado (reescrito com a coluna vazia).
+    As linhas sem url são reconhecidas pelo conteúdo (título, categoria e imagem,
+    a mesma chave do pipeline.py): na primeira execução essas receitas ainda são
+    descarregadas (e contam como novas para o alvo do --incremental), mas não se
+    escrevem outra vez e o url vai para o diário, para serem saltadas nas seguintes.
+    """
+
+    def __init__(self, caminho: str, campos=CAMPOS, recomecar: bool = False):
+        self.caminho = caminho
+        self.caminho_diario = caminho + ".visitados"
+        self.campos = list(campos)
+        self.conhecidos = set()
+        self.sem_url = Counter()   # chave_conteudo das linhas antigas, sem url
+        self.escritas = 0
+
+        if recomecar:
+            for c in (self.caminho, self.caminho_diario):
+                if os.path.exists(c):
+                    os.remove(c)
+
+        novo = not os.path.exists(self.caminho) or os.path.getsize(self.caminho) == 0
+        if not novo:
+            self._preparar_existente()
+        if os.path.exists(self.caminho_diario):
+            with open(self.caminho_diario, "r", encoding="utf-8") as f:
+                for linha in f:
+                    _, _, url = linha.rstrip("\n").partition("\t")
+                    if url:
+                        self.conhecidos.add(url)
+
+        self._f = open(self.caminho, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._f, fieldnames=self.campos)
+        if novo:
+            self._writer.writeheader()
+            self._f.flush()
+        self._diario = open(self.caminho_diario, "a", encoding="utf-8")
+
+    def _preparar_existente(self):
+        # Uma linha cortada a meio por um crash fica para trás: corta-se até ao último \n
+        with open(self.caminho, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            tamanho = f.tell()
+            f.seek(max(0, tamanho - 1))
+            if f.read(1) != b"\n":
+                f.seek(0)
+                dados = f.read()
+                f.truncate(dados.rfind(b"\n") + 1)
+
+        with open(self.caminho, "r", newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            colunas = reader.fieldnames
+        if colunas != self.campos:
+            if "url" in self.campos and colunas == [c for c in self.campos if c != "url"]:
+                self._migrar_sem_url()
+            else:
+                raise SystemExit(
+                    f"{self.caminho} tem colunas diferentes das esperadas ({colunas}); "
+                    "usa --recomecar ou outro --saida."
+                )
+
+        with open(self.caminho, "r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row.get("url"):
+                    self.conhecidos.add(row["url"])
+                else:
+                    self.sem_url[chave_conteudo(row)] += 1
+
+    def _migrar_sem_url(self):
+        """Reescreve (atomicamente) um CSV de antes da coluna `url`, com a coluna vazia"""
+        print(f"A migrar {self.caminho}: acrescenta a coluna url (vazia nas receitas já extraídas)")
+        destino = _FicheiroAtomico(self.caminho)
+        try:
+            writer = csv.DictWriter(destino.f, fieldnames=self.campos)
+            writer.writeheader()
+            with open(self.caminho, "r", newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    writer.writerow({**row, "url": ""})
+        except BaseException:
+            destino.abortar()
+            raise
+        destino.concluir()
+
+    def registar(self, url: str, dados, estado: str):
+        if dados and self.sem_url:
+            # Já está no CSV, de antes de haver coluna url: não se escreve outra vez
+            chave = chave_conteudo(dados)
+            if self.sem_url[chave] > 0:
+                self.sem_url[chave] -= 1
+                dados = None
+        if dados:
+            self._writer.writerow(dados)
+            self._f.flush()
+            self.escritas += 1
+        if estado != "erro":
+            self._diario.write(f"{estado}\t{url}\n")
+            self._diario.flush()
+        self.conhecidos.add(url)
+
+    def fechar(self):
+        self._f.close()
+        self._diario.close()
+
+
+def ler_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Extrai receitas do petitchef para petitchef_recipes.csv")
+    parser.add_argument("--base", default=BASE, help="URL base do site (ex.: http://127.0.0.1:8000 para as fixtures)")
+    parser.add_argument("--saida", default="petitchef_recipes.csv")
+    parser.add_argument("--concorrencia", type=int, default=CONCORRENCIA,
+                        help="número de pedidos em simultâneo (1 = modo sequencial antigo)")
+    parser.add_argument("--taxa", type=float, default=TAXA_POR_HOST,
+                        help="pedidos por segundo por host (0 = sem limite)")
+    parser.add_argument("--rajada", type=int, default=RAJADA_POR_HOST)
+    parser.add_argument("--max-por-categoria", type=int, default=None,
+                        help="substitui os TARGETS (útil para testes)")
+    parser.add_argument("--max-paginas", type=int, default=150)
+    parser.add_argument("--prefetch-listagens", type=int, default=PREFETCH_LISTAGENS,
+                        help="páginas de listagem pedidas em paralelo, à frente da atual (1 = uma de cada vez)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="o alvo de cada categoria conta só receitas novas (que ainda não estão no CSV)")
+    parser.add_argument("--recomecar", action="store_true",
+                        help="apaga o CSV e o diário de visitados e começa do zero")
+    parser.add_argument("--cache", default="cache_http",
+                        help="pasta da cache de respostas HTTP (revalidada com ETag/Last-Modified)")
+    parser.add_argument("--sem-cache", action="store_true", help="não usa a cache de respostas")
+    parser.add_argument("--offline", action="store_true",
+                        help="só usa a cache, sem pedidos à rede (para refazer o parse depois de mudar o parser)")
+    parser.add_argument("--parser-html", default=PARSER_HTML, choices=("lxml", "html.parser"),
+                        help="parser do BeautifulSoup (por omissão lxml, se estiver instalado)")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1,
+                        help="processos para o parse (0 = parse nas threads de download)")
+    parser.add_argument("--so-parse", metavar="PASTA_CACHE", default=None,
+                        help="só o parse: refaz o --saida a partir de todas as páginas na cache, sem rede")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global BASE, PARSER_HTML
+    args = ler_argumentos(argv)
+    BASE = args.base.rstrip("/")
+    PARSER_HTML = args.parser_html
+
+    targets = dict(TARGETS)
+    if args.max_por_categoria is not None:
+        targets = {c: args.max_por_categoria for c in targets}
+
+    if args.so_parse:
+        # Tudo o que está na cache, sem rede e sem alvo: as listagens em cache dizem a
+        # categoria e a ordem de cada receita, e o CSV de saída é refeito do zero.
+        args.cache, args.offline, args.sem_cache, args.recomecar = args.so_parse, True, False, True
+        targets = {c: args.max_paginas * 1000 for c in targets}
+
+    cache = None
+    if not args.sem_cache:
+        cache = CacheHTTP(args.cache, offline=args.offline)
+    elif args.offline:
+        raise SystemExit("--offline precisa da cache (tira o --sem-cache).")
+    cliente = ClienteHTTP(concorrencia=args.concorrencia, taxa_por_host=args.taxa, rajada=args.rajada, cache=cache)
+
+    saida = SaidaIncremental(args.saida, recomecar=args.recomecar)
+    if saida.conhecidos:
+        print(f"A retomar: {len(saida.conhecidos)} URLs já visitados em {args.saida}")
+
+    inicio = time.perf_counter()
+    # As receitas chegam pela ordem em que acabam; para o CSV ficar na ordem das
+    # listagens, cada resultado espera aqui até os anteriores estarem escritos.
+    pendentes = {}
+    proxima = 0
+    try:
+        for ordem, _categoria, url, dados, estado in crawl(
+            CATEGORIAS, targets, cliente, args.concorrencia, args.max_paginas,
+            conhecidos=frozenset(saida.conhecidos), so_novos=args.incremental,
+            processos=args.processos, parser=args.parser_html, prefetch=args.prefetch_listagens,
+        ):
+            pendentes[ordem] = (url, dados, estado)
+            while proxima in pendentes:
+                saida.registar(*pendentes.pop(proxima))
+                proxima += 1
+    except KeyboardInterrupt:
+        print(f"Interrompido: {saida.escritas} receitas novas já estão em {args.saida}; "
+              "corre outra vez para continuar.")
+        return
+    finally:
+        saida.fechar()
+
+    print(f"Feito: {args.saida} ({saida.escritas} receitas novas em {time.perf_counter() - inicio:.1f}s)")
+    if cache is not None:
+        print(cache.resumo())
 
 
 if __name__ == "__main__":
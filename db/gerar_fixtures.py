@@ -0,0 +1,150 @@
+"""
+Gera páginas HTML de teste (db/fixtures/) a partir de petitchef_recipes.csv.
+
+As páginas imitam a estrutura das páginas do petitchef que o extract_data.py
+usa (listagens com <h2><a href="...-fid-N">, h1 do título, bloco de infos,
+"x/5 (N votos)", data-servings, secções Ingredientes/Preparação/Nutrição),
+de forma a poder testar o crawler sem rede com o servidor_fixtures.py.
+Inclui também algumas receitas que o parser tem de ignorar (sem Kcal, título
+com '?') e links repetidos entre páginas de listagem.
+
+Uso (dentro da pasta db/):
+    python gerar_fixtures.py [receitas_por_categoria] [receitas_por_pagina]
+"""
+
+import csv
+import html
+import os
+import re
+import sys
+import unicodedata
+
+ENTRADA = "petitchef_recipes.csv"
+PASTA = "fixtures"
+
+CATEGORIAS = {
+    "Entrada": "entrada",
+    "Prato Principal": "prato-principal",
+    "Sobremesa": "sobremesa",
+}
+
+
+def slug(texto: str) -> str:
+    texto = unicodedata.normalize("NFD", texto.lower())
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
+    return re.sub(r"[^a-z0-9]+", "-", texto).strip("-") or "receita"
+
+
+def pagina_receita(r: dict, com_kcal: bool = True) -> str:
+    e = html.escape
+    ingredientes = "".join(f"<li>{e(i.strip())}</li>" for i in r["ingredientes"].split("|") if i.strip())
+    passos = "".join(f"<li>{e(p.strip())}</li>" for p in r["passos"].split("|") if p.strip())
+    criterios = "".join(
+        f'<span class="nutri-badge">{e(c.strip())}</span>' for c in r["criterios"].split("|") if c.strip()
+    )
+    kcal = f'<span class="rd-kcal">{e(r["calorias"])}</span>' if com_kcal else ""
+    return f"""<!DOCTYPE html>
+<html lang="pt">
+<head>
+<meta charset="utf-8">
+<title>{e(r["titulo"])} - Receita Petitchef</title>
+<meta property="og:image" content="{e(r["imagem"])}">
+</head>
+<body>
+<header><nav><a href="/">Petitchef</a> <a href="/receitas/{CATEGORIAS[r["categoria"]]}">{e(r["categoria"])}</a></nav></header>
+<main>
+<article>
+<h1>{e(r["titulo"])}</h1>
+<div class="rd-infos">
+<span class="rd-dif">{e(r["dificuldade"])}</span>
+<span class="rd-time">{e(r["tempo_total"])}</span>
+{kcal}
+</div>
+<div class="rd-rating"><span>{e(r["rating"])}/5 (27 votos)</span></div>
+<figure><img src="{e(r["imagem"])}" alt="{e(r["titulo"])}"></figure>
+<section id="rd-ingredients">
+<div class="rd-servings" data-servings="{e(r["porcoes"])}"><span class="sf-val">{e(r["porcoes"])}</span> porções</div>
+<h2>Ingredientes</h2>
+<ul>{ingredientes}</ul>
+</section>
+<section id="rd-steps">
+<h2>Preparação</h2>
+<ol>{passos}</ol>
+</section>
+<section id="rd-nutrition">
+<h2>Nutrição</h2>
+<p>Valores por porção</p>
+{criterios}
+</section>
+<section id="rd-comments">
+<h2>Comentários</h2>
+<p>Sem comentários.</p>
+</section>
+</article>
+</main>
+</body>
+</html>
+"""
+
+
+def pagina_listagem(categoria: str, links: list) -> str:
+    e = html.escape
+    itens = "".join(f'<div class="recipe-item"><h2><a href="{e(href)}">{e(titulo)}</a></h2></div>\n' for href, titulo in links)
+    return f"""<!DOCTYPE html>
+<html lang="pt">
+<head><meta charset="utf-8"><title>Receitas de {e(categoria)}</title></head>
+<body>
+<h1>Receitas de {e(categoria)}</h1>
+<h2><a href="/receitas/{CATEGORIAS[categoria]}">Todas</a></h2>
+{itens}</body>
+</html>
+"""
+
+
+def escrever(caminho: str, conteudo: str):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "w", encoding="utf-8", newline="\n") as f:
+        f.write(conteudo)
+
+
+def main():
+    por_categoria = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    por_pagina = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with open(ENTRADA, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    fid = 100000
+    total = 0
+    for categoria, cat_slug in CATEGORIAS.items():
+        escolhidas = [r for r in rows if r["categoria"] == categoria][:por_categoria]
+        links = []
+        for n, r in enumerate(escolhidas):
+            fid += 1
+            href = f"/receitas/receita/{slug(r['titulo'])}-fid-{fid}"
+            # Uma receita em cada 7 perde as Kcal: o parser tem de a ignorar
+            escrever(os.path.join(PASTA, href.lstrip("/") + ".html"), pagina_receita(r, com_kcal=(n % 7 != 3)))
+            links.append((href, r["titulo"]))
+            total += 1
+
+        # Receita com '?' no título (também tem de ser ignorada)
+        fid += 1
+        armadilha = dict(escolhidas[0], titulo="Sabe fazer " + escolhidas[0]["titulo"].lower() + "?")
+        href = f"/receitas/receita/{slug(armadilha['titulo'])}-fid-{fid}"
+        escrever(os.path.join(PASTA, href.lstrip("/") + ".html"), pagina_receita(armadilha))
+        links.insert(len(links) // 2, (href, armadilha["titulo"]))
+        total += 1
+
+        paginas = [links[i:i + por_pagina] for i in range(0, len(links), por_pagina)]
+        for p, grupo in enumerate(paginas, start=1):
+            # As listagens reais repetem receitas em destaque de página para página
+            if p > 1:
+                grupo = [paginas[0][0]] + grupo
+            nome = cat_slug if p == 1 else f"{cat_slug}-page-{p}"
+            escrever(os.path.join(PASTA, "receitas", nome + ".html"), pagina_listagem(categoria, grupo))
+
+    print(f"Feito: {total} páginas de receita em {PASTA}/")
+
+
+if __name__ == "__main__":
+    main()
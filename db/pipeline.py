@@ -0,0 +1,382 @@
+"""
+Pipeline de dados num só passo, em streaming:
+
+    petitchef_recipes.csv -> limpar -> formato recipes_old -> ids -> recipes.csv
+                                                                   -> normalizar -> recipes.catalogo.bin
+
+Substitui a cadeia clean_csv.py -> add_id.py (cada um lia e escrevia o ficheiro
+inteiro) e faz a normalização (tempo em minutos, Kcal, rating, listas '|') uma
+única vez, offline. O recipes.csv sai igual byte a byte ao da cadeia antiga; o
+recipes.catalogo.bin tem o catálogo por colunas e os índices de pesquisa já
+construídos, e é o que o servidor de ações mapeia em memória quando está
+atualizado (ver actions/catalogo_binario.py), sem parse nenhum no arranque.
+
+Cada etapa é um gerador de dicts: a única coisa que fica em memória é o
+catálogo por colunas, construído à medida que as linhas são escritas.
+
+Uso (dentro da pasta db/):
+    python pipeline.py [--entrada petitchef_recipes.csv] [--saida recipes.csv]
+                       [--intermedio recipes_old.csv] [--sem-catalogo]
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+from collections import defaultdict, deque
+from typing import Dict, Iterable, Iterator, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from actions.catalogo import (  # noqa: E402
+    assinatura_conteudo, caminho_artefacto, construir_catalogo, normalizar_linha,
+)
+from actions.catalogo_binario import escrever_catalogo  # noqa: E402
+from actions.indices import normalizar  # noqa: E402
+
+
+# --- 1. leitura ---
+
+def ler_linhas(caminho: str, campos: Optional[List[str]] = None) -> Iterator[Dict[str, str]]:
+    """Linhas do CSV do scraping (separador ','). Preenche `campos` com o cabeçalho."""
+    with open(caminho, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        if campos is not None:
+            campos[:] = reader.fieldnames or []
+        yield from reader
+
+
+# --- 2. limpeza (o que o clean_csv.py fazia) ---
+
+def limpar(linhas: Iterable[Dict[str, str]]) -> Iterator[Dict[str, str]]:
+    for row in linhas:
+        # limpar aspas NOS CAMPOS titulo e passos
+        for col in ("titulo", "passos"):
+            if row.get(col) is not None:
+                row[col] = row[col].replace('"', "").replace("'", "")
+
+        # normalizar dificuldade: "Muito Fácil" -> "Fácil"
+        if row.get("dificuldade") == "Muito Fácil":
+            row["dificuldade"] = "Fácil"
+
+        yield row
+
+
+# --- 3. formato do recipes_old.csv ---
+
+def escritor_recipes_old(f, campos):
+    # escreve CSV com ; e sem aspas (escapechar caso algum campo tenha ;)
+    return csv.DictWriter(f, fieldnames=campos, delimiter=";", quoting=csv.QUOTE_NONE, escapechar="\\")
+
+
+def como_recipes_old(linhas: Iterable[Dict[str, str]], campos: List[str], intermedio=None) -> Iterator[Dict[str, str]]:
+    """
+    Cada linha passa pelo formato do recipes_old.csv (';', sem aspas, escapechar '\\')
+    e é lida de volta como o add_id.py a lia (csv.reader simples), para os valores
+    ficarem exatamente como na cadeia antiga (ex.: aspas dentro dos ingredientes
+    ficam com a barra do escape). Linhas que assim mudariam de número de colunas
+    (um ';' num campo) são ignoradas em vez de desalinharem o dataset.
+    Se `intermedio` for um ficheiro aberto, cada linha serializada é também escrita lá.
+    """
+    buffer = io.StringIO()
+    writer = escritor_recipes_old(buffer, campos)
+    for row in linhas:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        if intermedio is not None:
+            intermedio.write(buffer.getvalue())
+        valores = next(csv.reader([buffer.getvalue().rstrip("\r\n")], delimiter=";"))
+        if len(valores) != len(campos):
+            print(f"  -> Ignorada: ';' dentro de um campo ({row.get('titulo', '')!r})")
+            continue
+        yield dict(zip(campos, valores))
+
+
+# --- 4. ids ---
+
+# Os ids já publicados no recipes.csv nunca mudam: os favoritos e recentes de cada
+# utilizador guardam-nos. Uma receita que já lá está (mesmo url ou, nas linhas
+# antigas sem url, mesmo título + categoria + imagem) fica com o id que tinha;
+# uma receita nova recebe um id derivado dela própria, nunca da posição no ficheiro.
+
+RE_FID = re.compile(r"-fid-(\d+)")
+
+
+def chave_conteudo(row: Dict[str, str]) -> str:
+    """Identidade de uma receita sem url: título normalizado, categoria e imagem"""
+    titulo = " ".join(normalizar(row.get("titulo") or "").split())
+    categoria = (row.get("categoria") or "").strip().lower()
+    return "\x1f".join((titulo, categoria, (row.get("imagem") or "").strip()))
+
+
+def id_derivado(row: Dict[str, str]) -> str:
+    """'fid<n>' a partir do url do petitchef; senão 'h' + hash do conteúdo"""
+    m = RE_FID.search(row.get("url") or "")
+    if m:
+        return "fid" + m.group(1)
+    return "h" + hashlib.sha1(chave_conteudo(row).encode("utf-8")).hexdigest()[:10]
+
+
+def ler_recipes(caminho: str, campos: Optional[List[str]] = None) -> Iterator[Dict[str, str]]:
+    """Linhas de um recipes.csv (lidas como o catálogo as lê). Preenche `campos` com o cabeçalho."""
+    with open(caminho, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f, delimiter=";")
+        reader.fieldnames = [nome.strip() for nome in reader.fieldnames or []]
+        if campos is not None:
+            campos[:] = reader.fieldnames
+        yield from reader
+
+
+class IdsExistentes:
+    """Ids do recipes.csv atual, procurados por url e por chave_conteudo()"""
+
+    def __init__(self):
+        self.por_url: Dict[str, str] = {}
+        self.por_conteudo: Dict[str, deque] = defaultdict(deque)
+        self.todos: List[str] = []
+        self.atribuidos = set()
+
+    @classmethod
+    def ler(cls, caminho: str) -> "IdsExistentes":
+        existentes = cls()
+        if os.path.exists(caminho):
+            for row in ler_recipes(caminho):
+                existentes.juntar(row)
+        return existentes
+
+    def juntar(self, row: Dict[str, str]):
+        receita_id = row["id"]
+        self.todos.append(receita_id)
+        if row.get("url"):
+            self.por_url[row["url"]] = receita_id
+        # Receitas repetidas (mesma chave) reaproveitam os ids pela mesma ordem
+        self.por_conteudo[chave_conteudo(row)].append(receita_id)
+
+    def procurar(self, row: Dict[str, str]) -> Optional[str]:
+        receita_id = self.por_url.get(row.get("url") or "")
+        if receita_id is not None and receita_id not in self.atribuidos:
+            return receita_id
+        fila = self.por_conteudo.get(chave_conteudo(row))
+        while fila:
+            receita_id = fila.popleft()
+            if receita_id not in self.atribuidos:
+                return receita_id
+        return None
+
+    def reservar(self, receita_id: str):
+        self.atribuidos.add(receita_id)
+
+
+def atribuir_ids(linhas: Iterable[Dict[str, str]], existentes: Optional[IdsExistentes] = None) -> Iterator[Dict[str, str]]:
+    """Põe o id à frente de cada linha: o que já tinha no recipes.csv, ou um derivado"""
+    if existentes is None:
+        existentes = IdsExistentes()
+    publicados = set(existentes.todos)
+    for row in linhas:
+        receita_id = existentes.procurar(row)
+        if receita_id is None:
+            base = receita_id = id_derivado(row)
+            n = 2
+            # O mesmo url duas vezes, ou um id derivado que já existe: sufixo
+            while receita_id in existentes.atribuidos or receita_id in publicados:
+                receita_id = f"{base}-{n}"
+                n += 1
+        existentes.reservar(receita_id)
+        yield {"id": receita_id, **row}
+
+
+# --- 5. escrita ---
+
+class _FicheiroAtomico:
+    """Escreve num temporário na mesma pasta e só no fim o troca pelo destino (os.replace)"""
+
+    def __init__(self, destino: str, binario: bool = False):
+        self.destino = destino
+        pasta = os.path.dirname(os.path.abspath(destino))
+        fd, self.temporario = tempfile.mkstemp(dir=pasta, prefix=".tmp-")
+        if binario:
+            self.f = os.fdopen(fd, "wb")
+        else:
+            self.f = os.fdopen(fd, "w", encoding="utf-8", newline="")
+
+    def concluir(self):
+        self.f.close()
+        # O mkstemp cria o ficheiro com 0600; fica com as permissões do destino (ou as normais)
+        try:
+            modo = os.stat(self.destino).st_mode & 0o777
+        except FileNotFoundError:
+            mascara = os.umask(0)
+            os.umask(mascara)
+            modo = 0o666 & ~mascara
+        os.chmod(self.temporario, modo)
+        os.replace(self.temporario, self.destino)
+
+    def abortar(self):
+        self.f.close()
+        if os.path.exists(self.temporario):
+            os.remove(self.temporario)
+
+
+class Resumo:
+    """O que mudou no recipes.csv, por id (para quem mantém caches por id)"""
+
+    def __init__(self):
+        self.novas: List[str] = []
+        self.alteradas: List[str] = []
+        self.iguais = 0
+        self.removidas: List[str] = []
+        self.total = 0
+
+    def como_dict(self) -> Dict[str, object]:
+        return {"novas": self.novas, "alteradas": self.alteradas, "removidas": self.removidas,
+                "iguais": self.iguais, "total": self.total}
+
+
+def _impressao(row: Dict[str, str]) -> bytes:
+    """Hash dos campos preenchidos (uma coluna nova e vazia não conta como alteração)"""
+    partes = (f"{c}\x1f{v}" for c, v in sorted(row.items(), key=lambda cv: str(cv[0])) if v and c is not None)
+    return hashlib.sha1("\x1e".join(partes).encode("utf-8")).digest()
+
+
+def _comparar(resumo: Resumo, anteriores: Dict[str, bytes], rows: Iterable[Dict[str, str]]):
+    """Classifica cada linha escrita como nova, alterada ou igual"""
+    for row in rows:
+        anterior = anteriores.pop(row["id"], None)
+        if anterior is None:
+            resumo.novas.append(row["id"])
+        elif anterior != _impressao(row):
+            resumo.alteradas.append(row["id"])
+        else:
+            resumo.iguais += 1
+        resumo.total += 1
+        yield row
+
+
+def executar(entrada: str, saida: str, intermedio: Optional[str] = None, catalogo: bool = True,
+             merge: bool = False) -> Resumo:
+    """Corre o pipeline todo.
+
+    Sem `merge`, `entrada` é o dataset completo: o recipes.csv passa a ter
+    exatamente essas receitas (pela ordem da entrada), mantendo os ids das que
+    já existiam. Com `merge`, `entrada` só tem receitas novas ou atualizadas:
+    as que já existem são substituídas no sítio, as novas vão para o fim e as
+    restantes ficam como estavam.
+    """
+    campos: List[str] = []
+    linhas = limpar(ler_linhas(entrada, campos))
+    primeira = next(linhas, None)   # o cabeçalho só é conhecido depois de começar a ler
+    if primeira is None and not merge:
+        raise SystemExit(f"{entrada} não tem receitas.")
+
+    def todas():
+        if primeira is not None:
+            yield primeira
+            yield from linhas
+
+    # Os ids (e, para o resumo, um hash de cada linha) do recipes.csv atual, lidos antes de o substituir
+    campos_existentes: List[str] = []
+    anteriores: Dict[str, bytes] = {}
+    existentes = IdsExistentes()
+    if os.path.exists(saida):
+        for row in ler_recipes(saida, campos_existentes):
+            existentes.juntar(row)
+            anteriores[row["id"]] = _impressao(row)
+    if merge and not campos_existentes:
+        raise SystemExit(f"--merge precisa de um {saida} existente.")
+
+    resumo = Resumo()
+    ficheiros = []
+    try:
+        old = None
+        if intermedio:
+            old = _FicheiroAtomico(intermedio)
+            ficheiros.append(old)
+            escritor_recipes_old(old.f, campos).writeheader()
+
+        entradas = atribuir_ids(como_recipes_old(todas(), campos, old.f if old else None), existentes)
+        if merge:
+            # Colunas novas da entrada (ex.: url) vão para o fim do cabeçalho
+            campos_saida = campos_existentes + [c for c in campos if c not in campos_existentes]
+            atualizacoes = {row["id"]: row for row in entradas}
+
+            def linhas_saida():
+                for row in ler_recipes(saida):
+                    yield {**row, **atualizacoes.pop(row["id"], {})}
+                yield from atualizacoes.values()   # as que sobram são novas
+        else:
+            campos_saida = ["id"] + campos
+
+            def linhas_saida():
+                return entradas
+
+        csv_final = _FicheiroAtomico(saida)
+        ficheiros.append(csv_final)
+        writer = csv.writer(csv_final.f, delimiter=";")
+        writer.writerow(campos_saida)
+
+        def escrever_csv(rows):
+            for row in rows:
+                writer.writerow([row.get(c) or "" for c in campos_saida])
+                yield row
+
+        escritas = escrever_csv(_comparar(resumo, anteriores, linhas_saida()))
+        construido = None
+        if catalogo:
+            construido = construir_catalogo(normalizar_linha(row) for row in escritas)
+        else:
+            for _ in escritas:
+                pass
+        # Sem merge, o que não veio na entrada saiu do dataset
+        resumo.removidas = list(anteriores)
+
+        for ficheiro in ficheiros:
+            ficheiro.concluir()
+        ficheiros = []
+
+        if construido is not None:
+            # O cabeçalho do catálogo leva o sha256 do recipes.csv final, por isso vem depois
+            binario = _FicheiroAtomico(caminho_artefacto(saida), binario=True)
+            ficheiros.append(binario)
+            escrever_catalogo(construido, binario.f, assinatura_conteudo(saida))
+            binario.concluir()
+            ficheiros = []
+        return resumo
+    except BaseException:
+        for ficheiro in ficheiros:
+            ficheiro.abortar()
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o recipes.csv (e o catálogo binário) a partir do scraping")
+    parser.add_argument("--entrada", default="petitchef_recipes.csv")
+    parser.add_argument("--saida", default="recipes.csv")
+    parser.add_argument("--intermedio", default=None,
+                        help="também escreve o CSV limpo sem ids (o antigo recipes_old.csv)")
+    parser.add_argument("--sem-catalogo", action="store_true",
+                        help="não escreve o recipes.catalogo.bin")
+    parser.add_argument("--merge", action="store_true",
+                        help="a entrada só tem receitas novas/atualizadas: junta-as ao recipes.csv existente")
+    parser.add_argument("--alteracoes", default=None,
+                        help="escreve em JSON os ids novos, alterados e removidos")
+    args = parser.parse_args()
+
+    resumo = executar(args.entrada, args.saida, args.intermedio, catalogo=not args.sem_catalogo, merge=args.merge)
+    print(f"Feito: {resumo.total} receitas em {args.saida} "
+          f"({len(resumo.novas)} novas, {len(resumo.alteradas)} alteradas, {resumo.iguais} iguais, "
+          f"{len(resumo.removidas)} removidas)")
+    if args.alteracoes:
+        with open(args.alteracoes, "w", encoding="utf-8") as f:
+            json.dump(resumo.como_dict(), f, ensure_ascii=False, indent=1)
+    if not args.sem_catalogo:
+        print(f"Catálogo binário: {caminho_artefacto(args.saida)}")
+
+
+if __name__ == "__main__":
+    main()
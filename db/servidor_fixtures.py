@@ -0,0 +1,124 @@
+"""
+Servidor HTTP local que faz de petitchef a partir das páginas em db/fixtures/.
+
+O caminho do URL é mapeado para fixtures/<caminho>.html (ex.: /receitas/sobremesa-page-2
+-> fixtures/receitas/sobremesa-page-2.html); o que não existir dá 404, tal como
+uma página de listagem a mais no site real. Responde com ETag/Last-Modified e
+304 a pedidos condicionais, e permite simular latência de rede para medir o crawler.
+
+Uso (dentro da pasta db/):
+    python servidor_fixtures.py [--porta 8000] [--atraso 0.2]
+    python extract_data.py --base http://127.0.0.1:8000 --max-por-categoria 20
+"""
+
+import argparse
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from email.utils import formatdate
+from urllib.parse import unquote, urlsplit
+
+PASTA_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, como o site real
+
+    def do_GET(self):
+        servidor = self.server
+        if servidor.atraso:
+            time.sleep(servidor.atraso)
+
+        with servidor.lock:
+            servidor.pedidos += 1
+
+        caminho = unquote(urlsplit(self.path).path).strip("/")
+        ficheiro = os.path.normpath(os.path.join(servidor.pasta, caminho + ".html"))
+        if not caminho or not ficheiro.startswith(servidor.pasta + os.sep) or not os.path.isfile(ficheiro):
+            self._responder(404, b"<html><body><h1>404</h1></body></html>")
+            return
+
+        with open(ficheiro, "rb") as f:
+            corpo = f.read()
+        etag = '"%s"' % hashlib.sha1(corpo).hexdigest()
+        last_modified = formatdate(os.path.getmtime(ficheiro), usegmt=True)
+        validadores = {"ETag": etag, "Last-Modified": last_modified}
+
+        # Pedidos condicionais, como o site real (o If-None-Match tem prioridade)
+        if_none_match = self.headers.get("If-None-Match")
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_none_match is not None:
+            nao_mudou = etag in [v.strip() for v in if_none_match.split(",")]
+        else:
+            nao_mudou = if_modified_since == last_modified
+        if nao_mudou:
+            with servidor.lock:
+                servidor.respostas_304 += 1
+            self._responder(304, b"", validadores)
+            return
+
+        self._responder(200, corpo, validadores)
+
+    def _responder(self, estado: int, corpo: bytes, cabecalhos=None):
+        self.send_response(estado)
+        if estado != 304:
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        if self.server.verboso:
+            super().log_message(formato, *args)
+
+
+class ServidorFixtures(ThreadingHTTPServer):
+    """ThreadingHTTPServer com a pasta de fixtures, latência simulada e contador de pedidos"""
+
+    daemon_threads = True
+
+    def __init__(self, porta: int = 0, pasta: str = PASTA_FIXTURES, atraso: float = 0.0, verboso: bool = False):
+        super().__init__(("127.0.0.1", porta), _Handler)
+        self.pasta = os.path.abspath(pasta)
+        self.atraso = atraso
+        self.verboso = verboso
+        self.pedidos = 0
+        self.respostas_304 = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local com as páginas de fixtures do petitchef")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--atraso", type=float, default=0.0, help="latência simulada por pedido (segundos)")
+    parser.add_argument("--pasta", default=PASTA_FIXTURES)
+    args = parser.parse_args()
+
+    servidor = ServidorFixtures(args.porta, args.pasta, args.atraso, verboso=True)
+    print(f"A servir {servidor.pasta} em {servidor.base}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()